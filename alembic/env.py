@@ -5,6 +5,9 @@ from sqlalchemy import pool
 
 from alembic import context
 
+from src.rmtpark_api.database.banco_dados import Base, SQLALCHEMY_DATABASE_URL
+from src.rmtpark_api.database import modelos  # noqa: F401  (registra as tabelas no metadata)
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -14,11 +17,14 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# Mesma URL montada a partir das variáveis DB_* usadas pela API
+config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL.replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
-target_metadata = None
+target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -0,0 +1,61 @@
+"""índices compostos e trigram para relatórios e vagas
+
+Revision ID: 3f9c2a1d7b10
+Revises: 
+Create Date: 2026-10-18 10:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2a1d7b10'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # CONCURRENTLY não roda dentro de transação e não bloqueia escrita nas tabelas
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_relatorios_empresa_saida", "relatorios",
+            ["empresa_id", sa.text("data_hora_saida DESC")],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            "ix_relatorios_empresa_entrada", "relatorios", ["empresa_id", "data_hora_entrada"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            "ix_relatorios_placa_trgm", "relatorios", ["placa"],
+            postgresql_using="gin", postgresql_ops={"placa": "gin_trgm_ops"},
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            "ix_vagas_empresa_saida", "vagas", ["empresa_id", "data_hora_saida"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            "ix_vagas_empresa_numero_interno", "vagas", ["empresa_id", "numero_interno"],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for nome, tabela in [
+            ("ix_vagas_empresa_numero_interno", "vagas"),
+            ("ix_vagas_empresa_saida", "vagas"),
+            ("ix_relatorios_placa_trgm", "relatorios"),
+            ("ix_relatorios_empresa_entrada", "relatorios"),
+            ("ix_relatorios_empresa_saida", "relatorios"),
+        ]:
+            op.drop_index(nome, table_name=tabela, postgresql_concurrently=True, if_exists=True)
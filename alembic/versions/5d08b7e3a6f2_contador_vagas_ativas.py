@@ -0,0 +1,38 @@
+"""contadores_empresa.vagas_ativas
+
+Revision ID: 5d08b7e3a6f2
+Revises: c7e2f4a9d315
+Create Date: 2026-10-18 12:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d08b7e3a6f2'
+down_revision: Union[str, Sequence[str], None] = 'c7e2f4a9d315'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "contadores_empresa",
+        sa.Column("vagas_ativas", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute("""
+        UPDATE contadores_empresa c
+        SET vagas_ativas = (
+            SELECT count(*) FROM vagas v
+            WHERE v.empresa_id = c.empresa_id AND v.data_hora_saida IS NULL
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("contadores_empresa", "vagas_ativas")
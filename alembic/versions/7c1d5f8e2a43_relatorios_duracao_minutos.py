@@ -0,0 +1,44 @@
+"""relatorios.duracao_minutos
+
+Revision ID: 7c1d5f8e2a43
+Revises: e4b7a2c9d156
+Create Date: 2026-10-18 16:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1d5f8e2a43'
+down_revision: Union[str, Sequence[str], None] = 'e4b7a2c9d156'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("relatorios", sa.Column("duracao_minutos", sa.Integer(), nullable=True))
+
+    # duracao está no formato de str(timedelta): "2:15:00" ou "1 day, 2:15:00"
+    op.execute(r"""
+        UPDATE relatorios
+        SET duracao_minutos =
+            COALESCE(substring(duracao from '^(-?\d+) days?, ')::int, 0) * 1440
+            + split_part(regexp_replace(duracao, '^.*, ', ''), ':', 1)::int * 60
+            + split_part(regexp_replace(duracao, '^.*, ', ''), ':', 2)::int
+        WHERE duracao ~ '^(-?\d+ days?, )?\d+:\d{2}:\d{2}(\.\d+)?$'
+    """)
+    # Texto fora do padrão: usa a diferença entre entrada e saída
+    op.execute("""
+        UPDATE relatorios
+        SET duracao_minutos = GREATEST(floor(extract(epoch from data_hora_saida - data_hora_entrada) / 60), 0)
+        WHERE duracao_minutos IS NULL
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("relatorios", "duracao_minutos")
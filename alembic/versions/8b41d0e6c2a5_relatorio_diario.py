@@ -0,0 +1,62 @@
+"""tabela relatorio_diario (consolidado por dia/hora)
+
+Revision ID: 8b41d0e6c2a5
+Revises: 3f9c2a1d7b10
+Create Date: 2026-10-18 11:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b41d0e6c2a5'
+down_revision: Union[str, Sequence[str], None] = '3f9c2a1d7b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "relatorio_diario",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("empresa_id", sa.Integer(), sa.ForeignKey("empresas.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("dia", sa.Date(), nullable=False),
+        sa.Column("hora", sa.Integer(), nullable=False),
+        sa.Column("tipo", sa.String(length=20), nullable=False),
+        sa.Column("forma_pagamento", sa.String(length=20), nullable=False),
+        sa.Column("quantidade", sa.Integer(), nullable=False),
+        sa.Column("receita", sa.Float(), nullable=False),
+        sa.Column("minutos_totais", sa.BigInteger(), nullable=False),
+        sa.UniqueConstraint(
+            "empresa_id", "dia", "hora", "tipo", "forma_pagamento",
+            name="relatorio_diario_bucket_unique",
+        ),
+        if_not_exists=True,
+    )
+    op.create_index("ix_relatorio_diario_id", "relatorio_diario", ["id"], if_not_exists=True)
+    # Popula a partir do histórico existente
+    op.execute("""
+        INSERT INTO relatorio_diario
+            (empresa_id, dia, hora, tipo, forma_pagamento, quantidade, receita, minutos_totais)
+        SELECT empresa_id,
+               CAST(data_hora_entrada AS DATE),
+               CAST(EXTRACT(HOUR FROM data_hora_entrada) AS INTEGER),
+               tipo,
+               COALESCE(forma_pagamento, ''),
+               COUNT(*),
+               COALESCE(SUM(valor_pago), 0),
+               COALESCE(SUM(GREATEST(FLOOR(EXTRACT(EPOCH FROM data_hora_saida - data_hora_entrada) / 60), 0)), 0)
+        FROM relatorios
+        GROUP BY 1, 2, 3, 4, 5
+        ON CONFLICT ON CONSTRAINT relatorio_diario_bucket_unique DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_relatorio_diario_id", table_name="relatorio_diario")
+    op.drop_table("relatorio_diario")
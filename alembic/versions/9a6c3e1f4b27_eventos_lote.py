@@ -0,0 +1,36 @@
+"""eventos_lote (idempotência da ingestão em lote)
+
+Revision ID: 9a6c3e1f4b27
+Revises: 5d08b7e3a6f2
+Create Date: 2026-10-18 13:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a6c3e1f4b27'
+down_revision: Union[str, Sequence[str], None] = '5d08b7e3a6f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "eventos_lote",
+        sa.Column("empresa_id", sa.Integer(), sa.ForeignKey("empresas.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("chave", sa.String(length=100), nullable=False),
+        sa.Column("tipo_evento", sa.String(length=10), nullable=False),
+        sa.Column("resultado", sa.JSON(), nullable=True),
+        sa.Column("criado_em", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("empresa_id", "chave"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("eventos_lote")
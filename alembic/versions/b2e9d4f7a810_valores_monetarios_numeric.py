@@ -0,0 +1,66 @@
+"""valores monetários em NUMERIC(12, 2) e empresas.plano_valor
+
+Revision ID: b2e9d4f7a810
+Revises: 7c1d5f8e2a43
+Create Date: 2026-10-18 17:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2e9d4f7a810'
+down_revision: Union[str, Sequence[str], None] = '7c1d5f8e2a43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUNAS = [
+    ("vagas", "valor_pago", 12),
+    ("relatorios", "valor_pago", 12),
+    ("relatorio_diario", "receita", 14),
+    ("configuracoes", "valor_hora", 12),
+    ("configuracoes", "valor_diaria", 12),
+    ("configuracoes", "valor_mensalista", 12),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for tabela, coluna, precisao in COLUNAS:
+        op.alter_column(
+            tabela, coluna,
+            type_=sa.Numeric(precisao, 2),
+            existing_type=sa.Float(),
+            postgresql_using=f"round({coluna}::numeric, 2)",
+        )
+
+    op.add_column("empresas", sa.Column("plano_valor", sa.Numeric(12, 2), nullable=True))
+    # "R$ 1.049,90/mês" -> 1049.90 (mesma leitura de utils/dinheiro.de_texto)
+    op.execute(r"""
+        UPDATE empresas
+        SET plano_valor = replace(
+            replace(substring(plano_preco from '\d[\d.]*(?:,\d+)?'), '.', ''), ',', '.'
+        )::numeric(12, 2)
+        WHERE plano_preco ~ '\d' AND plano_preco ~ ','
+    """)
+    op.execute(r"""
+        UPDATE empresas
+        SET plano_valor = substring(plano_preco from '\d+(?:\.\d+)?')::numeric(12, 2)
+        WHERE plano_valor IS NULL AND plano_preco ~ '\d'
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("empresas", "plano_valor")
+    for tabela, coluna, precisao in COLUNAS:
+        op.alter_column(
+            tabela, coluna,
+            type_=sa.Float(),
+            existing_type=sa.Numeric(precisao, 2),
+            postgresql_using=f"{coluna}::double precision",
+        )
@@ -0,0 +1,65 @@
+"""contadores_empresa e unicidade de (empresa_id, numero_interno)
+
+Revision ID: c7e2f4a9d315
+Revises: 8b41d0e6c2a5
+Create Date: 2026-10-18 11:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2f4a9d315'
+down_revision: Union[str, Sequence[str], None] = '8b41d0e6c2a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "contadores_empresa",
+        sa.Column("empresa_id", sa.Integer(), sa.ForeignKey("empresas.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("ultimo_numero_interno", sa.Integer(), nullable=False, server_default="0"),
+        if_not_exists=True,
+    )
+
+    # Tickets duplicados (gerados pela corrida do max()+1) recebem números novos acima do máximo
+    op.execute("""
+        WITH numerados AS (
+            SELECT id, empresa_id,
+                   row_number() OVER (PARTITION BY empresa_id, numero_interno ORDER BY id) AS ordem
+            FROM vagas
+        ), maximos AS (
+            SELECT empresa_id, max(numero_interno) AS maximo FROM vagas GROUP BY empresa_id
+        ), renumerados AS (
+            SELECT n.id, m.maximo + row_number() OVER (PARTITION BY n.empresa_id ORDER BY n.id) AS novo
+            FROM numerados n JOIN maximos m ON m.empresa_id = n.empresa_id
+            WHERE n.ordem > 1
+        )
+        UPDATE vagas SET numero_interno = r.novo
+        FROM renumerados r WHERE vagas.id = r.id
+    """)
+
+    op.execute("""
+        INSERT INTO contadores_empresa (empresa_id, ultimo_numero_interno)
+        SELECT empresa_id, max(numero_interno) FROM vagas GROUP BY empresa_id
+        ON CONFLICT (empresa_id) DO UPDATE
+            SET ultimo_numero_interno = GREATEST(contadores_empresa.ultimo_numero_interno,
+                                                 EXCLUDED.ultimo_numero_interno)
+    """)
+
+    op.execute("DROP INDEX IF EXISTS ix_vagas_empresa_numero_interno")
+    op.create_unique_constraint(
+        "vagas_empresa_numero_interno_unique", "vagas", ["empresa_id", "numero_interno"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("vagas_empresa_numero_interno_unique", "vagas", type_="unique")
+    op.create_index("ix_vagas_empresa_numero_interno", "vagas", ["empresa_id", "numero_interno"])
+    op.drop_table("contadores_empresa")
@@ -0,0 +1,50 @@
+"""fila de tarefas e empresas.asaas_cliente_id
+
+Revision ID: d5a3f1c8e627
+Revises: b2e9d4f7a810
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a3f1c8e627'
+down_revision: Union[str, Sequence[str], None] = 'b2e9d4f7a810'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "tarefas",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("tipo", sa.String(length=50), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("tentativas", sa.Integer(), nullable=False),
+        sa.Column("max_tentativas", sa.Integer(), nullable=False),
+        sa.Column("executar_em", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("travada_ate", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("ultimo_erro", sa.String(), nullable=True),
+        sa.Column("resultado", sa.JSON(), nullable=True),
+        sa.Column("empresa_id", sa.Integer(), sa.ForeignKey("empresas.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("criado_em", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("atualizado_em", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_tarefas_status_executar_em", "tarefas", ["status", "executar_em"])
+    op.create_index("ix_tarefas_empresa_id", "tarefas", ["empresa_id"])
+
+    op.add_column("empresas", sa.Column("asaas_cliente_id", sa.String(length=50), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("empresas", "asaas_cliente_id")
+    op.drop_index("ix_tarefas_empresa_id", table_name="tarefas")
+    op.drop_index("ix_tarefas_status_executar_em", table_name="tarefas")
+    op.drop_table("tarefas")
@@ -0,0 +1,30 @@
+"""configuracoes.faixas / configuracoes.horarios (regras de tarifa)
+
+Revision ID: e4b7a2c9d156
+Revises: 9a6c3e1f4b27
+Create Date: 2026-10-18 15:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7a2c9d156'
+down_revision: Union[str, Sequence[str], None] = '9a6c3e1f4b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("configuracoes", sa.Column("faixas", sa.JSON(), nullable=True))
+    op.add_column("configuracoes", sa.Column("horarios", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("configuracoes", "horarios")
+    op.drop_column("configuracoes", "faixas")
@@ -0,0 +1,49 @@
+"""consolidado relatorio_diario reconstruído a partir de relatorios
+
+Revision ID: f1c6a8d2b934
+Revises: d5a3f1c8e627
+Create Date: 2026-10-18 18:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c6a8d2b934'
+down_revision: Union[str, Sequence[str], None] = 'd5a3f1c8e627'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# As datas de relatorios ficam como estão. Antes do DataHoraSP, valores com
+# fuso (agora_sp()) eram convertidos pelo TimeZone da sessão e valores sem
+# fuso já entravam em horário de SP; as duas origens não se distinguem no
+# banco, então converter em massa deslocaria as linhas que já estavam certas.
+# Só o consolidado é refeito, para voltar a bater com o que está gravado
+# (o mesmo que database/consolidacao.py reconstruir).
+_RECONSTRUIR_DIARIO = """
+    INSERT INTO relatorio_diario
+        (empresa_id, dia, hora, tipo, forma_pagamento, quantidade, receita, minutos_totais)
+    SELECT empresa_id,
+           CAST(data_hora_entrada AS DATE),
+           CAST(EXTRACT(HOUR FROM data_hora_entrada) AS INTEGER),
+           tipo,
+           COALESCE(forma_pagamento, ''),
+           COUNT(*),
+           COALESCE(SUM(valor_pago), 0),
+           COALESCE(SUM(GREATEST(FLOOR(EXTRACT(EPOCH FROM data_hora_saida - data_hora_entrada) / 60), 0)), 0)
+    FROM relatorios
+    GROUP BY 1, 2, 3, 4, 5
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DELETE FROM relatorio_diario")
+    op.execute(_RECONSTRUIR_DIARIO)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Nada a desfazer: o consolidado reconstruído continua válido
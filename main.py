@@ -2,12 +2,15 @@ import pytz
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import asyncio
+import logging
 from datetime import datetime
 import time
 
 os.environ['TZ'] = 'America/Sao_Paulo'
 time.tzset()
 app = FastAPI(title="RmtPark API", version="1.0.0")
+logger = logging.getLogger(__name__)
 
 # 🔹 Mover o bloco CORS imediatamente após criar o app
 origins = [
@@ -24,12 +27,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Proximo-Cursor", "X-Total-Count", "Retry-After"],
 )
 
 # 🔹 Só depois, importar e registrar as rotas
-from src.rmtpark_api.api import auth, empresa, vaga, relatorio, mensalista, teste_email, admin_routes
+from src.rmtpark_api.api import auth, empresa, vaga, vaga_lote, vaga_stream, relatorio, mensalista, teste_email, admin_routes
 from src.rmtpark_api.database import modelos
-from src.rmtpark_api.database.banco_dados import Base, engine
+from src.rmtpark_api.database.banco_dados import Base, engine, DB_ASYNC
 
 try:
     Base.metadata.create_all(bind=engine)
@@ -37,14 +41,115 @@ except Exception as e:
     print(f"Erro ao criar tabelas no banco : {e}")
 
 # 🔹 Rotas
+# DB_ASYNC=True troca os routers de banco pelas versões asyncpg
+if DB_ASYNC:
+    from src.rmtpark_api.api import empresa_async as empresa, vaga_async as vaga
+    from src.rmtpark_api.api import relatorio_async as relatorio, mensalista_async as mensalista
+
 app.include_router(auth.router, prefix="/api/auth")
 app.include_router(empresa.router, prefix="/api/empresa")
 app.include_router(vaga.router, prefix="/api/vagas")
+if not DB_ASYNC:
+    # Na versão assíncrona o /lote já vem em vaga_async
+    app.include_router(vaga_lote.router, prefix="/api/vagas")
+app.include_router(vaga_stream.router, prefix="/api/vagas")
 app.include_router(relatorio.router, prefix="/api/relatorios", tags=["relatorios"])
 app.include_router(mensalista.router, prefix="/api/mensalistas", tags=["mensalistas"])
 app.include_router(teste_email.router, prefix="/api")
 app.include_router(admin_routes.router, prefix="/api/admin")
 
+# Reconciliação periódica do contador de vagas ativas (0 desliga)
+OCUPACAO_RECONCILIAR_SEGUNDOS = int(os.environ.get("OCUPACAO_RECONCILIAR_SEGUNDOS", 300))
+
+
+async def reconciliar_ocupacao_periodicamente():
+    from fastapi.concurrency import run_in_threadpool
+    from src.rmtpark_api.database.banco_dados import SessionLocal
+    from src.rmtpark_api.database.contadores import reconciliar_ocupacao
+
+    def reconciliar():
+        with SessionLocal() as db:
+            return reconciliar_ocupacao(db)
+
+    while True:
+        await asyncio.sleep(OCUPACAO_RECONCILIAR_SEGUNDOS)
+        try:
+            corrigidas = await run_in_threadpool(reconciliar)
+            if corrigidas:
+                logger.info(f"Ocupação reconciliada em {corrigidas} empresa(s)")
+        except Exception as e:
+            logger.error(f"Erro ao reconciliar ocupação: {e}")
+
+
+async def semear_contadores_empresas():
+    """Cria os contadores de empresas que já tinham vagas (numero_interno e ocupação)."""
+    from fastapi.concurrency import run_in_threadpool
+    from src.rmtpark_api.database.banco_dados import SessionLocal
+    from src.rmtpark_api.database.contadores import semear_contadores
+
+    def semear():
+        with SessionLocal() as db:
+            criadas = semear_contadores(db)
+            db.commit()
+            return criadas
+
+    try:
+        criadas = await run_in_threadpool(semear)
+        if criadas:
+            logger.info(f"Contadores criados para {criadas} empresa(s)")
+    except Exception as e:
+        logger.error(f"Erro ao semear contadores: {e}")
+
+
+# Carga inicial do índice de vagas ativas (listar_vagas)
+OCUPACAO_INDICE_AQUECER = os.environ.get("OCUPACAO_INDICE_AQUECER", "True") == "True"
+
+
+async def aquecer_indice_ocupacao():
+    from fastapi.concurrency import run_in_threadpool
+    from src.rmtpark_api.database.banco_dados import SessionLocal
+    from src.rmtpark_api.utils.ocupacao import indice
+
+    def aquecer():
+        with SessionLocal() as db:
+            return indice.aquecer(db)
+
+    try:
+        empresas = await run_in_threadpool(aquecer)
+        logger.info(f"Índice de ocupação carregado: {empresas} empresa(s)")
+    except Exception as e:
+        logger.error(f"Erro ao carregar índice de ocupação: {e}")
+
+
+from src.rmtpark_api.utils.eventos_vagas import EVENTOS_VAGAS_BACKEND, escutar_postgres
+from src.rmtpark_api.database.fila import FILA_WORKER, trabalhar as trabalhar_fila
+
+
+@app.on_event("startup")
+async def iniciar_tarefas():
+    # Antes de aceitar requisições: admitir_vaga conta com o contador semeado
+    await semear_contadores_empresas()
+    if OCUPACAO_INDICE_AQUECER:
+        asyncio.create_task(aquecer_indice_ocupacao())
+    if EVENTOS_VAGAS_BACKEND == "postgres":
+        asyncio.create_task(escutar_postgres())
+    if OCUPACAO_RECONCILIAR_SEGUNDOS > 0:
+        asyncio.create_task(reconciliar_ocupacao_periodicamente())
+    if FILA_WORKER:
+        # Com FILA_WORKER=False rodar: python -m src.rmtpark_api.database.fila_worker
+        asyncio.create_task(trabalhar_fila())
+
+
+@app.on_event("shutdown")
+async def encerrar_clientes():
+    from src.rmtpark_api.utils.asaas import cliente as cliente_asaas
+    from src.rmtpark_api.utils.email_utils import remetente
+    from src.rmtpark_api.utils.auth_utils import encerrar_pool
+    await cliente_asaas.fechar()
+    await remetente.fechar()
+    encerrar_pool()
+
+
 print("🕒 Timezone ativo:", datetime.now(pytz.timezone("America/Sao_Paulo")))
 
 
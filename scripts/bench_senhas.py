@@ -0,0 +1,79 @@
+"""
+Benchmark do login: verificação argon2 no event loop (antes) x pool dedicado (depois).
+
+Mede logins por segundo (total e por núcleo) e o maior atraso do event loop
+enquanto as verificações rodam, com os parâmetros ARGON2_* do ambiente.
+
+    python -m scripts.bench_senhas [logins] [concorrencia]
+"""
+import asyncio
+import os
+import sys
+import time
+
+from passlib.context import CryptContext
+
+from src.rmtpark_api.utils import auth_utils
+
+NUCLEOS = os.cpu_count() or 1
+
+
+async def _medir(verificar, hash_senha: str, logins: int, concorrencia: int) -> dict:
+    atraso_maximo = 0.0
+    rodando = True
+
+    async def monitor():
+        nonlocal atraso_maximo
+        while rodando:
+            inicio = time.perf_counter()
+            await asyncio.sleep(0.005)
+            atraso_maximo = max(atraso_maximo, time.perf_counter() - inicio - 0.005)
+
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def login():
+        async with semaforo:
+            assert await verificar("senha-correta", hash_senha)
+
+    tarefa_monitor = asyncio.create_task(monitor())
+    await asyncio.sleep(0.02)
+    inicio = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    decorrido = time.perf_counter() - inicio
+    rodando = False
+    await tarefa_monitor
+
+    por_segundo = logins / decorrido
+    return {
+        "logins_s": por_segundo,
+        "logins_s_nucleo": por_segundo / min(NUCLEOS, auth_utils.SENHA_POOL_TAMANHO),
+        "atraso_loop_ms": atraso_maximo * 1000,
+    }
+
+
+async def principal(logins: int, concorrencia: int):
+    hash_senha = auth_utils.hash_password("senha-correta")
+
+    contexto = CryptContext(schemes=["argon2"], deprecated="auto")
+
+    async def antes(senha, hash_):
+        # Como era: verificação síncrona dentro do handler
+        return contexto.verify(senha, hash_)
+
+    resultados = {
+        "antes (no event loop)": await _medir(antes, hash_senha, logins, concorrencia),
+        f"depois (pool {auth_utils.SENHA_POOL} x{auth_utils.SENHA_POOL_TAMANHO})":
+            await _medir(auth_utils.verify_password_async, hash_senha, logins, concorrencia),
+    }
+    print(f"argon2 t={auth_utils.ARGON2_TIME_COST} m={auth_utils.ARGON2_MEMORY_COST}KiB "
+          f"p={auth_utils.ARGON2_PARALLELISM} | {logins} logins, {concorrencia} simultâneos, {NUCLEOS} núcleo(s)")
+    for nome, r in resultados.items():
+        print(f"{nome:32} {r['logins_s']:8.1f} logins/s  {r['logins_s_nucleo']:8.1f}/núcleo  "
+              f"atraso máx. do loop {r['atraso_loop_ms']:8.1f} ms")
+    auth_utils.encerrar_pool()
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    simultaneos = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    asyncio.run(principal(total, simultaneos))
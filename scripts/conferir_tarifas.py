@@ -0,0 +1,90 @@
+"""
+Confere que o motor de tarifas dá o mesmo resultado no cálculo unitário
+(calcular / cobrar_mensalidade) e em lote (precos_diarista_lote /
+mensalidades_lote), com tickets aleatórios e casos de borda fixos.
+
+    python -m scripts.conferir_tarifas [tickets] [semente]
+"""
+import random
+import sys
+from datetime import datetime, time, timedelta
+
+import numpy as np
+
+from src.rmtpark_api.utils import tarifas
+
+TARIFA = tarifas.Tarifa(
+    valor_hora=1000,
+    valor_diaria=6000,
+    valor_mensalista=15000,
+    arredondamento=15,
+    faixas=(tarifas.Faixa(60, 1200), tarifas.Faixa(None, 800)),
+    horarios=(tarifas.RegraHorario(time(22, 0), time(6, 0), 500),),
+)
+
+# Mesma placa no mesmo mês de anos diferentes: cobra as duas vezes
+MENSALIDADES_FIXAS = [
+    ("ABC1D23", datetime(2025, 10, 5, 8, 0)),
+    ("ABC1D23", datetime(2026, 10, 5, 8, 0)),
+]
+
+
+def _tickets(quantidade: int, gerador: random.Random):
+    inicio = datetime(2025, 1, 1)
+    entradas, saidas = [], []
+    for _ in range(quantidade):
+        entrada = inicio + timedelta(minutes=gerador.randrange(2 * 365 * 24 * 60))
+        entradas.append(entrada)
+        saidas.append(entrada + timedelta(seconds=gerador.randrange(3 * 24 * 3600)))
+    return entradas, saidas
+
+
+def conferir_diaristas(entradas, saidas) -> int:
+    _, lote = tarifas.precos_diarista_lote(TARIFA, entradas, saidas)
+    divergentes = 0
+    for entrada, saida, valor_lote in zip(entradas, saidas, lote):
+        unitario = tarifas.centavos(tarifas.calcular(TARIFA, "carro", entrada, saida).valor)
+        divergentes += unitario != int(valor_lote)
+    return divergentes
+
+
+def conferir_mensalidades(placas, saidas) -> int:
+    lote = tarifas.mensalidades_lote(TARIFA, placas, saidas)
+    # Unitário: percorre as saídas em ordem, como o registrar_saida faria
+    ultimo_pagamento = {}
+    unitario = [0] * len(saidas)
+    for indice in sorted(range(len(saidas)), key=lambda i: saidas[i]):
+        placa, saida = placas[indice], saidas[indice]
+        if tarifas.cobrar_mensalidade(ultimo_pagamento.get(placa), saida):
+            unitario[indice] = TARIFA.valor_mensalista
+            ultimo_pagamento[placa] = saida
+    return sum(int(a) != b for a, b in zip(lote, unitario))
+
+
+def principal(quantidade: int, semente: int) -> int:
+    gerador = random.Random(semente)
+    entradas, saidas = _tickets(quantidade, gerador)
+    placas = [f"PLA{gerador.randrange(50):04d}" for _ in saidas]
+    placas += [placa for placa, _ in MENSALIDADES_FIXAS]
+    saidas_mensalistas = saidas + [saida for _, saida in MENSALIDADES_FIXAS]
+
+    resultados = {
+        "diaristas": conferir_diaristas(entradas, saidas),
+        "mensalidades": conferir_mensalidades(placas, saidas_mensalistas),
+        "mensalidades (mesmo mês, outro ano)": conferir_mensalidades(
+            [placa for placa, _ in MENSALIDADES_FIXAS], [saida for _, saida in MENSALIDADES_FIXAS]
+        ),
+    }
+    fixas = tarifas.mensalidades_lote(TARIFA, *zip(*MENSALIDADES_FIXAS))
+    if not np.all(fixas == TARIFA.valor_mensalista):
+        resultados["mensalidades (mesmo mês, outro ano)"] += 1
+
+    for nome, divergentes in resultados.items():
+        print(f"{'ok' if not divergentes else 'FALHA':5} {nome:38} {divergentes} divergência(s)")
+    return 1 if any(resultados.values()) else 0
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    semente = int(sys.argv[2]) if len(sys.argv) > 2 else 42
+    sys.exit(principal(total, semente))
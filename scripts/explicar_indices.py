@@ -0,0 +1,79 @@
+"""
+Confere com EXPLAIN que as consultas de listar_relatorios e do dashboard usam
+os índices de relatorios (ix_relatorios_empresa_saida, _empresa_entrada e
+_placa_trgm) em vez de Seq Scan na tabela.
+
+Por padrão roda com enable_seqscan=off: numa base pequena o planner prefere
+Seq Scan mesmo com índice, então o que se verifica é se existe índice
+utilizável. Com --real usa os custos normais (base com volume de produção).
+Sai com código 1 se algum plano cair em Seq Scan em relatorios.
+
+    python -m scripts.explicar_indices [empresa_id] [--real]
+"""
+import sys
+from datetime import timedelta
+from typing import List
+
+from sqlalchemy import text
+
+from src.rmtpark_api.api import relatorio
+from src.rmtpark_api.database.agregacoes import consulta_dashboard
+from src.rmtpark_api.database.banco_dados import SessionLocal
+from src.rmtpark_api.utils.timezone_utils import agora_sp, para_sp_sem_fuso
+
+TABELA = "relatorios"
+
+
+def _consultas(db, empresa_id: int) -> dict:
+    # Datas já no formato das colunas (SP sem fuso): os parâmetros vão crus ao driver
+    agora = para_sp_sem_fuso(agora_sp())
+    filtrar = relatorio._filtrar_relatorios
+    pagina = relatorio.LIMITE_PADRAO + 1
+    dialeto = db.get_bind().dialect.name
+    return {
+        "listar (primeira página)": filtrar(db, empresa_id).limit(pagina),
+        "listar (página seguinte)": relatorio._apos_cursor(filtrar(db, empresa_id), (agora, 2**31 - 1)).limit(pagina),
+        "listar por período": filtrar(db, empresa_id, start=agora - timedelta(days=30), end=agora).limit(pagina),
+        "listar por placa": filtrar(db, empresa_id, placa="ABC").limit(pagina),
+        "dashboard": consulta_dashboard(dialeto, empresa_id),
+        "dashboard por período": consulta_dashboard(dialeto, empresa_id, agora - timedelta(days=90), agora),
+    }
+
+
+def _nos(plano: dict):
+    yield plano
+    for filho in plano.get("Plans", []):
+        yield from _nos(filho)
+
+
+def explicar(db, consulta) -> List[dict]:
+    if hasattr(consulta, "statement"):
+        consulta = consulta.statement
+    compilada = consulta.compile(dialect=db.get_bind().dialect, compile_kwargs={"render_postcompile": True})
+    resultado = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compilada}", compilada.params)
+    return list(_nos(resultado.scalar()[0]["Plan"]))
+
+
+def principal(empresa_id: int, real: bool) -> int:
+    falhas = 0
+    with SessionLocal() as db:
+        if db.get_bind().dialect.name != "postgresql":
+            print("EXPLAIN só é verificado no Postgres")
+            return 1
+        if not real:
+            db.execute(text("SET LOCAL enable_seqscan = off"))
+        for nome, consulta in _consultas(db, empresa_id).items():
+            nos = explicar(db, consulta)
+            seq_scan = any(no["Node Type"] == "Seq Scan" and no.get("Relation Name") == TABELA for no in nos)
+            # Bitmap Index Scan (trigram) traz só o nome do índice, sem a tabela
+            indices = sorted({no["Index Name"] for no in nos if no.get("Index Name")})
+            falhas += seq_scan
+            print(f"{'FALHA' if seq_scan else 'ok':5} {nome:26} {', '.join(indices) or '-'}")
+        db.rollback()
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    argumentos = [arg for arg in sys.argv[1:] if arg != "--real"]
+    empresa = int(argumentos[0]) if argumentos else 1
+    sys.exit(principal(empresa, "--real" in sys.argv[1:]))
@@ -1,29 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import and_, func, not_, select
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from typing import Literal, Optional
 from ..database import banco_dados, modelos
 from ..utils.security import require_admin
 from ..utils.timezone_utils import agora_sp
+from ..utils.cache_empresa import invalidar_empresa
+from ..utils.ocupacao import indice
+from ..utils import planos
 
 router = APIRouter(tags=["admin"])
 
-limites_por_plano = {
-    "Basico": 50,
-    "Profissional": 150,
-    "Empresarial": "Ilimitado"
+def limite_vagas_exibicao(plano_titulo: str):
+    plano = planos.obter_plano(plano_titulo)
+    if plano is None:
+        return 0    # plano desconhecido: mesma saída de antes do registro de planos
+    return "Ilimitado" if plano.limite_vagas is None else plano.limite_vagas
+
+LIMITE_PAGINA = 100
+
+ORDENACOES = {
+    "id": modelos.Empresa.id,
+    "nome": modelos.Empresa.nome,
+    "plano": modelos.Empresa.plano_titulo,
+    "data_expiracao": modelos.Empresa.data_expiracao,
 }
 
 @router.get("/empresas")
-def listar_empresas(db: Session = Depends(banco_dados.get_db), _admin=Depends(require_admin)):
-    empresas = db.query(modelos.Empresa).all()
+def listar_empresas(
+    response: Response,
+    plano: Optional[str] = Query(None),
+    ativa: Optional[bool] = Query(None),
+    confirmado: Optional[bool] = Query(None),
+    expira_ate: Optional[datetime] = Query(None),
+    ordenar: Literal["id", "nome", "plano", "data_expiracao", "total_veiculos"] = Query("id"),
+    direcao: Literal["asc", "desc"] = Query("asc"),
+    pagina: Optional[int] = Query(None, ge=1),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    db: Session = Depends(banco_dados.get_db),
+    _admin=Depends(require_admin)
+):
+    """
+    Empresas com total de veículos em uma única consulta (LEFT JOIN na
+    contagem agrupada de vagas). O total de empresas do filtro vem no
+    header X-Total-Count. Sem pagina nem limit devolve todas as empresas;
+    com qualquer um dos dois, pagina de limit em limit (padrão 100).
+    """
     now = datetime.now()
-    retorno = []
+    Empresa = modelos.Empresa
+
+    veiculos = (
+        select(modelos.Vaga.empresa_id, func.count(modelos.Vaga.id).label("total"))
+        .group_by(modelos.Vaga.empresa_id)
+        .subquery()
+    )
+    total_veiculos = func.coalesce(veiculos.c.total, 0).label("total_veiculos")
 
-    for e in empresas:
-        total_veiculos = db.query(modelos.Vaga).filter(modelos.Vaga.empresa_id == e.id).count()
-        ativa = bool(e.data_expiracao and e.data_expiracao > now)
+    consulta = (
+        select(Empresa, total_veiculos, func.count().over().label("total_empresas"))
+        .outerjoin(veiculos, veiculos.c.empresa_id == Empresa.id)
+    )
+    if plano:
+        consulta = consulta.where(Empresa.plano_titulo.ilike(f"%{plano}%"))
+    if ativa is not None:
+        esta_ativa = and_(Empresa.data_expiracao.is_not(None), Empresa.data_expiracao > now)
+        consulta = consulta.where(esta_ativa if ativa else not_(esta_ativa))
+    if confirmado is not None:
+        consulta = consulta.where(func.coalesce(Empresa.email_confirmado, False) == confirmado)
+    if expira_ate:
+        consulta = consulta.where(Empresa.data_expiracao <= expira_ate)
+
+    coluna = total_veiculos if ordenar == "total_veiculos" else ORDENACOES[ordenar]
+    ordem = coluna.desc() if direcao == "desc" else coluna.asc()
+    consulta = consulta.order_by(ordem, Empresa.id)
+    if pagina is not None or limit is not None:
+        limit = limit or LIMITE_PAGINA
+        consulta = consulta.offset(((pagina or 1) - 1) * limit).limit(limit)
+
+    retorno = []
+    total_empresas = 0
+    for e, total, total_empresas in db.execute(consulta):
+        ativa_empresa = bool(e.data_expiracao and e.data_expiracao > now)
         plano_titulo = e.plano_titulo
-        limite_vagas = limites_por_plano.get(plano_titulo, 0)
 
         retorno.append({
             "id": e.id,
@@ -31,14 +90,15 @@ def listar_empresas(db: Session = Depends(banco_dados.get_db), _admin=Depends(re
             "cnpj": e.cnpj,
             "email": e.email,
             "plano": {"titulo": plano_titulo},
-            "limite_vagas": limite_vagas,
+            "limite_vagas": limite_vagas_exibicao(plano_titulo),
             "data_expiracao": e.data_expiracao,
-            "ativa": ativa,
+            "ativa": ativa_empresa,
             "confirmado": e.email_confirmado,
-            "total_veiculos": total_veiculos,
+            "total_veiculos": total,
             "email_confirmado": e.email_confirmado
         })
 
+    response.headers["X-Total-Count"] = str(total_empresas)
     return retorno
 
 @router.put("/empresas/{empresa_id}/confirma")
@@ -50,6 +110,7 @@ def confirma_email(empresa_id: int, db: Session = Depends(banco_dados.get_db), _
     db.add(empresa)
     db.commit()
     db.refresh(empresa)
+    invalidar_empresa(empresa.email)
     return {"message": "E-mail confirmado com sucesso"}
 
 @router.put("/empresas/{empresa_id}/renovar")
@@ -65,6 +126,7 @@ def renovar_plano(empresa_id: int, db: Session = Depends(banco_dados.get_db), _a
     db.add(empresa)
     db.commit()
     db.refresh(empresa)
+    invalidar_empresa(empresa.email)
     return {"message": "Plano renovado por +30 dias", "nova_data_expiracao": empresa.data_expiracao}
 
 @router.delete("/empresas/{empresa_id}")
@@ -72,6 +134,16 @@ def excluir_empresa(empresa_id: int, db: Session = Depends(banco_dados.get_db),
     empresa = db.query(modelos.Empresa).filter(modelos.Empresa.id == empresa_id).first()
     if not empresa:
         raise HTTPException(status_code=404, detail="Empresa não encontrada")
+    email = empresa.email
     db.delete(empresa)
     db.commit()
+    invalidar_empresa(email)
+    indice.descartar(empresa_id)
     return {"message": "Empresa removida"}
+
+@router.get("/metricas/pool")
+def metricas_pool_banco(_admin=Depends(require_admin)):
+    metricas = banco_dados.metricas_pool()
+    if banco_dados.DB_ASYNC:
+        metricas["async"] = banco_dados.metricas_pool(banco_dados.async_engine.sync_engine)
+    return metricas
@@ -1,6 +1,6 @@
 import os
 from datetime import datetime, timedelta, timezone
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from jose import jwt, JWTError
@@ -8,11 +8,12 @@ from pydantic import BaseModel, EmailStr
 from types import SimpleNamespace
 from ..database import banco_dados
 from ..database.modelos import Empresa
-from ..schemas.empresa import hash_password, verify_password
+from ..utils.auth_utils import hash_password, precisa_rehash, verify_password
 from ..utils.token_utils import create_confirmation_token, verify_confirmation_token
 from ..utils.email_utils import enviar_email_recuperacao
 from ..utils.timezone_utils import agora_sp
-from passlib.context import CryptContext
+from ..utils.cache_empresa import carregar_empresa, decodificar_token, invalidar_empresa
+from ..utils import limite_tentativas as limite
 
 router = APIRouter(tags=["auth"])
 
@@ -30,10 +31,6 @@ ADMIN_EMAIL = os.getenv("ADMIN_EMAIL")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD")
 ADMIN_NAME = os.getenv("ADMIN_NAME")
 
-# Hash de senha
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-
-
 # ------------------------------
 # MODELOS DE REQUEST/RESPONSE
 # ------------------------------
@@ -76,8 +73,11 @@ def get_current_empresa(
     db: Session = Depends(banco_dados.get_db),
     token: str = Depends(oauth2_scheme)
 ) -> SimpleNamespace:
+    """
+    Resolve a empresa do token; usa o cache de utils/cache_empresa.py.
+    """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decodificar_token(token, SECRET_KEY, ALGORITHM)
         email: str = payload.get("sub")
         if not email:
             raise HTTPException(status_code=401, detail="Token inválido")
@@ -87,11 +87,9 @@ def get_current_empresa(
     if email == ADMIN_EMAIL:
         return SimpleNamespace(email=ADMIN_EMAIL, nome=ADMIN_NAME, is_admin=True)
 
-    empresa = db.query(Empresa).filter(Empresa.email == email).first()
+    empresa = carregar_empresa(db, email)
     if not empresa:
         raise HTTPException(status_code=401, detail="Empresa não encontrada")
-
-    setattr(empresa, "is_admin", False)
     return empresa
 
 
@@ -100,12 +98,20 @@ def get_current_empresa(
 # ------------------------------
 
 @router.post("/login", response_model=TokenResponse)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(banco_dados.get_db)):
+def login(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(banco_dados.get_db)
+):
+    # LIMITE DE TENTATIVAS (antes do banco e do argon2)
+    limite.verificar_ip(request, "login", limite.LOGIN_IP)
+    limite.verificar_email(form_data.username, "login", limite.LOGIN_EMAIL)
 
     # LOGIN ADMIN
     if form_data.username == ADMIN_EMAIL:
         if form_data.password != ADMIN_PASSWORD:
             raise HTTPException(status_code=401, detail="Credenciais inválidas")
+        limite.liberar_email(form_data.username, "login")
         access_token, refresh_token = create_tokens(ADMIN_EMAIL)
         return TokenResponse(
             access_token=access_token,
@@ -126,6 +132,12 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     if not verify_password(form_data.password, empresa.senha):
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
 
+    # Parâmetros do argon2 mudaram: regrava o hash com a senha que acabou de ser conferida
+    if precisa_rehash(empresa.senha):
+        empresa.senha = hash_password(form_data.password)
+        db.commit()
+
+    limite.liberar_email(form_data.username, "login")
     access_token, refresh_token = create_tokens(empresa.email)
     return TokenResponse(
         access_token=access_token,
@@ -166,11 +178,15 @@ def confirmar_email(token: str, db: Session = Depends(banco_dados.get_db)):
 
     empresa.email_confirmado = True
     db.commit()
+    invalidar_empresa(email)
     return {"msg": "E-mail confirmado com sucesso! Agora você pode fazer login."}
 
 
 @router.post("/recuperar-senha")
-async def recuperar_senha(dados: RecuperarSenhaRequest, db: Session = Depends(banco_dados.get_db)):
+async def recuperar_senha(request: Request, dados: RecuperarSenhaRequest, db: Session = Depends(banco_dados.get_db)):
+    limite.verificar_ip(request, "recuperar", limite.RECUPERAR_IP)
+    limite.verificar_email(dados.email, "recuperar", limite.RECUPERAR_EMAIL)
+
     empresa = db.query(Empresa).filter(Empresa.email == dados.email).first()
     if not empresa:
         raise HTTPException(status_code=404, detail="E-mail não encontrado")
@@ -181,10 +197,12 @@ async def recuperar_senha(dados: RecuperarSenhaRequest, db: Session = Depends(ba
 
 
 @router.post("/redefinir-senha")
-def redefinir_senha(dados: RedefinirSenhaRequest, db: Session = Depends(banco_dados.get_db)):
+def redefinir_senha(request: Request, dados: RedefinirSenhaRequest, db: Session = Depends(banco_dados.get_db)):
+    limite.verificar_ip(request, "redefinir", limite.REDEFINIR_IP)
     email = verify_confirmation_token(dados.token)
     if not email:
         raise HTTPException(status_code=400, detail="Token inválido ou expirado")
+    limite.verificar_email(email, "redefinir", limite.REDEFINIR_EMAIL)
 
     empresa = db.query(Empresa).filter(Empresa.email == email).first()
     if not empresa:
@@ -192,4 +210,5 @@ def redefinir_senha(dados: RedefinirSenhaRequest, db: Session = Depends(banco_da
 
     empresa.senha = hash_password(dados.nova_senha)
     db.commit()
+    invalidar_empresa(email)
     return {"msg": "Senha redefinida com sucesso"}
@@ -1,151 +1,76 @@
+from anyio import from_thread
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from ..database import banco_dados
 from ..database.modelos import Empresa
-from ..schemas.empresa import EmpresaCreate, EmpresaOut, hash_password
+from ..database import fila
+from ..schemas.empresa import EmpresaCreate, EmpresaCriada
+from ..schemas.tarefa import TarefaOut
 from validate_docbr import CNPJ
 import logging
 import traceback
-import requests
-from datetime import datetime, timedelta
-import os
-from ..utils.email_utils import enviar_email_confirmacao
-from ..utils.token_utils import create_confirmation_token
+from typing import List
+from ..utils import dinheiro
+from ..utils.auth_utils import hash_password
+from ..utils.asaas import criar_cliente_asaas, criar_link_pagamento_asaas
+from ..utils.cadastro_empresa import agendar_cadastro
+from ..utils.security import get_current_empresa
 
 
 router = APIRouter(tags=["empresas"])
 logger = logging.getLogger(__name__)
 cnpj_validator = CNPJ()
 
-# === CONFIGURAÇÃO ASAAS SANDBOX ===
-ASAAS_API_KEY = os.getenv("ASAAS_API_KEY")
-if not ASAAS_API_KEY:
-    raise ValueError("Variável de ambiente ASAAS_API_KEY não encontrada")
-
-if not ASAAS_API_KEY.startswith("$"):
-    ASAAS_API_KEY = "$" + ASAAS_API_KEY
-
-ASAAS_API_URL = "https://sandbox.asaas.com/api/v3/"
-
-HEADERS = {
-    "access_token": ASAAS_API_KEY,
-    "Content-Type": "application/json"
-}
-
-
-# -------------------------------
-# Funções de integração com Asaas
-# -------------------------------
-
-def criar_cliente_asaas(empresa: Empresa):
-    """
-    Cria cliente no Asaas Sandbox e retorna o ID
-    """
-    payload = {
-        "name": empresa.nome,
-        "email": empresa.email,
-        "cpfCnpj": empresa.cnpj,
-        "phone": empresa.telefone,
-        "externalReference": str(empresa.id)  # opcional
-    }
-    response = requests.post(f"{ASAAS_API_URL}customers", headers=HEADERS, json=payload)
-    data = response.json()
-    if response.status_code not in [200, 201]:
-        logger.error(f"Erro ao criar cliente Asaas: {data}")
-        raise HTTPException(status_code=500, detail=f"Erro ao criar cliente no Asaas: {data}")
-    return data.get("id")
-
-
-def criar_link_pagamento_asaas(cliente_id, empresa: Empresa, dias_vencimento=5):
-    """
-    Cria cobrança no Asaas e retorna ID, status e link do checkout
-    """
-    try:
-        valor = float(empresa.plano_preco.replace("R$ ", "").replace("/mês", "").replace(",", "."))
-    except Exception as e:
-        logger.error(f"Erro ao converter valor do plano: {empresa.plano_preco}")
-        raise HTTPException(status_code=400, detail=f"Valor do plano inválido: {empresa.plano_preco}") from e
-
-    due_date = (datetime.now() + timedelta(days=dias_vencimento)).strftime("%Y-%m-%d")
-
-    payload = {
-        "customer": cliente_id,
-        "billingType": "CREDIT_CARD",  # Default
-        "value": valor,
-        "dueDate": due_date,
-        "description": f"Assinatura do plano {empresa.plano_titulo}",
-        "externalReference": str(empresa.id),
-        "notificationUrl": "https://seusite.com/notificacao-pagamento",
-        "billingTypeOptions": ["BOLETO", "CREDIT_CARD", "PIX"]
-    }
-
-    response = requests.post(f"{ASAAS_API_URL}payments", headers=HEADERS, json=payload)
-    data = response.json()
-    if response.status_code not in [200, 201]:
-        logger.error(f"Erro ao criar cobrança Asaas: {data}")
-        raise HTTPException(status_code=500, detail=f"Erro ao criar cobrança no Asaas: {data}")
-
-    # Link final do checkout
-    checkout_link = data.get("invoiceUrl") or data.get("bankSlipUrl") or f"https://sandbox.asaas.com/payment/{data['id']}"
-    return data.get("id"), data.get("status"), checkout_link
-
 
 # -------------------------------
 # Endpoints FastAPI
 # -------------------------------
 
-@router.post("/", response_model=EmpresaOut)
-async def criar_empresa(empresa: EmpresaCreate, db: Session = Depends(banco_dados.get_db), form_data=None):
+@router.post("/", response_model=EmpresaCriada)
+def criar_empresa(empresa: EmpresaCreate, db: Session = Depends(banco_dados.get_db), form_data=None):
     """
-    Cria nova empresa, registra cliente no Asaas e gera link de pagamento
+    Cria nova empresa e enfileira a cobrança no Asaas e o e-mail de confirmação
+    (acompanhar em /{empresa_id}/tarefas)
     """
     # Valida CNPJ
     somente_numeros_cnpj = ''.join(filter(str.isdigit, empresa.cnpj))
     if not cnpj_validator.validate(somente_numeros_cnpj):
         raise HTTPException(status_code=400, detail="CNPJ inválido")
 
+    plano_valor = dinheiro.de_texto(empresa.plano.preco)
+    if plano_valor is None:
+        raise HTTPException(status_code=400, detail=f"Valor do plano inválido: {empresa.plano.preco}")
+
     # Normaliza telefone
     somente_numeros_telefone = ''.join(filter(str.isdigit, empresa.telefone))
 
     try:
-        hashed_senha = hash_password(empresa.senha)
-
         # Cria empresa no banco
         nova_empresa = Empresa(
             nome=empresa.nome,
             email=empresa.email,
             telefone=somente_numeros_telefone,
             cnpj=somente_numeros_cnpj,
-            senha=empresa.senha,
+            senha=hash_password(empresa.senha),
             email_confirmado=False,
             plano_titulo=empresa.plano.titulo,
             plano_preco=empresa.plano.preco,
+            plano_valor=plano_valor,
             plano_recursos=empresa.plano.recursos,
             plano_destaque=empresa.plano.destaque
         )
         db.add(nova_empresa)
-        db.commit()
-        db.refresh(nova_empresa)
-
-        # Cria cliente Asaas
-        cliente_id = criar_cliente_asaas(nova_empresa)
+        db.flush()
 
-        # Cria link de pagamento (checkout) Asaas
-        pagamento_id, pagamento_status, pagamento_link = criar_link_pagamento_asaas(cliente_id, nova_empresa)
-
-        # Salva dados de pagamento no banco
-        nova_empresa.pagamento_id = pagamento_id
-        nova_empresa.pagamento_status = pagamento_status
-        nova_empresa.pagamento_link = pagamento_link
+        # Asaas e e-mail saem do caminho da requisição; entram no mesmo commit
+        tarefas = agendar_cadastro(db, nova_empresa)
         db.commit()
         db.refresh(nova_empresa)
 
-        token = create_confirmation_token(nova_empresa.email)
-        await enviar_email_confirmacao(nova_empresa.email, token)
-
-        return EmpresaOut.model_validate(nova_empresa)
-
+        return EmpresaCriada.model_validate(nova_empresa).model_copy(
+            update={"tarefas": [TarefaOut.model_validate(t) for t in tarefas]}
+        )
 
     except IntegrityError:
         db.rollback()
@@ -158,11 +83,28 @@ async def criar_empresa(empresa: EmpresaCreate, db: Session = Depends(banco_dado
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
+@router.get("/{empresa_id}/tarefas", response_model=List[TarefaOut])
+def listar_tarefas(
+    empresa_id: int,
+    db: Session = Depends(banco_dados.get_db),
+    empresa_logada: Empresa = Depends(get_current_empresa),
+):
+    """
+    Situação das tarefas em segundo plano da empresa (cobrança, e-mail), mais recentes primeiro.
+    Só a própria empresa autenticada pode consultar.
+    """
+    if empresa_logada.id != empresa_id:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    return fila.tarefas_da_empresa(db, empresa_id)
+
+
 @router.get("/pagar/{empresa_id}")
 def gerar_link_pagamento(empresa_id: int, db: Session = Depends(banco_dados.get_db)):
     """
     Retorna o link de pagamento para o cliente escolher forma de pagamento.
     Se ainda não existir, cria o cliente e a cobrança no Asaas.
+    Roda no threadpool (sessão síncrona); as chamadas ao Asaas vão para o
+    cliente assíncrono no event loop via anyio.from_thread.
     """
     empresa = db.query(Empresa).filter(Empresa.id == empresa_id).first()
     if not empresa:
@@ -170,8 +112,11 @@ def gerar_link_pagamento(empresa_id: int, db: Session = Depends(banco_dados.get_
 
     if not empresa.pagamento_link:
         try:
-            cliente_id = criar_cliente_asaas(empresa)
-            pagamento_id, pagamento_status, pagamento_link = criar_link_pagamento_asaas(cliente_id, empresa)
+            cliente_id = empresa.asaas_cliente_id or from_thread.run(criar_cliente_asaas, empresa)
+            pagamento_id, pagamento_status, pagamento_link = from_thread.run(
+                criar_link_pagamento_asaas, cliente_id, empresa
+            )
+            empresa.asaas_cliente_id = cliente_id
             empresa.pagamento_id = pagamento_id
             empresa.pagamento_status = pagamento_status
             empresa.pagamento_link = pagamento_link
@@ -0,0 +1,119 @@
+"""
+Versão assíncrona das rotas de empresa (DB_ASYNC=True).
+
+O banco é acessado pelo AsyncSession; a cobrança e o e-mail do cadastro vão
+para a fila de tarefas e o /pagar usa o cliente assíncrono de utils/asaas.py.
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+import traceback
+from typing import List
+from ..database import banco_dados
+from ..database.modelos import Empresa
+from ..database import fila
+from ..schemas.empresa import EmpresaCreate, EmpresaCriada
+from ..schemas.tarefa import TarefaOut
+from ..utils import dinheiro
+from ..utils.auth_utils import hash_password_async
+from ..utils.cadastro_empresa import agendar_cadastro
+from ..utils.asaas import criar_cliente_asaas, criar_link_pagamento_asaas
+from ..utils.security import get_current_empresa_async
+from .empresa import cnpj_validator
+
+router = APIRouter(tags=["empresas"])
+logger = logging.getLogger(__name__)
+
+
+@router.post("/", response_model=EmpresaCriada)
+async def criar_empresa(empresa: EmpresaCreate, db: AsyncSession = Depends(banco_dados.get_async_db)):
+    """
+    Cria nova empresa e enfileira a cobrança no Asaas e o e-mail de confirmação
+    """
+    somente_numeros_cnpj = ''.join(filter(str.isdigit, empresa.cnpj))
+    if not cnpj_validator.validate(somente_numeros_cnpj):
+        raise HTTPException(status_code=400, detail="CNPJ inválido")
+
+    plano_valor = dinheiro.de_texto(empresa.plano.preco)
+    if plano_valor is None:
+        raise HTTPException(status_code=400, detail=f"Valor do plano inválido: {empresa.plano.preco}")
+
+    somente_numeros_telefone = ''.join(filter(str.isdigit, empresa.telefone))
+
+    try:
+        nova_empresa = Empresa(
+            nome=empresa.nome,
+            email=empresa.email,
+            telefone=somente_numeros_telefone,
+            cnpj=somente_numeros_cnpj,
+            senha=await hash_password_async(empresa.senha),
+            email_confirmado=False,
+            plano_titulo=empresa.plano.titulo,
+            plano_preco=empresa.plano.preco,
+            plano_valor=plano_valor,
+            plano_recursos=empresa.plano.recursos,
+            plano_destaque=empresa.plano.destaque
+        )
+        db.add(nova_empresa)
+        await db.flush()
+
+        tarefas = agendar_cadastro(db, nova_empresa)
+        await db.commit()
+        await db.refresh(nova_empresa)
+
+        return EmpresaCriada.model_validate(nova_empresa).model_copy(
+            update={"tarefas": [TarefaOut.model_validate(t) for t in tarefas]}
+        )
+
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email ou CNPJ já cadastrado")
+
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Erro ao criar empresa: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+
+@router.get("/{empresa_id}/tarefas", response_model=List[TarefaOut])
+async def listar_tarefas(
+    empresa_id: int,
+    db: AsyncSession = Depends(banco_dados.get_async_db),
+    empresa_logada=Depends(get_current_empresa_async),
+):
+    """
+    Situação das tarefas em segundo plano da empresa (cobrança, e-mail), mais recentes primeiro.
+    Só a própria empresa autenticada pode consultar.
+    """
+    if empresa_logada.id != empresa_id:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    return await db.run_sync(lambda s: fila.tarefas_da_empresa(s, empresa_id))
+
+
+@router.get("/pagar/{empresa_id}")
+async def gerar_link_pagamento(empresa_id: int, db: AsyncSession = Depends(banco_dados.get_async_db)):
+    """
+    Retorna o link de pagamento; cria cliente e cobrança no Asaas se ainda não existir.
+    """
+    empresa = (await db.execute(select(Empresa).where(Empresa.id == empresa_id))).scalars().first()
+    if not empresa:
+        raise HTTPException(status_code=404, detail="Empresa não encontrada")
+
+    if not empresa.pagamento_link:
+        try:
+            cliente_id = empresa.asaas_cliente_id or await criar_cliente_asaas(empresa)
+            pagamento_id, pagamento_status, pagamento_link = await criar_link_pagamento_asaas(cliente_id, empresa)
+            empresa.asaas_cliente_id = cliente_id
+            empresa.pagamento_id = pagamento_id
+            empresa.pagamento_status = pagamento_status
+            empresa.pagamento_link = pagamento_link
+            await db.commit()
+        except Exception as e:
+            logger.error(f"Erro ao gerar link de pagamento: {e}")
+            logger.error(traceback.format_exc())
+            raise HTTPException(status_code=500, detail="Erro ao gerar link de pagamento")
+
+    return {"pagamento_link": empresa.pagamento_link}
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
 from sqlalchemy.orm import Session
 from src.rmtpark_api.database.banco_dados import get_db
 from src.rmtpark_api.database import modelos as models
+from src.rmtpark_api.database import importacao
 from src.rmtpark_api.api.auth import get_current_empresa
 from src.rmtpark_api.schemas import mensalista as schemas
 from src.rmtpark_api.utils.timezone_utils import agora_sp
@@ -39,6 +40,26 @@ def criar_mensalista(
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Erro ao criar mensalista: {e}")
 
+# -------------------------------
+# Importar Mensalistas (CSV / Parquet)
+# -------------------------------
+@router.post("/importar", response_model=schemas.ImportacaoResultado)
+def importar_mensalistas(
+    arquivo: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    empresa_logada: models.Empresa = Depends(get_current_empresa)
+):
+    """
+    Importa mensalistas em massa. Placa já cadastrada é atualizada; linhas
+    inválidas voltam em "erros" sem interromper a importação.
+    """
+    try:
+        linhas = importacao.ler_arquivo(arquivo.file, arquivo.filename or "")
+        return importacao.importar_mensalistas(db, empresa_logada.id, linhas)
+    except (RuntimeError, UnicodeDecodeError) as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Erro ao ler arquivo: {e}")
+
 # -------------------------------
 # Listar Mensalistas da Empresa
 # -------------------------------
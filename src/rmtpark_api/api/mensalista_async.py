@@ -0,0 +1,58 @@
+# src/rmtpark_api/api/mensalista_async.py
+"""
+Versão assíncrona das rotas de mensalistas (DB_ASYNC=True).
+As regras continuam em mensalista.py e rodam via AsyncSession.run_sync; a
+importação (leitura do arquivo e lotes) roda no threadpool com sessão
+síncrona, para não prender o event loop.
+"""
+from fastapi import APIRouter, Depends, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from src.rmtpark_api.api import mensalista
+from src.rmtpark_api.database.banco_dados import get_async_db, get_db
+from src.rmtpark_api.schemas import mensalista as schemas
+from src.rmtpark_api.utils.security import get_current_empresa_async
+
+router = APIRouter()
+
+# -------------------------------
+# Criar Mensalista
+# -------------------------------
+@router.post("/", response_model=schemas.Mensalista)
+async def criar_mensalista(
+    dados: schemas.MensalistaCreate,
+    db: AsyncSession = Depends(get_async_db),
+    empresa_logada=Depends(get_current_empresa_async)
+):
+    return await db.run_sync(lambda s: mensalista.criar_mensalista(mensalista=dados, db=s, empresa_logada=empresa_logada))
+
+# -------------------------------
+# Importar Mensalistas (CSV / Parquet)
+# -------------------------------
+@router.post("/importar", response_model=schemas.ImportacaoResultado)
+async def importar_mensalistas(
+    arquivo: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    empresa_logada=Depends(get_current_empresa_async)
+):
+    return await run_in_threadpool(
+        mensalista.importar_mensalistas, arquivo=arquivo, db=db, empresa_logada=empresa_logada
+    )
+
+# -------------------------------
+# Listar Mensalistas da Empresa
+# -------------------------------
+@router.get("/", response_model=list[schemas.Mensalista])
+async def listar_mensalistas(
+    db: AsyncSession = Depends(get_async_db),
+    empresa_logada=Depends(get_current_empresa_async)
+):
+    return await db.run_sync(lambda s: mensalista.listar_mensalistas(db=s, empresa_logada=empresa_logada))
+
+# -------------------------------
+# Deletar Mensalista pelo ID
+# -------------------------------
+@router.delete("/{id}")
+async def deletar_mensalista(id: int, db: AsyncSession = Depends(get_async_db), empresa_logada=Depends(get_current_empresa_async)):
+    return await db.run_sync(lambda s: mensalista.deletar_mensalista(id=id, db=s, empresa_logada=empresa_logada))
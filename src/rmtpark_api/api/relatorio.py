@@ -1,30 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from sqlalchemy import tuple_
+from typing import List, Literal, Optional, Tuple
 from datetime import datetime
+import base64
+from types import SimpleNamespace
 
-from ..schemas.relatorio import RelatorioResponse, RelatorioCreate
+from ..schemas.relatorio import RelatorioResponse, RelatorioCreate, SimulacaoRequest, SimulacaoResultado
 from ..schemas.vaga import ConfigSchema
-from ..database.banco_dados import get_db
-from ..database import modelos
+from ..database.banco_dados import SessionLocal, get_db
+from ..database import modelos, consolidacao, simulacao
+from ..database.agregacoes import dashboard_relatorios, permanencia_relatorios
 from ..database.modelos import Empresa
+from ..utils import exportacao, tarifas
+from ..utils.timezone_utils import agora_sp, para_sp_sem_fuso
 from .auth import get_current_empresa
 
 router = APIRouter(prefix="", tags=["Relatórios"])
 
-@router.get("/", response_model=List[RelatorioResponse])
-@router.get("/", response_model=List[RelatorioResponse])
-def listar_relatorios(
-    placa: Optional[str] = Query(None),
-    tipo: Optional[str] = Query(None),
-    forma_pagamento: Optional[str] = Query(None),
-    start: Optional[datetime] = Query(None),
-    end: Optional[datetime] = Query(None),
-    db: Session = Depends(get_db),
-    empresa: Empresa = Depends(get_current_empresa)
+LIMITE_PADRAO = 500
+LIMITE_MAXIMO = 5000
+STREAM_LOTE = 1000
+
+def _filtrar_relatorios(
+    db: Session,
+    empresa_id: int,
+    placa: Optional[str] = None,
+    tipo: Optional[str] = None,
+    forma_pagamento: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
 ):
-    query = db.query(modelos.Relatorio).filter(modelos.Relatorio.empresa_id == empresa.id)
+    """
+    Query base de relatórios da empresa com os filtros da listagem.
+    """
+    query = db.query(modelos.Relatorio).filter(modelos.Relatorio.empresa_id == empresa_id)
 
     if placa:
         query = query.filter(modelos.Relatorio.placa.ilike(f"%{placa}%"))
@@ -32,18 +43,148 @@ def listar_relatorios(
         query = query.filter(modelos.Relatorio.tipo.ilike(f"%{tipo}%"))
     if forma_pagamento:
         query = query.filter(modelos.Relatorio.forma_pagamento.ilike(f"%{forma_pagamento}%"))
-    if start and end:
-        query = query.filter(modelos.Relatorio.data_hora_entrada >= start,
-                             modelos.Relatorio.data_hora_entrada <= end)
-    elif start:
+    if start:
         query = query.filter(modelos.Relatorio.data_hora_entrada >= start)
-    elif end:
+    if end:
         query = query.filter(modelos.Relatorio.data_hora_entrada <= end)
 
-    # Ordena pelo mais recente primeiro (decrescente)
-    query = query.order_by(modelos.Relatorio.data_hora_saida.desc())
+    # Ordena pelo mais recente primeiro (decrescente); id desempata o cursor
+    return query.order_by(modelos.Relatorio.data_hora_saida.desc(), modelos.Relatorio.id.desc())
+
+
+def codificar_cursor(relatorio: modelos.Relatorio) -> str:
+    bruto = f"{relatorio.data_hora_saida.isoformat()}|{relatorio.id}"
+    return base64.urlsafe_b64encode(bruto.encode()).decode()
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        saida, relatorio_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(saida), int(relatorio_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _apos_cursor(query, posicao: Optional[Tuple[datetime, int]]):
+    if posicao is None:
+        return query
+    return query.filter(tuple_(modelos.Relatorio.data_hora_saida, modelos.Relatorio.id) < posicao)
+
+
+def _stream_ndjson(filtros: dict, posicao: Optional[Tuple[datetime, int]]):
+    """
+    Gera uma linha JSON por relatório usando cursor no servidor (yield_per),
+    com memória constante. Abre a própria sessão porque roda depois da rota.
+    """
+    with SessionLocal() as db:
+        query = _apos_cursor(_filtrar_relatorios(db, **filtros), posicao)
+        for relatorio in query.yield_per(STREAM_LOTE):
+            yield RelatorioResponse.model_validate(relatorio).model_dump_json() + "\n"
+
+
+# Colunas do export (ordem do arquivo)
+COLUNAS_EXPORT = [
+    ("ID", modelos.Relatorio.id),
+    ("Placa", modelos.Relatorio.placa),
+    ("Tipo", modelos.Relatorio.tipo),
+    ("Entrada", modelos.Relatorio.data_hora_entrada),
+    ("Saída", modelos.Relatorio.data_hora_saida),
+    ("Duração", modelos.Relatorio.duracao),
+    ("Duração (min)", modelos.Relatorio.duracao_minutos),
+    ("Valor pago", modelos.Relatorio.valor_pago),
+    ("Forma de pagamento", modelos.Relatorio.forma_pagamento),
+    ("Status", modelos.Relatorio.status_pagamento),
+]
+
+
+def _linhas_export(filtros: dict):
+    """
+    Tuplas com as colunas do export, lidas por cursor no servidor (yield_per,
+    que no psycopg2 vira um cursor nomeado) sem carregar objetos ORM.
+    """
+    with SessionLocal() as db:
+        query = _filtrar_relatorios(db, **filtros).with_entities(*[coluna for _, coluna in COLUNAS_EXPORT])
+        yield from query.yield_per(STREAM_LOTE)
+
+
+@router.get("/export")
+def exportar_relatorios(
+    request: Request,
+    placa: Optional[str] = Query(None),
+    tipo: Optional[str] = Query(None),
+    forma_pagamento: Optional[str] = Query(None),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    formato: Literal["csv", "xlsx"] = Query("csv"),
+    separador: Literal[";", ","] = Query(";"),
+    empresa: Empresa = Depends(get_current_empresa)
+):
+    """
+    Exporta os relatórios filtrados em CSV ou XLSX, em streaming e com
+    memória constante. O CSV sai em gzip quando o cliente aceita
+    (Accept-Encoding); o XLSX já é um zip comprimido.
+    """
+    filtros = dict(
+        empresa_id=empresa.id, placa=placa, tipo=tipo,
+        forma_pagamento=forma_pagamento, start=start, end=end,
+    )
+    cabecalho = [titulo for titulo, _ in COLUNAS_EXPORT]
+    nome = f"relatorios_{agora_sp():%Y%m%d_%H%M}.{formato}"
+    headers = {"Content-Disposition": f'attachment; filename="{nome}"'}
+
+    if formato == "xlsx":
+        corpo = exportacao.gerar_xlsx(cabecalho, _linhas_export(filtros), nome_planilha="Relatórios")
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        corpo = exportacao.gerar_csv(cabecalho, _linhas_export(filtros), separador)
+        media_type = "text/csv; charset=utf-8"
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            corpo = exportacao.comprimir_gzip(corpo)
+            headers["Content-Encoding"] = "gzip"
+            headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(corpo, media_type=media_type, headers=headers)
+
+
+@router.get("/", response_model=List[RelatorioResponse])
+def listar_relatorios(
+    response: Response,
+    placa: Optional[str] = Query(None),
+    tipo: Optional[str] = Query(None),
+    forma_pagamento: Optional[str] = Query(None),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = Query(None),
+    formato: Literal["json", "ndjson"] = Query("json"),
+    db: Session = Depends(get_db),
+    empresa: Empresa = Depends(get_current_empresa)
+):
+    """
+    Sem limit nem cursor devolve a lista filtrada inteira, como antes. Com
+    limit ou cursor pagina por keyset em (data_hora_saida, id) (LIMITE_PADRAO
+    por página se só vier o cursor); o cursor da próxima página vem no header
+    X-Proximo-Cursor (ausente na última página).
+    Com formato=ndjson devolve todos os relatórios a partir do cursor em streaming.
+    """
+    filtros = dict(
+        empresa_id=empresa.id, placa=placa, tipo=tipo,
+        forma_pagamento=forma_pagamento, start=start, end=end,
+    )
+    posicao = decodificar_cursor(cursor) if cursor else None
+    if formato == "ndjson":
+        return StreamingResponse(_stream_ndjson(filtros, posicao), media_type="application/x-ndjson")
 
-    return query.all()
+    query = _apos_cursor(_filtrar_relatorios(db, **filtros), posicao)
+    if limit is None and cursor is None:
+        return query.all()
+    limit = limit or LIMITE_PADRAO
+
+    # Busca um a mais para saber se existe próxima página
+    relatorios = query.limit(limit + 1).all()
+    if len(relatorios) > limit:
+        relatorios = relatorios[:limit]
+        response.headers["X-Proximo-Cursor"] = codificar_cursor(relatorios[-1])
+    return relatorios
 
 @router.post("/", response_model=RelatorioResponse)
 def criar_relatorio(
@@ -52,7 +193,15 @@ def criar_relatorio(
     empresa: Empresa = Depends(get_current_empresa)
 ):
     db_relatorio = modelos.Relatorio(**relatorio.dict(), empresa_id=empresa.id)
+    if db_relatorio.duracao_minutos is None:
+        db_relatorio.duracao_minutos = tarifas.minutos_de_duracao(relatorio.duracao)
+    if db_relatorio.duracao_minutos is None:
+        # Entrada pode vir sem fuso e a saída padrão (agora_sp) com fuso
+        entrada = para_sp_sem_fuso(relatorio.data_hora_entrada)
+        saida = para_sp_sem_fuso(relatorio.data_hora_saida)
+        db_relatorio.duracao_minutos = max(int((saida - entrada).total_seconds() // 60), 0)
     db.add(db_relatorio)
+    consolidacao.registrar_relatorio(db, db_relatorio)
     db.commit()
     db.refresh(db_relatorio)
     return db_relatorio
@@ -71,6 +220,7 @@ def deletar_relatorio(
     if not relatorio:
         raise HTTPException(status_code=404, detail="Relatório não encontrado ou não pertence à sua empresa")
 
+    consolidacao.remover_relatorio(db, relatorio)
     db.delete(relatorio)
     db.commit()
     return {"mensagem": "Relatório excluído com sucesso"}
@@ -79,57 +229,52 @@ def deletar_relatorio(
 def get_dashboard_data(
     inicio: Optional[datetime] = Query(None),
     fim: Optional[datetime] = Query(None),
+    consolidado: bool = Query(False),
     db: Session = Depends(get_db),
     empresa: Empresa = Depends(get_current_empresa)
 ):
-    query_base = db.query(modelos.Relatorio).filter(modelos.Relatorio.empresa_id == empresa.id)
-
-    if inicio:
-        query_base = query_base.filter(modelos.Relatorio.data_hora_entrada >= inicio)
-    if fim:
-        query_base = query_base.filter(modelos.Relatorio.data_hora_entrada <= fim)
-
-    total_relatorios = query_base.count()
-    total_receita = query_base.with_entities(func.sum(modelos.Relatorio.valor_pago)).scalar() or 0
-
-    receita_por_mes = (
-        db.query(
-            func.strftime("%Y-%m", modelos.Relatorio.data_hora_saida).label("mes"),
-            func.sum(modelos.Relatorio.valor_pago).label("total")
-        )
-        .filter(modelos.Relatorio.empresa_id == empresa.id)
-        .group_by("mes")
-        .all()
-    )
+    return dashboard_relatorios(db, empresa.id, inicio, fim, consolidado)
 
-    dias_movimentados = (
-        db.query(
-            func.strftime("%Y-%m-%d", modelos.Relatorio.data_hora_entrada).label("dia"),
-            func.count(modelos.Relatorio.id).label("quantidade")
-        )
-        .filter(modelos.Relatorio.empresa_id == empresa.id)
-        .group_by("dia")
-        .order_by(func.count(modelos.Relatorio.id).desc())
-        .limit(5)
-        .all()
-    )
+@router.get("/permanencia")
+def get_permanencia(
+    inicio: Optional[datetime] = Query(None),
+    fim: Optional[datetime] = Query(None),
+    tipo: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    empresa: Empresa = Depends(get_current_empresa)
+):
+    """
+    Permanência média e histograma de permanência (por faixas de minutos)
+    dos relatórios do período, por data de entrada.
+    """
+    return permanencia_relatorios(db, empresa.id, inicio, fim, tipo)
 
-    horarios_pico = (
-        db.query(
-            func.strftime("%H", modelos.Relatorio.data_hora_entrada).label("hora"),
-            func.count(modelos.Relatorio.id).label("quantidade")
-        )
-        .filter(modelos.Relatorio.empresa_id == empresa.id)
-        .group_by("hora")
-        .order_by(func.count(modelos.Relatorio.id).desc())
-        .limit(5)
-        .all()
-    )
+@router.post("/simular", response_model=List[SimulacaoResultado])
+def simular_tarifas(
+    dados: SimulacaoRequest,
+    db: Session = Depends(get_db),
+    empresa: Empresa = Depends(get_current_empresa)
+):
+    """
+    Recalcula os relatórios do período (por data de entrada) com cada tarifa
+    candidata e devolve a receita simulada, a cobrada e a diferença, no total,
+    por mês e por hora.
+    """
+    atual = getattr(empresa, "configuracao", None) or db.query(modelos.Configuracao).filter_by(
+        empresa_id=empresa.id
+    ).first()
+
+    candidatas = []
+    for candidata in dados.tarifas:
+        campos = {
+            nome: getattr(atual, nome, None)
+            for nome in ("valor_hora", "valor_diaria", "valor_mensalista", "arredondamento", "faixas", "horarios")
+        }
+        campos.update(candidata.model_dump(exclude_none=True, exclude={"nome"}))
+        candidatas.append(tarifas.Tarifa.de_config(SimpleNamespace(**campos)))
 
-    return {
-        "total_relatorios": total_relatorios,
-        "total_receita": total_receita,
-        "receita_por_mes": receita_por_mes,
-        "dias_movimentados": dias_movimentados,
-        "horarios_pico": horarios_pico
-    }
+    try:
+        resultados = simulacao.simular_tarifas(db, empresa.id, candidatas, dados.inicio, dados.fim)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return [{"nome": c.nome, **r} for c, r in zip(dados.tarifas, resultados)]
@@ -0,0 +1,105 @@
+# src/rmtpark_api/api/relatorio_async.py
+"""
+Versão assíncrona das rotas de relatórios (DB_ASYNC=True).
+As consultas continuam em relatorio.py e rodam via AsyncSession.run_sync; a
+simulação de tarifas (cálculo em lote sobre o histórico) roda no threadpool
+com sessão síncrona, para não prender o event loop.
+"""
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+from datetime import datetime
+
+from . import relatorio
+from ..schemas.relatorio import RelatorioResponse, RelatorioCreate, SimulacaoRequest, SimulacaoResultado
+from ..database.banco_dados import get_async_db, get_db
+from ..utils.security import get_current_empresa_async
+
+router = APIRouter(prefix="", tags=["Relatórios"])
+
+@router.get("/export")
+async def exportar_relatorios(
+    request: Request,
+    placa: Optional[str] = Query(None),
+    tipo: Optional[str] = Query(None),
+    forma_pagamento: Optional[str] = Query(None),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    formato: Literal["csv", "xlsx"] = Query("csv"),
+    separador: Literal[";", ","] = Query(";"),
+    empresa=Depends(get_current_empresa_async)
+):
+    # O stream abre a própria sessão síncrona (cursor nomeado do psycopg2)
+    return relatorio.exportar_relatorios(
+        request=request, placa=placa, tipo=tipo, forma_pagamento=forma_pagamento,
+        start=start, end=end, formato=formato, separador=separador, empresa=empresa
+    )
+
+@router.get("/", response_model=List[RelatorioResponse])
+async def listar_relatorios(
+    response: Response,
+    placa: Optional[str] = Query(None),
+    tipo: Optional[str] = Query(None),
+    forma_pagamento: Optional[str] = Query(None),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=relatorio.LIMITE_MAXIMO),
+    cursor: Optional[str] = Query(None),
+    formato: Literal["json", "ndjson"] = Query("json"),
+    db: AsyncSession = Depends(get_async_db),
+    empresa=Depends(get_current_empresa_async)
+):
+    return await db.run_sync(lambda s: relatorio.listar_relatorios(
+        response=response, placa=placa, tipo=tipo, forma_pagamento=forma_pagamento, start=start, end=end,
+        limit=limit, cursor=cursor, formato=formato, db=s, empresa=empresa
+    ))
+
+@router.post("/", response_model=RelatorioResponse)
+async def criar_relatorio(
+    dados: RelatorioCreate,
+    db: AsyncSession = Depends(get_async_db),
+    empresa=Depends(get_current_empresa_async)
+):
+    return await db.run_sync(lambda s: relatorio.criar_relatorio(relatorio=dados, db=s, empresa=empresa))
+
+@router.delete("/{relatorio_id}")
+async def deletar_relatorio(
+    relatorio_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    empresa=Depends(get_current_empresa_async)
+):
+    return await db.run_sync(lambda s: relatorio.deletar_relatorio(relatorio_id=relatorio_id, db=s, empresa=empresa))
+
+@router.get("/dashboard")
+async def get_dashboard_data(
+    inicio: Optional[datetime] = Query(None),
+    fim: Optional[datetime] = Query(None),
+    consolidado: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
+    empresa=Depends(get_current_empresa_async)
+):
+    return await db.run_sync(lambda s: relatorio.get_dashboard_data(
+        inicio=inicio, fim=fim, consolidado=consolidado, db=s, empresa=empresa
+    ))
+
+@router.get("/permanencia")
+async def get_permanencia(
+    inicio: Optional[datetime] = Query(None),
+    fim: Optional[datetime] = Query(None),
+    tipo: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    empresa=Depends(get_current_empresa_async)
+):
+    return await db.run_sync(lambda s: relatorio.get_permanencia(
+        inicio=inicio, fim=fim, tipo=tipo, db=s, empresa=empresa
+    ))
+
+@router.post("/simular", response_model=List[SimulacaoResultado])
+async def simular_tarifas(
+    dados: SimulacaoRequest,
+    db: Session = Depends(get_db),
+    empresa=Depends(get_current_empresa_async)
+):
+    return await run_in_threadpool(relatorio.simular_tarifas, dados=dados, db=db, empresa=empresa)
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from ..database import banco_dados
 from ..database.modelos import Empresa
+from ..utils.cache_empresa import empresas_cache
 
 router = APIRouter(tags=["test_email"])
 
@@ -11,4 +12,5 @@ def ativar_todos_usuarios(db: Session = Depends(banco_dados.get_db)):
     # Atualiza todos os registros para email_confirmado = True
     db.query(Empresa).update({Empresa.email_confirmado: True})
     db.commit()
+    empresas_cache.limpar()
     return {"msg": "Todos os usuários ativados para teste!"}
@@ -1,16 +1,20 @@
 # src/rmtpark_api/api/vaga.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 
-from ..database import modelos
+from ..database import modelos, consolidacao, contadores
 from ..database.banco_dados import get_db
 from ..schemas import vaga as vaga_schema
 from ..schemas.vaga import ConfigSchema
 from ..utils.security import get_current_empresa
 from ..utils.timezone_utils import agora_sp
+from ..utils.cache_empresa import invalidar_empresa
+from ..utils.planos import limite_vagas
+from ..utils.ocupacao import etag_confere, indice
+from ..utils import eventos_vagas, tarifas
 
 router = APIRouter(tags=["vagas"])
 
@@ -18,6 +22,33 @@ Vaga = modelos.Vaga
 Relatorio = modelos.Relatorio
 Configuracao = modelos.Configuracao
 
+def config_tarifa(db: Session, empresa_logada):
+    """
+    Configuração de cobrança da empresa: a do snapshot em cache ou, se não houver, a do banco.
+    """
+    config = getattr(empresa_logada, "configuracao", None)
+    if config is None:
+        config = db.query(Configuracao).filter_by(empresa_id=empresa_logada.id).first()
+    if not config:
+        raise HTTPException(status_code=400, detail="Configurações não encontradas")
+    return config
+
+def calcular_saida(config, tipo: str, entrada: datetime, saida: datetime, mensalista=None):
+    """
+    Duração arredondada (texto e minutos) e valor da saída conforme a configuração da empresa
+    (regras em utils/tarifas.py). Para mensalista, cobra a mensalidade uma vez por
+    mês e marca ultimo_pagamento.
+    """
+    devida = True
+    if tipo.lower() == "mensalista" and mensalista:
+        agora = agora_sp()
+        devida = tarifas.cobrar_mensalidade(mensalista.ultimo_pagamento, agora)
+        if devida:
+            mensalista.ultimo_pagamento = agora
+
+    cobranca = tarifas.calcular(tarifas.Tarifa.de_config(config), tipo, entrada, saida, devida)
+    return cobranca.duracao, cobranca.valor, cobranca.minutos
+
 # ------------------- PING -------------------
 @router.get("/ping")
 def ping():
@@ -26,10 +57,19 @@ def ping():
 # ------------------- LISTAR VAGAS -------------------
 @router.get("/", response_model=List[vaga_schema.VagaResponse])
 def listar_vagas(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     empresa_logada: modelos.Empresa = Depends(get_current_empresa)
 ):
-    vagas = db.query(Vaga).filter(Vaga.empresa_id == empresa_logada.id).all()
+    """
+    Vagas ativas a partir do índice em memória. Com If-None-Match igual ao
+    ETag atual devolve 304 sem corpo (e sem consultar o banco).
+    """
+    etag, vagas = indice.listar(db, empresa_logada.id)
+    if etag_confere(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return vagas
 
 # ------------------- CRIAR VAGA -------------------
@@ -39,35 +79,16 @@ def criar_vaga(
     db: Session = Depends(get_db),
     empresa_logada: modelos.Empresa = Depends(get_current_empresa)
 ):
-    plano = (empresa_logada.plano_titulo or "").lower()
-    limite = None
-
-    if "básico" in plano or "basico" in plano or "basic" in plano:
-        limite = 50
-    elif "profissional" in plano:
-        limite = 150
-    elif "premium" in plano or "empresarial" in plano:
-        limite = None
-
-    # Contar vagas ativas
-    vagas_ativas = db.query(Vaga).filter(
-        Vaga.empresa_id == empresa_logada.id,
-        Vaga.data_hora_saida.is_(None)
-    ).count()
-
-    if limite is not None and vagas_ativas >= limite:
+    # Admissão + numeração: um único upsert no contador da empresa
+    limite = limite_vagas(empresa_logada.plano_titulo)
+    novo_numero = contadores.admitir_vaga(db, empresa_logada.id, limite)
+    if novo_numero is None:
+        db.rollback()
         raise HTTPException(
             status_code=403,
             detail=f"Limite de {limite} vagas ativas atingido para o plano {empresa_logada.plano_titulo}."
         )
 
-    # Pegar o último número interno usado pela empresa
-    ultimo_numero = db.query(func.max(Vaga.numero_interno))\
-                      .filter(Vaga.empresa_id == empresa_logada.id)\
-                      .scalar()
-
-    novo_numero = (ultimo_numero or 0) + 1
-
     # Criar a vaga ORM, usando o novo numero_interno
     nova_vaga = Vaga(
         numero_interno=novo_numero,
@@ -78,94 +99,73 @@ def criar_vaga(
     )
 
     db.add(nova_vaga)
+    db.flush()
+    eventos_vagas.publicar(db, empresa_logada.id, [eventos_vagas.evento_entrada(nova_vaga)])
     db.commit()
     db.refresh(nova_vaga)
+    indice.entrada(nova_vaga)
     return nova_vaga
 
 
 # ------------------- REGISTRAR SAÍDA -------------------
 @router.put("/{vaga_id}/saida")
-@router.put("/{vaga_id}/saida")
 def registrar_saida(
         vaga_id: int,
         dados: vaga_schema.VagaSaidaSchema,
         db: Session = Depends(get_db),
         empresa_logada: modelos.Empresa = Depends(get_current_empresa)
 ):
-    vaga = db.query(Vaga).filter(
-        Vaga.id == vaga_id,
-        Vaga.empresa_id == empresa_logada.id
+    """
+    Fecha o ticket em uma única transação: o DELETE ... RETURNING tira a vaga
+    das ativas e trava a linha, então uma segunda saída concorrente para a
+    mesma vaga não encontra nada e recebe 404.
+    """
+    config = config_tarifa(db, empresa_logada)
+
+    vaga = db.execute(
+        delete(Vaga)
+        .where(Vaga.id == vaga_id, Vaga.empresa_id == empresa_logada.id)
+        .returning(Vaga.id, Vaga.placa, Vaga.tipo, Vaga.data_hora, Vaga.empresa_id)
+        .execution_options(synchronize_session=False)
     ).first()
 
     if not vaga:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Vaga não encontrada")
-
-    config: Configuracao = db.query(Configuracao).filter_by(empresa_id=empresa_logada.id).first()
-    if not config:
-        raise HTTPException(status_code=400, detail="Configurações não encontradas")
+    contadores.liberar_vaga(db, empresa_logada.id)
 
     saida: datetime = dados.saida or agora_sp()
 
-    # cálculo da duração
-    duracao: timedelta = saida - vaga.data_hora
-    minutos_totais = duracao.total_seconds() / 60
-    arred_min = config.arredondamento or 1
-    minutos_arred = ((minutos_totais + arred_min - 1) // arred_min) * arred_min
-    duracao_str = str(timedelta(minutes=minutos_arred))
-    horas = minutos_arred / 60
-
-    # cálculo do valor baseado na configuração da empresa
-    valor = 0
-    if vaga.tipo.lower() == "diarista":
-        # se a hora está configurada, calcula por hora
-        valor = round(horas * (config.valor_hora or 0), 2)
-    elif vaga.tipo.lower() == "mensalista":
+    mensalista = None
+    if vaga.tipo.lower() == "mensalista":
+        # FOR UPDATE: duas saídas simultâneas não cobram a mensalidade duas vezes
         mensalista = db.query(modelos.Mensalista).filter_by(
             placa=vaga.placa, empresa_id=empresa_logada.id
-        ).first()
-
-        if mensalista:
-            agora = agora_sp()
-            if not mensalista.ultimo_pagamento or mensalista.ultimo_pagamento.month != agora.month:
-                valor = config.valor_mensalista or 0
-                mensalista.ultimo_pagamento = agora
-                db.add(mensalista)
-            else:
-                valor = 0  # já pagou esse mês
-        else:
-            valor = config.valor_mensalista or 0
-    else:
-        valor = round(horas * (config.valor_hora or 0), 2)
+        ).with_for_update().first()
 
-    forma_pagamento = dados.formaPagamento or config.forma_pagamento
+    duracao_str, valor, minutos = calcular_saida(config, vaga.tipo, vaga.data_hora, saida, mensalista)
 
-    # Atualiza a vaga
-    vaga.data_hora_saida = saida
-    vaga.duracao = duracao_str
-    vaga.valor_pago = valor
-    vaga.forma_pagamento = forma_pagamento
-    vaga.status_pagamento = "Pago" if vaga.tipo.lower() == "diarista" else "Mensalista"
+    forma_pagamento = dados.formaPagamento or config.forma_pagamento
 
-    # Cria o relatório
+    # Cria o relatório (flush = INSERT ... RETURNING id)
     relatorio = Relatorio(
         placa=vaga.placa,
         tipo=vaga.tipo,
         data_hora_entrada=vaga.data_hora,
         data_hora_saida=saida,
         duracao=duracao_str,
+        duracao_minutos=minutos,
         valor_pago=valor,
         forma_pagamento=forma_pagamento,
-        status_pagamento=vaga.status_pagamento,
+        status_pagamento="Pago" if vaga.tipo.lower() == "diarista" else "Mensalista",
         empresa_id=vaga.empresa_id
     )
-
     db.add(relatorio)
-    db.commit()  # Commit antes de deletar a vaga
-    db.refresh(relatorio)
-
-    # Remove a vaga da lista de vagas ativas
-    db.delete(vaga)
+    db.flush()
+    consolidacao.registrar_relatorio(db, relatorio)
+    eventos_vagas.publicar(db, vaga.empresa_id, [eventos_vagas.evento_saida(vaga.id, relatorio.id, valor)])
     db.commit()
+    indice.saida(vaga.empresa_id, vaga.id)
 
     return {
         "success": True,
@@ -193,9 +193,14 @@ def salvar_configuracoes(
     config.valor_mensalista = dados.valor_mensalista
     config.arredondamento = dados.arredondamento
     config.forma_pagamento = dados.forma_pagamento
+    if dados.faixas is not None:
+        config.faixas = [f.model_dump() for f in dados.faixas] or None
+    if dados.horarios is not None:
+        config.horarios = [h.model_dump(mode="json") for h in dados.horarios] or None
 
     db.commit()
     db.refresh(config)
+    invalidar_empresa(empresa_logada.email)
     return config
 
 @router.get("/configuracoes", response_model=ConfigSchema)
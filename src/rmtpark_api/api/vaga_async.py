@@ -0,0 +1,85 @@
+# src/rmtpark_api/api/vaga_async.py
+"""
+Versão assíncrona das rotas de vagas (DB_ASYNC=True).
+
+A regra de negócio continua em vaga.py; aqui cada rota só executa a função
+síncrona dentro do AsyncSession (run_sync), então o I/O vai pelo asyncpg sem
+ocupar uma thread do threadpool. O /lote (até milhares de eventos) é a
+exceção: roda no threadpool com sessão síncrona, para não prender o event loop.
+"""
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import List
+
+from . import vaga, vaga_lote
+from ..database.banco_dados import get_async_db, get_db
+from ..schemas import vaga as vaga_schema
+from ..schemas.vaga import ConfigSchema
+from ..utils.security import get_current_empresa_async
+
+router = APIRouter(tags=["vagas"])
+
+# ------------------- PING -------------------
+@router.get("/ping")
+async def ping():
+    return vaga.ping()
+
+# ------------------- LISTAR VAGAS -------------------
+@router.get("/", response_model=List[vaga_schema.VagaResponse])
+async def listar_vagas(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    empresa_logada=Depends(get_current_empresa_async)
+):
+    return await db.run_sync(
+        lambda s: vaga.listar_vagas(request=request, response=response, db=s, empresa_logada=empresa_logada)
+    )
+
+# ------------------- CRIAR VAGA -------------------
+@router.post("/", response_model=vaga_schema.VagaResponse)
+async def criar_vaga(
+    dados: vaga_schema.VagaCreate,
+    db: AsyncSession = Depends(get_async_db),
+    empresa_logada=Depends(get_current_empresa_async)
+):
+    return await db.run_sync(lambda s: vaga.criar_vaga(vaga=dados, db=s, empresa_logada=empresa_logada))
+
+# ------------------- REGISTRAR SAÍDA -------------------
+@router.put("/{vaga_id}/saida")
+async def registrar_saida(
+    vaga_id: int,
+    dados: vaga_schema.VagaSaidaSchema,
+    db: AsyncSession = Depends(get_async_db),
+    empresa_logada=Depends(get_current_empresa_async)
+):
+    return await db.run_sync(
+        lambda s: vaga.registrar_saida(vaga_id=vaga_id, dados=dados, db=s, empresa_logada=empresa_logada)
+    )
+
+# ------------------- LOTE (TERMINAIS OFFLINE) -------------------
+@router.post("/lote", response_model=List[vaga_schema.ResultadoEventoLote])
+async def processar_lote(
+    lote: vaga_schema.LoteRequest,
+    db: Session = Depends(get_db),
+    empresa_logada=Depends(get_current_empresa_async)
+):
+    return await run_in_threadpool(vaga_lote.processar_lote, lote=lote, db=db, empresa_logada=empresa_logada)
+
+# ------------------- CONFIGURAÇÕES -------------------
+@router.post("/configuracoes", response_model=ConfigSchema)
+async def salvar_configuracoes(
+    dados: ConfigSchema,
+    db: AsyncSession = Depends(get_async_db),
+    empresa_logada=Depends(get_current_empresa_async)
+):
+    return await db.run_sync(lambda s: vaga.salvar_configuracoes(dados=dados, db=s, empresa_logada=empresa_logada))
+
+@router.get("/configuracoes", response_model=ConfigSchema)
+async def obter_configuracoes(
+    db: AsyncSession = Depends(get_async_db),
+    empresa_logada=Depends(get_current_empresa_async)
+):
+    return await db.run_sync(lambda s: vaga.obter_configuracoes(db=s, empresa_logada=empresa_logada))
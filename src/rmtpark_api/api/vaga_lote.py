@@ -0,0 +1,318 @@
+# src/rmtpark_api/api/vaga_lote.py
+"""
+Ingestão em lote de entradas e saídas vindas de terminais que ficaram offline.
+
+Cada evento traz uma chave de idempotência. As chaves são reivindicadas com
+INSERT ... ON CONFLICT DO NOTHING RETURNING, então reenvios (ou dois envios
+simultâneos do mesmo backlog) não duplicam tickets: quem já foi processado
+volta com o resultado gravado. Todo o lote roda em uma transação, com
+inserts/deletes em massa em vez de um commit por ticket.
+
+Um evento com problema não derruba o lote: campos maiores que as colunas
+são recusados antes dos comandos em massa, e os comandos rodam dentro de
+um savepoint; se o banco recusar, são refeitos evento a evento (cada um no
+seu savepoint) e só os culpados voltam com status "erro".
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+
+from ..database import modelos, consolidacao, contadores
+from ..database.banco_dados import get_db, insert_dialeto
+from ..schemas.vaga import LoteRequest, ResultadoEventoLote
+from ..utils import eventos_vagas
+from ..utils.ocupacao import VagaAtiva, indice
+from ..utils.planos import limite_vagas
+from ..utils.security import get_current_empresa
+from ..utils.timezone_utils import para_sp_sem_fuso
+from .vaga import calcular_saida, config_tarifa
+
+router = APIRouter(tags=["vagas"])
+
+Vaga = modelos.Vaga
+Relatorio = modelos.Relatorio
+EventoLote = modelos.EventoLote
+
+# Campos do evento gravados em colunas de tamanho limitado
+COLUNAS_ENTRADA = {"placa": Vaga.placa, "tipo": Vaga.tipo}
+COLUNAS_SAIDA = {"forma_pagamento": Relatorio.forma_pagamento}
+
+
+def _erro_tamanho(ev, colunas: dict) -> Optional[str]:
+    for campo, coluna in colunas.items():
+        valor, tamanho = getattr(ev, campo), coluna.type.length
+        if isinstance(valor, str) and tamanho and len(valor) > tamanho:
+            return f"{campo}: máximo de {tamanho} caracteres"
+    return None
+
+
+def _descrever(erro: SQLAlchemyError) -> str:
+    return str(getattr(erro, "orig", erro)).strip().splitlines()[0]
+
+
+def _reivindicar_chaves(db: Session, empresa_id: int, eventos) -> set:
+    comando = (
+        insert_dialeto(db, EventoLote)
+        .on_conflict_do_nothing(index_elements=["empresa_id", "chave"])
+        .returning(EventoLote.chave)
+    )
+    linhas = [{"empresa_id": empresa_id, "chave": ev.chave, "tipo_evento": ev.evento} for ev in eventos]
+    return set(db.execute(comando, linhas).scalars())
+
+
+def _processar_entradas(db: Session, empresa_logada, eventos, resultados: Dict[str, dict], abertas: list):
+    validos = []
+    for ev in eventos:
+        erro = "Entrada exige placa e tipo" if not ev.placa or not ev.tipo else _erro_tamanho(ev, COLUNAS_ENTRADA)
+        if erro:
+            resultados[ev.chave] = {"status": "erro", "erro": erro}
+        else:
+            validos.append(ev)
+    if not validos:
+        return
+
+    limite = limite_vagas(empresa_logada.plano_titulo)
+    numeros = contadores.admitir_vagas(db, empresa_logada.id, limite, len(validos))
+    admitidos, recusados = validos[:len(numeros)], validos[len(numeros):]
+    for ev in recusados:
+        resultados[ev.chave] = {
+            "status": "erro",
+            "erro": f"Limite de {limite} vagas ativas atingido para o plano {empresa_logada.plano_titulo}.",
+        }
+    if not admitidos:
+        return
+
+    linhas = [
+        {
+            "numero_interno": numero,
+            "placa": ev.placa.upper(),
+            "tipo": ev.tipo,
+            "data_hora": ev.data_hora,
+            "empresa_id": empresa_logada.id,
+        }
+        for ev, numero in zip(admitidos, numeros)
+    ]
+    try:
+        with db.begin_nested():
+            criadas = db.execute(
+                insert(Vaga).returning(Vaga.id, Vaga.numero_interno, sort_by_parameter_order=True), linhas
+            ).all()
+        gravados = list(zip(admitidos, criadas))
+    except SQLAlchemyError:
+        # O banco recusou o lote: refaz entrada a entrada para isolar as culpadas
+        gravados = []
+        for ev, linha in zip(admitidos, linhas):
+            try:
+                with db.begin_nested():
+                    criada = db.execute(insert(Vaga).values(**linha).returning(Vaga.id, Vaga.numero_interno)).one()
+                gravados.append((ev, criada))
+            except SQLAlchemyError as e:
+                resultados[ev.chave] = {"status": "erro", "erro": _descrever(e)}
+        if len(gravados) < len(admitidos):
+            contadores.liberar_vaga(db, empresa_logada.id, len(admitidos) - len(gravados))
+
+    for ev, (vaga_id, numero) in gravados:
+        resultados[ev.chave] = {"status": "ok", "vaga_id": vaga_id, "numero_interno": numero}
+        abertas.append(VagaAtiva(
+            id=vaga_id, numero_interno=numero, placa=ev.placa.upper(), tipo=ev.tipo,
+            data_hora=ev.data_hora, empresa_id=empresa_logada.id,
+        ))
+
+
+def _escolher_vaga(ev, por_id: dict, por_placa: dict, usadas: set):
+    if ev.vaga_id is not None:
+        vaga = por_id.get(ev.vaga_id)
+        return vaga if vaga is not None and vaga.id not in usadas else None
+
+    candidatas = [v for v in por_placa.get((ev.placa or "").upper(), []) if v.id not in usadas]
+    if not candidatas:
+        return None
+    # A entrada mais recente antes da saída; se nenhuma for anterior, a mais antiga
+    saida = para_sp_sem_fuso(ev.data_hora)
+    anteriores = [v for v in candidatas if para_sp_sem_fuso(v.data_hora) <= saida]
+    if anteriores:
+        return max(anteriores, key=lambda v: para_sp_sem_fuso(v.data_hora))
+    return min(candidatas, key=lambda v: para_sp_sem_fuso(v.data_hora))
+
+
+def _processar_saidas(db: Session, empresa_logada, eventos, resultados: Dict[str, dict], fechadas: list):
+    if not eventos:
+        return
+    try:
+        config = config_tarifa(db, empresa_logada)
+    except HTTPException as e:
+        for ev in eventos:
+            resultados[ev.chave] = {"status": "erro", "erro": e.detail}
+        return
+
+    ids = {ev.vaga_id for ev in eventos if ev.vaga_id is not None}
+    placas = {ev.placa.upper() for ev in eventos if ev.vaga_id is None and ev.placa}
+    ativas = db.execute(
+        select(Vaga)
+        .where(Vaga.empresa_id == empresa_logada.id, Vaga.id.in_(ids) | Vaga.placa.in_(placas))
+        .with_for_update()
+    ).scalars().all()
+    por_id = {v.id: v for v in ativas}
+    por_placa = {}
+    for v in ativas:
+        por_placa.setdefault(v.placa, []).append(v)
+
+    placas_mensalistas = {v.placa for v in ativas if v.tipo.lower() == "mensalista"}
+    mensalistas = {}
+    if placas_mensalistas:
+        mensalistas = {
+            m.placa: m for m in db.execute(
+                select(modelos.Mensalista)
+                .where(modelos.Mensalista.empresa_id == empresa_logada.id,
+                       modelos.Mensalista.placa.in_(placas_mensalistas))
+                .with_for_update()
+            ).scalars()
+        }
+
+    usadas = set()
+    fechamentos = []
+    pagamentos_anteriores = {}          # chave -> (mensalista, ultimo_pagamento antes da saída)
+    for ev in sorted(eventos, key=lambda e: para_sp_sem_fuso(e.data_hora)):
+        erro = _erro_tamanho(ev, COLUNAS_SAIDA)
+        if erro:
+            resultados[ev.chave] = {"status": "erro", "erro": erro}
+            continue
+        vaga = _escolher_vaga(ev, por_id, por_placa, usadas)
+        if vaga is None:
+            resultados[ev.chave] = {"status": "erro", "erro": "Vaga não encontrada"}
+            continue
+
+        mensalista = mensalistas.get(vaga.placa)
+        anterior = mensalista.ultimo_pagamento if mensalista else None
+        try:
+            duracao_str, valor, minutos = calcular_saida(config, vaga.tipo, vaga.data_hora, ev.data_hora, mensalista)
+        except (TypeError, ValueError, ArithmeticError) as e:
+            resultados[ev.chave] = {"status": "erro", "erro": f"Saída inválida: {e}"}
+            continue
+        usadas.add(vaga.id)
+        if mensalista:
+            pagamentos_anteriores[ev.chave] = (mensalista, anterior)
+        relatorio = Relatorio(
+            placa=vaga.placa,
+            tipo=vaga.tipo,
+            data_hora_entrada=vaga.data_hora,
+            data_hora_saida=ev.data_hora,
+            duracao=duracao_str,
+            duracao_minutos=minutos,
+            valor_pago=valor,
+            forma_pagamento=ev.forma_pagamento or config.forma_pagamento,
+            status_pagamento="Pago" if vaga.tipo.lower() == "diarista" else "Mensalista",
+            empresa_id=empresa_logada.id,
+        )
+        fechamentos.append((ev, vaga, relatorio))
+
+    if not fechamentos:
+        return
+
+    # begin_nested faz flush antes do SAVEPOINT: ultimo_pagamento dos
+    # mensalistas fica na transação externa, fora do que pode ser desfeito
+    try:
+        with db.begin_nested():
+            _fechar(db, empresa_logada.id, fechamentos)
+        gravados = fechamentos
+    except SQLAlchemyError:
+        gravados = []
+        for fechamento in fechamentos:
+            ev = fechamento[0]
+            try:
+                with db.begin_nested():
+                    _fechar(db, empresa_logada.id, [fechamento])
+                gravados.append(fechamento)
+            except SQLAlchemyError as e:
+                resultados[ev.chave] = {"status": "erro", "erro": _descrever(e)}
+                if ev.chave in pagamentos_anteriores:
+                    mensalista, anterior = pagamentos_anteriores[ev.chave]
+                    mensalista.ultimo_pagamento = anterior
+
+    for ev, vaga, relatorio in gravados:
+        fechadas.append((vaga.id, relatorio.id, relatorio.valor_pago))
+        resultados[ev.chave] = {
+            "status": "ok",
+            "vaga_id": vaga.id,
+            "numero_interno": vaga.numero_interno,
+            "relatorio_id": relatorio.id,
+            "valor_pago": float(relatorio.valor_pago),     # resultado vai para coluna JSON
+        }
+
+
+def _fechar(db: Session, empresa_id: int, fechamentos: list):
+    """Apaga as vagas, grava os relatórios e atualiza consolidado e ocupação."""
+    db.execute(
+        delete(Vaga)
+        .where(Vaga.id.in_([vaga.id for _, vaga, _ in fechamentos]))
+        .execution_options(synchronize_session=False)
+    )
+    relatorios = [relatorio for _, _, relatorio in fechamentos]
+    db.add_all(relatorios)
+    db.flush()
+    consolidacao.registrar_relatorios(db, relatorios)
+    contadores.liberar_vaga(db, empresa_id, len(fechamentos))
+
+
+@router.post("/lote", response_model=List[ResultadoEventoLote])
+def processar_lote(
+    lote: LoteRequest,
+    db: Session = Depends(get_db),
+    empresa_logada: modelos.Empresa = Depends(get_current_empresa)
+):
+    """
+    Processa entradas e saídas em lote (entradas primeiro, depois saídas em
+    ordem cronológica) e devolve um resultado por evento, na ordem recebida.
+    """
+    unicos = {}
+    for ev in lote.eventos:
+        unicos.setdefault(ev.chave, ev)
+    if not unicos:
+        return []
+
+    novas = _reivindicar_chaves(db, empresa_logada.id, unicos.values())
+
+    resultados: Dict[str, dict] = {}
+    repetidas = [chave for chave in unicos if chave not in novas]
+    if repetidas:
+        gravados = db.execute(
+            select(EventoLote.chave, EventoLote.resultado)
+            .where(EventoLote.empresa_id == empresa_logada.id, EventoLote.chave.in_(repetidas))
+        ).all()
+        for chave, resultado in gravados:
+            if resultado is None:
+                resultados[chave] = {"status": "em_processamento"}
+            else:
+                resultados[chave] = {**resultado, "status": "duplicado"}
+
+    a_processar = [ev for chave, ev in unicos.items() if chave in novas]
+    abertas, fechadas = [], []
+    _processar_entradas(db, empresa_logada, [ev for ev in a_processar if ev.evento == "entrada"], resultados, abertas)
+    _processar_saidas(db, empresa_logada, [ev for ev in a_processar if ev.evento == "saida"], resultados, fechadas)
+
+    if a_processar:
+        db.execute(update(EventoLote), [
+            {"empresa_id": empresa_logada.id, "chave": ev.chave, "resultado": resultados[ev.chave]}
+            for ev in a_processar
+        ])
+    eventos_vagas.publicar(db, empresa_logada.id, [
+        *(eventos_vagas.evento_entrada(vaga) for vaga in abertas),
+        *(eventos_vagas.evento_saida(*fechada) for fechada in fechadas),
+    ])
+    db.commit()
+    for vaga in abertas:
+        indice.entrada(vaga)
+    for vaga_id, _, _ in fechadas:
+        indice.saida(empresa_logada.id, vaga_id)
+
+    retorno = []
+    vistas = set()
+    for ev in lote.eventos:
+        if ev.chave in vistas:
+            retorno.append({"chave": ev.chave, "status": "duplicado"})
+            continue
+        vistas.add(ev.chave)
+        retorno.append({"chave": ev.chave, **resultados.get(ev.chave, {"status": "em_processamento"})})
+    return retorno
@@ -0,0 +1,89 @@
+# src/rmtpark_api/api/vaga_stream.py
+"""
+Stream (Server-Sent Events) das entradas e saídas da empresa, para as telas
+de operador deixarem de fazer polling em GET /api/vagas/.
+
+Ao conectar o cliente recebe um "snapshot" com as vagas ativas (do índice em
+memória) e depois os eventos "entrada", "saida" e, se ficar para trás,
+"resync". Comentários ": ping" mantêm a conexão viva atrás de proxies.
+
+Como o EventSource não envia Authorization, o cliente pede antes um ticket em
+POST /api/vagas/stream/ticket (com o token no header) e conecta em
+/api/vagas/stream?ticket=...; o ticket expira em STREAM_TICKET_SEGUNDOS e não
+vale nas outras rotas. Ao reconectar, o cliente pede um ticket novo.
+"""
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+from ..database.banco_dados import SessionLocal
+from ..utils.eventos_vagas import broker
+from ..utils.ocupacao import indice
+from ..utils.security import (
+    STREAM_TICKET_SEGUNDOS, criar_ticket_stream, get_current_empresa, get_current_empresa_stream
+)
+
+router = APIRouter(tags=["vagas"])
+
+INTERVALO_PING = 15      # segundos sem eventos até mandar um ping
+
+
+def _sse(tipo: str, dados) -> str:
+    return f"event: {tipo}\ndata: {json.dumps(jsonable_encoder(dados))}\n\n"
+
+
+def _snapshot(empresa_id: int) -> dict:
+    with SessionLocal() as db:
+        etag, vagas = indice.listar(db, empresa_id)
+    return {"tipo": "snapshot", "etag": etag, "vagas": vagas}
+
+
+async def _eventos(request: Request, assinatura, snapshot: dict):
+    try:
+        yield "retry: 3000\n\n"
+        yield _sse("snapshot", snapshot)
+        while not await request.is_disconnected():
+            try:
+                evento = await asyncio.wait_for(assinatura.fila.get(), timeout=INTERVALO_PING)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield _sse(evento.get("tipo", "mensagem"), evento)
+    finally:
+        broker.cancelar(assinatura)
+
+
+@router.post("/stream/ticket")
+def ticket_stream(empresa_logada=Depends(get_current_empresa)):
+    """Ticket de curta duração para abrir o stream por ?ticket=."""
+    if getattr(empresa_logada, "is_admin", False):
+        raise HTTPException(status_code=400, detail="Stream disponível apenas para empresas")
+    return {"ticket": criar_ticket_stream(empresa_logada.email), "expira_em": STREAM_TICKET_SEGUNDOS}
+
+
+@router.get("/stream")
+async def stream_vagas(request: Request, empresa_logada=Depends(get_current_empresa_stream)):
+    """
+    Eventos de ocupação em tempo real (text/event-stream). Autenticação pelo
+    header Authorization ou por ?ticket= (ver POST /stream/ticket).
+    """
+    if getattr(empresa_logada, "is_admin", False):
+        raise HTTPException(status_code=400, detail="Stream disponível apenas para empresas")
+
+    # Assina antes do snapshot: um evento concorrente pode chegar repetido,
+    # nunca perdido (o cliente trata entrada/saida pelo id da vaga)
+    assinatura = broker.assinar(empresa_logada.id)
+    try:
+        snapshot = await run_in_threadpool(_snapshot, empresa_logada.id)
+    except Exception:
+        broker.cancelar(assinatura)
+        raise
+    return StreamingResponse(
+        _eventos(request, assinatura, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,246 @@
+# src/rmtpark_api/database/agregacoes.py
+"""
+Agregações do dashboard de relatórios em uma única consulta.
+
+No Postgres usa GROUPING SETS (total, mês, dia e hora de uma vez) com o
+top 5 de dias/horas resolvido por row_number(); nos outros dialetos cai
+para um UNION ALL, também em uma ida ao banco.
+
+As colunas de relatorios são DateTime sem fuso e guardam o horário local de
+São Paulo (DataHoraSP converte antes de gravar), então mês/dia/hora saem
+direto delas, sem depender do TimeZone da sessão, e batem com os buckets de
+relatorio_diario; inicio/fim com fuso são convertidos para SP antes de filtrar.
+"""
+from datetime import datetime
+from typing import Optional, Sequence
+
+from sqlalchemy import case, func, literal, select, text, union_all
+from sqlalchemy.orm import Session
+
+from . import modelos
+from ..utils.timezone_utils import para_sp_sem_fuso
+
+TOP_N = 5
+
+# Limites (em minutos) das faixas do histograma de permanência
+FAIXAS_PERMANENCIA = (15, 30, 60, 120, 240, 480, 720, 1440)
+
+# Valores de GROUPING(mes, dia, hora): bit ligado = coluna não agrupada
+NIVEL_MES = 0b011
+NIVEL_DIA = 0b101
+NIVEL_HORA = 0b110
+NIVEL_TOTAL = 0b111
+
+
+def _formatar(dialeto: str, coluna, formato: str):
+    """
+    Formata a data como texto ('mes' = YYYY-MM, 'dia' = YYYY-MM-DD, 'hora' = HH).
+    """
+    if dialeto == "postgresql":
+        padroes = {"mes": "YYYY-MM", "dia": "YYYY-MM-DD", "hora": "HH24"}
+        return func.to_char(coluna, padroes[formato])
+    if dialeto in ("mysql", "mariadb"):
+        padroes = {"mes": "%Y-%m", "dia": "%Y-%m-%d", "hora": "%H"}
+        return func.date_format(coluna, padroes[formato])
+    padroes = {"mes": "%Y-%m", "dia": "%Y-%m-%d", "hora": "%H"}
+    return func.strftime(padroes[formato], coluna)
+
+
+def _base(dialeto: str, empresa_id: int, inicio: Optional[datetime], fim: Optional[datetime]):
+    relatorio = modelos.Relatorio
+    consulta = select(
+        relatorio.valor_pago.label("valor"),
+        literal(1).label("quantidade"),
+        _formatar(dialeto, relatorio.data_hora_saida, "mes").label("mes"),
+        _formatar(dialeto, relatorio.data_hora_entrada, "dia").label("dia"),
+        _formatar(dialeto, relatorio.data_hora_entrada, "hora").label("hora"),
+    ).where(relatorio.empresa_id == empresa_id)
+
+    if inicio:
+        consulta = consulta.where(relatorio.data_hora_entrada >= inicio)
+    if fim:
+        consulta = consulta.where(relatorio.data_hora_entrada <= fim)
+    return consulta.subquery("base")
+
+
+def _base_consolidado(dialeto: str, empresa_id: int, inicio: Optional[datetime], fim: Optional[datetime]):
+    """
+    Mesmo formato de _base, lendo de relatorio_diario (granularidade de dia/hora
+    de entrada; o mês também é o da entrada).
+    """
+    diario = modelos.RelatorioDiario
+    consulta = select(
+        diario.receita.label("valor"),
+        diario.quantidade.label("quantidade"),
+        _formatar(dialeto, diario.dia, "mes").label("mes"),
+        _formatar(dialeto, diario.dia, "dia").label("dia"),
+        diario.hora.label("hora"),
+    ).where(diario.empresa_id == empresa_id, diario.quantidade > 0)
+
+    if inicio:
+        consulta = consulta.where(diario.dia >= inicio.date())
+    if fim:
+        consulta = consulta.where(diario.dia <= fim.date())
+    return consulta.subquery("base")
+
+
+def _consulta_grouping_sets(base):
+    agrupado = (
+        select(
+            base.c.mes,
+            base.c.dia,
+            base.c.hora,
+            func.grouping(base.c.mes, base.c.dia, base.c.hora).label("nivel"),
+            func.sum(base.c.quantidade).label("quantidade"),
+            func.coalesce(func.sum(base.c.valor), 0).label("total"),
+        )
+        .group_by(func.grouping_sets(base.c.mes, base.c.dia, base.c.hora, text("()")))
+        .cte("agrupado")
+    )
+    ranqueado = select(
+        agrupado,
+        func.row_number().over(
+            partition_by=agrupado.c.nivel,
+            order_by=agrupado.c.quantidade.desc(),
+        ).label("posicao"),
+    ).subquery("ranqueado")
+    return select(ranqueado).where(
+        ranqueado.c.nivel.in_([NIVEL_MES, NIVEL_TOTAL]) | (ranqueado.c.posicao <= TOP_N)
+    )
+
+
+def _consulta_union(base):
+    def por(coluna, nivel):
+        colunas = {
+            "mes": base.c.mes if coluna == "mes" else literal(None),
+            "dia": base.c.dia if coluna == "dia" else literal(None),
+            "hora": base.c.hora if coluna == "hora" else literal(None),
+        }
+        consulta = select(
+            colunas["mes"].label("mes"),
+            colunas["dia"].label("dia"),
+            colunas["hora"].label("hora"),
+            literal(nivel).label("nivel"),
+            func.coalesce(func.sum(base.c.quantidade), 0).label("quantidade"),
+            func.coalesce(func.sum(base.c.valor), 0).label("total"),
+        )
+        return consulta.group_by(colunas[coluna]) if coluna else consulta
+
+    return union_all(
+        por(None, NIVEL_TOTAL),
+        por("mes", NIVEL_MES),
+        por("dia", NIVEL_DIA),
+        por("hora", NIVEL_HORA),
+    )
+
+
+def consulta_dashboard(
+    dialeto: str,
+    empresa_id: int,
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    consolidado: bool = False,
+):
+    """Select do dashboard (usado por dashboard_relatorios e pelo scripts/explicar_indices.py)."""
+    montar_base = _base_consolidado if consolidado else _base
+    base = montar_base(dialeto, empresa_id, para_sp_sem_fuso(inicio), para_sp_sem_fuso(fim))
+    return _consulta_grouping_sets(base) if dialeto == "postgresql" else _consulta_union(base)
+
+
+def dashboard_relatorios(
+    db: Session,
+    empresa_id: int,
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    consolidado: bool = False,
+) -> dict:
+    """
+    Totais, receita por mês, dias mais movimentados e horários de pico da
+    empresa no período [inicio, fim] (por data de entrada).
+    Com consolidado=True lê de relatorio_diario, filtrando por dia inteiro.
+    """
+    dialeto = db.get_bind().dialect.name
+    consulta = consulta_dashboard(dialeto, empresa_id, inicio, fim, consolidado)
+
+    total_relatorios, total_receita = 0, 0
+    receita_por_mes, dias_movimentados, horarios_pico = [], [], []
+    for linha in db.execute(consulta).mappings():
+        if linha["nivel"] == NIVEL_TOTAL:
+            total_relatorios, total_receita = linha["quantidade"], linha["total"]
+        elif linha["nivel"] == NIVEL_MES:
+            receita_por_mes.append({"mes": linha["mes"], "total": linha["total"]})
+        elif linha["nivel"] == NIVEL_DIA:
+            dias_movimentados.append({"dia": linha["dia"], "quantidade": linha["quantidade"]})
+        elif linha["nivel"] == NIVEL_HORA:
+            hora = linha["hora"]
+            if isinstance(hora, int):
+                hora = f"{hora:02d}"
+            horarios_pico.append({"hora": hora, "quantidade": linha["quantidade"]})
+
+    receita_por_mes.sort(key=lambda item: item["mes"])
+    dias_movimentados = sorted(dias_movimentados, key=lambda item: -item["quantidade"])[:TOP_N]
+    horarios_pico = sorted(horarios_pico, key=lambda item: -item["quantidade"])[:TOP_N]
+
+    return {
+        "total_relatorios": total_relatorios,
+        "total_receita": total_receita,
+        "receita_por_mes": receita_por_mes,
+        "dias_movimentados": dias_movimentados,
+        "horarios_pico": horarios_pico,
+    }
+
+
+def permanencia_relatorios(
+    db: Session,
+    empresa_id: int,
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    tipo: Optional[str] = None,
+    faixas: Sequence[int] = FAIXAS_PERMANENCIA,
+) -> dict:
+    """
+    Permanência média (minutos) e histograma por faixas de duracao_minutos,
+    agregados no banco em uma consulta. A última faixa ("ate_minutos": None)
+    reúne o que passa do maior limite.
+    """
+    relatorio = modelos.Relatorio
+    base = select(
+        case(
+            *[(relatorio.duracao_minutos <= limite, indice) for indice, limite in enumerate(faixas)],
+            else_=len(faixas),
+        ).label("faixa"),
+        relatorio.duracao_minutos.label("minutos"),
+    ).where(relatorio.empresa_id == empresa_id, relatorio.duracao_minutos.is_not(None))
+    inicio, fim = para_sp_sem_fuso(inicio), para_sp_sem_fuso(fim)
+    if inicio:
+        base = base.where(relatorio.data_hora_entrada >= inicio)
+    if fim:
+        base = base.where(relatorio.data_hora_entrada <= fim)
+    if tipo:
+        base = base.where(relatorio.tipo.ilike(tipo))
+
+    # Agrupa pela coluna da subquery (os parâmetros do CASE não se repetem no GROUP BY)
+    base = base.subquery("base")
+    consulta = select(
+        base.c.faixa,
+        func.count().label("quantidade"),
+        func.sum(base.c.minutos).label("minutos"),
+    ).group_by(base.c.faixa)
+
+    por_faixa = {linha.faixa: linha for linha in db.execute(consulta)}
+    quantidade = sum(linha.quantidade for linha in por_faixa.values())
+    minutos = sum(linha.minutos or 0 for linha in por_faixa.values())
+    limites = list(faixas) + [None]
+    return {
+        "quantidade": quantidade,
+        "permanencia_media_minutos": round(minutos / quantidade, 1) if quantidade else 0,
+        "horas_ocupadas": round(minutos / 60, 1),
+        "histograma": [
+            {
+                "de_minutos": limites[indice - 1] if indice else 0,
+                "ate_minutos": limite,
+                "quantidade": por_faixa[indice].quantidade if indice in por_faixa else 0,
+            }
+            for indice, limite in enumerate(limites)
+        ],
+    }
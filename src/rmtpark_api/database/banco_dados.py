@@ -1,7 +1,11 @@
 # database.py
 import os
+import threading
+import time
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import NullPool, QueuePool
 from dotenv import load_dotenv
 
 # Carrega variáveis do .env
@@ -14,14 +18,166 @@ DB_PORT = os.getenv("DB_PORT", 5432)
 DB_NAME = os.getenv("DB_NAME")
 DB_SSL_MODE = os.getenv("DB_SSL_MODE", "disable")
 
+# Configurações do pool de conexões
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 20))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))          # segundos esperando conexão livre
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))        # segundos até reciclar a conexão
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True") == "True"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))  # 0 = sem limite
+DB_ECHO = os.getenv("DB_ECHO", "False") == "True"
+DB_NULLPOOL = os.getenv("DB_NULLPOOL", "False") == "True"        # usar atrás do PgBouncer
+DB_ASYNC = os.getenv("DB_ASYNC", "False") == "True"              # rotas assíncronas (asyncpg)
+DB_TIMEZONE = os.getenv("DB_TIMEZONE", "America/Sao_Paulo")       # TimeZone da sessão; vazio = padrão do banco
+
 SQLALCHEMY_DATABASE_URL = (
     f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?sslmode={DB_SSL_MODE}"
 )
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+
+# -------------------------------
+# Pool com métricas
+# -------------------------------
+class PoolMetricado(QueuePool):
+    """
+    QueuePool que acumula o tempo gasto esperando uma conexão livre.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock_metricas = threading.Lock()
+        self.total_checkouts = 0
+        self.total_espera = 0.0
+        self.maior_espera = 0.0
+        self.total_timeouts = 0
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            with self._lock_metricas:
+                self.total_timeouts += 1
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            with self._lock_metricas:
+                self.total_checkouts += 1
+                self.total_espera += espera
+                self.maior_espera = max(self.maior_espera, espera)
+
+
+def criar_engine(url: str = SQLALCHEMY_DATABASE_URL, **overrides):
+    """
+    Cria o engine a partir das variáveis de ambiente DB_*.
+    Qualquer parâmetro pode ser sobrescrito via kwargs.
+    """
+    opcoes_sessao = []
+    if DB_TIMEZONE:
+        opcoes_sessao.append(f"-c timezone={DB_TIMEZONE}")
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        opcoes_sessao.append(f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}")
+    connect_args = {"options": " ".join(opcoes_sessao)} if opcoes_sessao else {}
+
+    opcoes = {
+        "echo": DB_ECHO,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+    if DB_NULLPOOL:
+        # PgBouncer já faz o pooling; cada sessão abre/fecha sua conexão
+        opcoes["poolclass"] = NullPool
+    else:
+        opcoes.update(
+            poolclass=PoolMetricado,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    opcoes.update(overrides)
+    return create_engine(url, **opcoes)
+
+
+def criar_engine_async(url: str = ASYNC_DATABASE_URL, **overrides):
+    """
+    Versão asyncpg do criar_engine, com as mesmas variáveis DB_*.
+    """
+    connect_args = {"ssl": DB_SSL_MODE}
+    server_settings = {}
+    if DB_TIMEZONE:
+        server_settings["timezone"] = DB_TIMEZONE
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        server_settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+    if server_settings:
+        connect_args["server_settings"] = server_settings
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, echo=True)
+    opcoes = {
+        "echo": DB_ECHO,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+    if DB_NULLPOOL:
+        # PgBouncer em modo transação não suporta prepared statements nomeados
+        connect_args["statement_cache_size"] = 0
+        opcoes["poolclass"] = NullPool
+    else:
+        opcoes.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    opcoes.update(overrides)
+    return create_async_engine(url, **opcoes)
+
+
+def metricas_pool(engine_alvo=None) -> dict:
+    """
+    Retorna o estado atual do pool (conexões em uso, overflow e tempo de espera).
+    """
+    pool = (engine_alvo or engine).pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+
+    metricas = {
+        "pool": type(pool).__name__,
+        "tamanho": pool.size(),
+        "em_uso": pool.checkedout(),
+        "livres": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+    }
+    if isinstance(pool, PoolMetricado):
+        checkouts = pool.total_checkouts
+        metricas.update(
+            total_checkouts=checkouts,
+            total_timeouts=pool.total_timeouts,
+            espera_media_ms=round(pool.total_espera / checkouts * 1000, 3) if checkouts else 0.0,
+            espera_maxima_ms=round(pool.maior_espera * 1000, 3),
+        )
+    return metricas
+
+
+engine = criar_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = criar_engine_async()
+# expire_on_commit=False: os objetos continuam legíveis após o commit sem novo I/O
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+def insert_dialeto(db, modelo):
+    """
+    insert() do dialeto da sessão, com suporte a on_conflict_do_update (Postgres/SQLite).
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(modelo)
+
 # Dependência para usar nas rotas do FastAPI
 def get_db():
     db = SessionLocal()
@@ -29,3 +185,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependência assíncrona (asyncpg), usada quando DB_ASYNC=True
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
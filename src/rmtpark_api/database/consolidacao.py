@@ -0,0 +1,133 @@
+# src/rmtpark_api/database/consolidacao.py
+"""
+Manutenção da tabela relatorio_diario (consolidado por dia/hora de entrada).
+
+As rotas que gravam ou excluem relatórios chamam registrar_relatorio /
+remover_relatorio antes do commit, então o consolidado anda junto com a
+transação. O bucket é sempre o dia/hora de entrada no horário de São
+Paulo: relatorios guarda SP sem fuso (DataHoraSP), então o valor em memória,
+o valor relido do banco e o CAST/EXTRACT de reconstruir coincidem.
+Para popular a tabela a partir do histórico:
+
+    python -m src.rmtpark_api.database.consolidacao [empresa_id ...]
+"""
+import sys
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import Date, Integer, cast, delete, extract, func, insert, literal_column, select
+from sqlalchemy.orm import Session
+
+from . import modelos
+from .banco_dados import insert_dialeto
+from ..utils import dinheiro
+from ..utils.timezone_utils import para_sp_sem_fuso
+
+RelatorioDiario = modelos.RelatorioDiario
+
+
+def _minutos(entrada: datetime, saida: datetime) -> int:
+    return max(int((saida - entrada).total_seconds() // 60), 0)
+
+
+def _somar(db: Session, relatorios: Iterable[modelos.Relatorio], sinal: int):
+    # Agrupa por bucket em memória: um lote vira um único executemany
+    buckets = {}
+    for relatorio in relatorios:
+        entrada = para_sp_sem_fuso(relatorio.data_hora_entrada)
+        saida = para_sp_sem_fuso(relatorio.data_hora_saida)
+        chave = (relatorio.empresa_id, entrada.date(), entrada.hour,
+                 relatorio.tipo, relatorio.forma_pagamento or "")
+        linha = buckets.setdefault(chave, {"quantidade": 0, "receita": dinheiro.ZERO, "minutos_totais": 0})
+        linha["quantidade"] += sinal
+        linha["receita"] += sinal * dinheiro.quantizar(relatorio.valor_pago)
+        linha["minutos_totais"] += sinal * _minutos(entrada, saida)
+    if not buckets:
+        return
+
+    comando = insert_dialeto(db, RelatorioDiario)
+    comando = comando.on_conflict_do_update(
+        index_elements=["empresa_id", "dia", "hora", "tipo", "forma_pagamento"],
+        set_={
+            "quantidade": RelatorioDiario.quantidade + comando.excluded.quantidade,
+            "receita": RelatorioDiario.receita + comando.excluded.receita,
+            "minutos_totais": RelatorioDiario.minutos_totais + comando.excluded.minutos_totais,
+        },
+    )
+    db.execute(comando, [
+        {"empresa_id": empresa_id, "dia": dia, "hora": hora, "tipo": tipo,
+         "forma_pagamento": forma_pagamento, **valores}
+        for (empresa_id, dia, hora, tipo, forma_pagamento), valores in buckets.items()
+    ])
+
+
+def registrar_relatorio(db: Session, relatorio: modelos.Relatorio):
+    """Soma o relatório ao consolidado (não faz commit)."""
+    _somar(db, [relatorio], 1)
+
+
+def registrar_relatorios(db: Session, relatorios: Iterable[modelos.Relatorio]):
+    """Soma vários relatórios ao consolidado com um único executemany (não faz commit)."""
+    _somar(db, relatorios, 1)
+
+
+def remover_relatorio(db: Session, relatorio: modelos.Relatorio):
+    """Subtrai o relatório do consolidado (não faz commit)."""
+    _somar(db, [relatorio], -1)
+
+
+def reconstruir(db: Session, empresa_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recalcula o consolidado a partir de relatorios (Postgres), para todas as
+    empresas ou só para as informadas. Retorna o número de linhas geradas.
+    Rodar fora do horário de movimento: saídas gravadas durante a reconstrução
+    podem ficar fora do consolidado.
+    """
+    relatorio = modelos.Relatorio
+    empresa_ids = list(empresa_ids or [])
+
+    apagar = delete(RelatorioDiario)
+    origem = select(
+        relatorio.empresa_id,
+        cast(relatorio.data_hora_entrada, Date).label("dia"),
+        cast(extract("hour", relatorio.data_hora_entrada), Integer).label("hora"),
+        relatorio.tipo,
+        func.coalesce(relatorio.forma_pagamento, literal_column("''")).label("forma_pagamento"),
+        func.count().label("quantidade"),
+        func.coalesce(func.sum(relatorio.valor_pago), 0).label("receita"),
+        func.coalesce(
+            func.sum(func.greatest(
+                func.floor(extract("epoch", relatorio.data_hora_saida - relatorio.data_hora_entrada) / 60), 0
+            )), 0
+        ).label("minutos_totais"),
+    )
+    if empresa_ids:
+        apagar = apagar.where(RelatorioDiario.empresa_id.in_(empresa_ids))
+        origem = origem.where(relatorio.empresa_id.in_(empresa_ids))
+    origem = origem.group_by(
+        relatorio.empresa_id,
+        cast(relatorio.data_hora_entrada, Date),
+        extract("hour", relatorio.data_hora_entrada),
+        relatorio.tipo,
+        func.coalesce(relatorio.forma_pagamento, literal_column("''")),
+    )
+
+    db.execute(apagar)
+    resultado = db.execute(
+        insert(RelatorioDiario).from_select(
+            ["empresa_id", "dia", "hora", "tipo", "forma_pagamento",
+             "quantidade", "receita", "minutos_totais"],
+            origem,
+        )
+    )
+    db.commit()
+    return resultado.rowcount
+
+
+if __name__ == "__main__":
+    from .banco_dados import SessionLocal
+
+    ids = [int(arg) for arg in sys.argv[1:]]
+    with SessionLocal() as sessao:
+        total = reconstruir(sessao, ids)
+    print(f"Consolidado reconstruído: {total} linhas")
@@ -0,0 +1,132 @@
+# src/rmtpark_api/database/contadores.py
+"""
+Contadores por empresa (tabela contadores_empresa): numeração de tickets e
+ocupação atual. Admissão de uma vaga é um único upsert condicional; a
+ocupação é reconciliada periodicamente com a tabela vagas. Empresas que já
+tinham vagas antes do contador são semeadas na subida da API
+(semear_contadores), então o upsert só cria do zero contadores de empresas
+sem vagas.
+"""
+from typing import Iterable, List, Optional
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import Session
+
+from . import modelos
+from .banco_dados import insert_dialeto
+
+ContadorEmpresa = modelos.ContadorEmpresa
+Vaga = modelos.Vaga
+
+
+def semear_contadores(db: Session, empresa_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Cria a linha do contador das empresas que têm vagas e ainda não têm
+    contador, partindo do maior numero_interno e das vagas ativas atuais
+    (bancos criados pelo create_all não passam pela migração que semeia).
+    Não faz commit. Retorna quantas linhas foram criadas.
+    """
+    origem = (
+        select(
+            Vaga.empresa_id,
+            func.coalesce(func.max(Vaga.numero_interno), 0),
+            func.count(Vaga.id).filter(Vaga.data_hora_saida.is_(None)),
+        )
+        .where(~select(ContadorEmpresa.empresa_id).where(ContadorEmpresa.empresa_id == Vaga.empresa_id).exists())
+        .group_by(Vaga.empresa_id)
+    )
+    empresa_ids = list(empresa_ids or [])
+    if empresa_ids:
+        origem = origem.where(Vaga.empresa_id.in_(empresa_ids))
+    comando = insert_dialeto(db, ContadorEmpresa).from_select(
+        ["empresa_id", "ultimo_numero_interno", "vagas_ativas"], origem
+    ).on_conflict_do_nothing(index_elements=["empresa_id"])
+    return db.execute(comando).rowcount
+
+
+def admitir_vaga(db: Session, empresa_id: int, limite: Optional[int]) -> Optional[int]:
+    """
+    Ocupa uma vaga e reserva o próximo numero_interno em um só comando
+    (INSERT ... ON CONFLICT DO UPDATE ... WHERE ... RETURNING).
+    Retorna o número do ticket, ou None se o limite do plano foi atingido.
+    A linha do contador fica travada até o commit.
+    """
+    if limite is not None and limite <= 0:
+        return None
+
+    comando = insert_dialeto(db, ContadorEmpresa).values(
+        empresa_id=empresa_id, ultimo_numero_interno=1, vagas_ativas=1
+    )
+    comando = comando.on_conflict_do_update(
+        index_elements=["empresa_id"],
+        set_={
+            "ultimo_numero_interno": ContadorEmpresa.ultimo_numero_interno + 1,
+            "vagas_ativas": ContadorEmpresa.vagas_ativas + 1,
+        },
+        where=(ContadorEmpresa.vagas_ativas < limite) if limite is not None else None,
+    ).returning(ContadorEmpresa.ultimo_numero_interno)
+    return db.execute(comando).scalar_one_or_none()
+
+
+def admitir_vagas(db: Session, empresa_id: int, limite: Optional[int], quantidade: int) -> List[int]:
+    """
+    Versão em lote do admitir_vaga: ocupa até `quantidade` vagas respeitando o
+    limite e devolve os numero_interno reservados (pode devolver menos que o pedido).
+    Três comandos, independente do tamanho do lote.
+    """
+    db.execute(
+        insert_dialeto(db, ContadorEmpresa)
+        .values(empresa_id=empresa_id, ultimo_numero_interno=0, vagas_ativas=0)
+        .on_conflict_do_nothing(index_elements=["empresa_id"])
+    )
+    contador = db.execute(
+        select(ContadorEmpresa.ultimo_numero_interno, ContadorEmpresa.vagas_ativas)
+        .where(ContadorEmpresa.empresa_id == empresa_id)
+        .with_for_update()
+    ).one()
+
+    admitidas = quantidade if limite is None else max(min(quantidade, limite - contador.vagas_ativas), 0)
+    if admitidas:
+        db.execute(
+            update(ContadorEmpresa)
+            .where(ContadorEmpresa.empresa_id == empresa_id)
+            .values(
+                ultimo_numero_interno=ContadorEmpresa.ultimo_numero_interno + admitidas,
+                vagas_ativas=ContadorEmpresa.vagas_ativas + admitidas,
+            )
+        )
+    inicio = contador.ultimo_numero_interno + 1
+    return list(range(inicio, inicio + admitidas))
+
+
+def liberar_vaga(db: Session, empresa_id: int, quantidade: int = 1):
+    """Desocupa vaga(s) da empresa (não faz commit)."""
+    db.execute(
+        update(ContadorEmpresa)
+        .where(ContadorEmpresa.empresa_id == empresa_id)
+        .values(vagas_ativas=case(
+            (ContadorEmpresa.vagas_ativas > quantidade, ContadorEmpresa.vagas_ativas - quantidade),
+            else_=0,
+        ))
+    )
+
+
+def reconciliar_ocupacao(db: Session, empresa_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recalcula vagas_ativas a partir da tabela vagas, criando antes o contador
+    das empresas com vagas que ainda não têm um. Retorna quantas linhas
+    foram criadas ou mudaram.
+    """
+    criadas = semear_contadores(db, empresa_ids)
+    contagem = (
+        select(func.count(Vaga.id))
+        .where(Vaga.empresa_id == ContadorEmpresa.empresa_id, Vaga.data_hora_saida.is_(None))
+        .scalar_subquery()
+    )
+    comando = update(ContadorEmpresa).where(ContadorEmpresa.vagas_ativas != contagem)
+    empresa_ids = list(empresa_ids or [])
+    if empresa_ids:
+        comando = comando.where(ContadorEmpresa.empresa_id.in_(empresa_ids))
+    resultado = db.execute(comando.values(vagas_ativas=contagem))
+    db.commit()
+    return criadas + resultado.rowcount
@@ -0,0 +1,210 @@
+# src/rmtpark_api/database/fila.py
+"""
+Fila de tarefas em segundo plano sobre a tabela tarefas (Postgres).
+
+As rotas chamam enfileirar(db, ...) antes do commit, então a tarefa só
+existe se a transação for confirmada. Os workers pegam tarefas com
+SELECT ... FOR UPDATE SKIP LOCKED (vários workers não disputam a mesma
+linha), marcam como "executando" com um prazo (travada_ate) e executam o
+handler registrado para o tipo. Falha volta para "pendente" com backoff
+exponencial e jitter até max_tentativas, depois fica em "falhou". Se o
+worker morrer no meio, a tarefa é retomada quando o prazo vence.
+
+O worker roda dentro da API (FILA_WORKER=True, tarefa de startup) ou em
+um processo separado (database/fila_worker.py):
+
+    python -m src.rmtpark_api.database.fila_worker
+"""
+import asyncio
+import logging
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import modelos
+
+logger = logging.getLogger(__name__)
+
+FILA_WORKER = os.getenv("FILA_WORKER", "True") == "True"              # worker dentro da API
+FILA_INTERVALO = float(os.getenv("FILA_INTERVALO", 1))                # segundos entre buscas sem tarefa
+FILA_CONCORRENCIA = int(os.getenv("FILA_CONCORRENCIA", 4))            # tarefas por rodada
+FILA_MAX_TENTATIVAS = int(os.getenv("FILA_MAX_TENTATIVAS", 5))
+FILA_BACKOFF = float(os.getenv("FILA_BACKOFF", 5))                    # segundos (primeira repetição)
+FILA_BACKOFF_MAX = float(os.getenv("FILA_BACKOFF_MAX", 600))
+FILA_TRAVA_SEGUNDOS = int(os.getenv("FILA_TRAVA_SEGUNDOS", 300))      # prazo de uma execução
+
+PENDENTE, EXECUTANDO, CONCLUIDA, FALHOU = "pendente", "executando", "concluida", "falhou"
+
+Tarefa = modelos.Tarefa
+Handler = Callable[[dict], Awaitable[Optional[dict]]]
+
+handlers: Dict[str, Handler] = {}
+
+
+def tarefa(tipo: str):
+    """Registra o handler assíncrono de um tipo de tarefa: async def f(payload) -> dict | None."""
+    def registrar(funcao: Handler) -> Handler:
+        handlers[tipo] = funcao
+        return funcao
+    return registrar
+
+
+def agora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enfileirar(
+    db,
+    tipo: str,
+    payload: dict,
+    empresa_id: Optional[int] = None,
+    max_tentativas: int = FILA_MAX_TENTATIVAS,
+    atraso: float = 0,
+) -> modelos.Tarefa:
+    """Adiciona a tarefa à sessão (Session ou AsyncSession); não faz commit."""
+    momento = agora()
+    nova = Tarefa(
+        tipo=tipo,
+        payload=payload,
+        status=PENDENTE,
+        tentativas=0,
+        max_tentativas=max_tentativas,
+        executar_em=momento + timedelta(seconds=atraso),
+        empresa_id=empresa_id,
+        criado_em=momento,
+        atualizado_em=momento,
+    )
+    db.add(nova)
+    return nova
+
+
+def espera_backoff(tentativas: int) -> float:
+    base = min(FILA_BACKOFF * 2 ** max(tentativas - 1, 0), FILA_BACKOFF_MAX)
+    return base * random.uniform(0.5, 1.0)
+
+
+# -------------------------------
+# Operações no banco (sessão síncrona)
+# -------------------------------
+def reivindicar(db: Session, limite: int) -> List[dict]:
+    """
+    Pega até `limite` tarefas vencidas (pendentes ou com prazo de execução
+    estourado) e as marca como executando.
+    """
+    momento = agora()
+    ids = db.execute(
+        select(Tarefa.id)
+        .where(or_(
+            and_(Tarefa.status == PENDENTE, Tarefa.executar_em <= momento),
+            and_(Tarefa.status == EXECUTANDO, Tarefa.travada_ate < momento),
+        ))
+        .order_by(Tarefa.executar_em)
+        .limit(limite)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not ids:
+        db.rollback()
+        return []
+
+    linhas = db.execute(
+        update(Tarefa)
+        .where(Tarefa.id.in_(ids))
+        .values(
+            status=EXECUTANDO,
+            tentativas=Tarefa.tentativas + 1,
+            travada_ate=momento + timedelta(seconds=FILA_TRAVA_SEGUNDOS),
+            atualizado_em=momento,
+        )
+        .returning(Tarefa.id, Tarefa.tipo, Tarefa.payload, Tarefa.tentativas, Tarefa.max_tentativas)
+    ).mappings().all()
+    db.commit()
+    return [dict(linha) for linha in linhas]
+
+
+def concluir(db: Session, tarefa_id: int, resultado: Optional[dict]):
+    db.execute(
+        update(Tarefa)
+        .where(Tarefa.id == tarefa_id)
+        .values(status=CONCLUIDA, resultado=resultado, ultimo_erro=None, travada_ate=None, atualizado_em=agora())
+    )
+    db.commit()
+
+
+def registrar_falha(db: Session, item: dict, erro: str) -> str:
+    """Reagenda com backoff ou marca como falhou. Retorna o novo status."""
+    momento = agora()
+    valores = {"ultimo_erro": erro[:2000], "travada_ate": None, "atualizado_em": momento}
+    if item["tentativas"] >= item["max_tentativas"]:
+        valores["status"] = FALHOU
+    else:
+        valores["status"] = PENDENTE
+        valores["executar_em"] = momento + timedelta(seconds=espera_backoff(item["tentativas"]))
+    db.execute(update(Tarefa).where(Tarefa.id == item["id"]).values(**valores))
+    db.commit()
+    return valores["status"]
+
+
+def tarefas_da_empresa(db: Session, empresa_id: int, limite: int = 20) -> List[modelos.Tarefa]:
+    return db.execute(
+        select(Tarefa).where(Tarefa.empresa_id == empresa_id).order_by(Tarefa.id.desc()).limit(limite)
+    ).scalars().all()
+
+
+# -------------------------------
+# Worker
+# -------------------------------
+def com_sessao(funcao, *args):
+    """Executa funcao(sessao, *args) numa sessão própria (para run_in_threadpool)."""
+    from .banco_dados import SessionLocal
+
+    with SessionLocal() as sessao:
+        return funcao(sessao, *args)
+
+
+async def _executar(item: dict):
+    handler = handlers.get(item["tipo"])
+    try:
+        if handler is None:
+            raise LookupError(f"Nenhum handler para o tipo {item['tipo']!r}")
+        resultado = await handler(item["payload"] or {})
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        status = await run_in_threadpool(com_sessao, registrar_falha, item, f"{type(e).__name__}: {e}")
+        logger.warning(f"Tarefa {item['id']} ({item['tipo']}) falhou na tentativa {item['tentativas']}: {e} -> {status}")
+        return
+    await run_in_threadpool(com_sessao, concluir, item["id"], resultado)
+
+
+async def processar_pendentes(limite: int = FILA_CONCORRENCIA) -> int:
+    """Executa uma rodada de tarefas vencidas em paralelo. Retorna quantas foram pegas."""
+    itens = await run_in_threadpool(com_sessao, reivindicar, limite)
+    if itens:
+        await asyncio.gather(*(_executar(item) for item in itens))
+    return len(itens)
+
+
+def carregar_handlers():
+    # Os módulos de handlers se registram ao serem importados
+    from ..utils import cadastro_empresa  # noqa: F401
+
+
+async def trabalhar(intervalo: float = FILA_INTERVALO):
+    """Loop do worker: busca de novo na hora se a rodada veio cheia, senão espera `intervalo`."""
+    carregar_handlers()
+    while True:
+        try:
+            pegas = await processar_pendentes()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Erro no worker da fila: {e}")
+            pegas = 0
+        if pegas < FILA_CONCORRENCIA:
+            await asyncio.sleep(intervalo)
+
@@ -0,0 +1,33 @@
+# src/rmtpark_api/database/fila_worker.py
+"""
+Worker da fila de tarefas em um processo separado da API (FILA_WORKER=False):
+
+    python -m src.rmtpark_api.database.fila_worker
+
+Fica fora de fila.py de propósito: rodando fila.py como __main__, os
+handlers se registrariam em outra cópia do módulo e o worker não acharia
+nenhum.
+"""
+import asyncio
+import logging
+
+from . import fila
+
+
+async def principal():
+    from ..utils.asaas import cliente
+    from ..utils.email_utils import remetente
+
+    try:
+        await fila.trabalhar()
+    finally:
+        await cliente.fechar()
+        await remetente.fechar()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        asyncio.run(principal())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,216 @@
+# src/rmtpark_api/database/importacao.py
+"""
+Importação em massa de mensalistas a partir de CSV (ou Parquet, com pyarrow).
+
+O arquivo é lido em streaming e processado em lotes: cada linha é validada
+com MensalistaCreate e o lote inteiro vai ao banco em um único executemany
+com upsert na constraint mensalistas_placa_empresa_unique (placa já
+cadastrada = atualiza só as colunas preenchidas no arquivo; coluna ausente
+ou célula vazia mantém o valor atual, então reimportar não zera
+ultimo_pagamento nem volta validade/status ao padrão). Linhas inválidas
+entram no relatório de erros sem derrubar o lote; se o banco recusar o
+lote, ele é refeito linha a linha dentro de savepoints para isolar só as
+linhas problemáticas.
+
+Pela linha de comando:
+
+    python -m src.rmtpark_api.database.importacao <empresa_id> <arquivo.csv|arquivo.parquet>
+"""
+import csv
+import io
+import sys
+from itertools import islice
+from typing import FrozenSet, Iterable, Iterator, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import String
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import modelos
+from .banco_dados import insert_dialeto
+from ..schemas.mensalista import MensalistaCreate
+
+TAMANHO_LOTE = 1000
+MAX_ERROS = 1000          # erros devolvidos no relatório (a contagem continua)
+
+Mensalista = modelos.Mensalista
+CAMPOS = list(MensalistaCreate.model_fields)
+TAMANHOS = {
+    coluna.name: coluna.type.length
+    for coluna in Mensalista.__table__.columns
+    if isinstance(coluna.type, String) and coluna.type.length
+}
+
+
+def ler_csv(arquivo) -> Iterator[dict]:
+    """
+    Linhas do CSV como dicts (cabeçalho obrigatório; aceita ',' ou ';').
+    `arquivo` pode ser texto ou binário (UploadFile.file).
+    """
+    if not isinstance(arquivo, io.TextIOBase):
+        arquivo = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    amostra = arquivo.readline()
+    delimitador = ";" if amostra.count(";") > amostra.count(",") else ","
+    leitor = csv.DictReader(_com_primeira_linha(amostra, arquivo), delimiter=delimitador)
+    for linha in leitor:
+        yield {(chave or "").strip().lower(): valor for chave, valor in linha.items()}
+
+
+def _com_primeira_linha(primeira: str, arquivo):
+    yield primeira
+    yield from arquivo
+
+
+def ler_parquet(arquivo) -> Iterator[dict]:
+    """
+    Linhas do Parquet como dicts, lidas por row group (requer pyarrow).
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Importação de Parquet requer o pacote pyarrow")
+
+    for lote in pq.ParquetFile(arquivo).iter_batches(batch_size=TAMANHO_LOTE):
+        for linha in lote.to_pylist():
+            yield {str(chave).strip().lower(): valor for chave, valor in linha.items()}
+
+
+def _validar(linha: dict) -> Tuple[dict, FrozenSet[str]]:
+    """Mensalista validado e os campos que vieram preenchidos na linha."""
+    # Células vazias contam como ausentes, para valerem os padrões do schema
+    dados = {
+        campo: linha[campo] for campo in CAMPOS
+        if linha.get(campo) not in (None, "")
+    }
+    mensalista = MensalistaCreate.model_validate(dados).model_dump()
+    for campo in ("nome", "cpf", "veiculo", "placa", "cor", "status"):
+        if isinstance(mensalista.get(campo), str):
+            mensalista[campo] = mensalista[campo].strip()
+    for campo, tamanho in TAMANHOS.items():
+        valor = mensalista.get(campo)
+        if isinstance(valor, str) and len(valor) > tamanho:
+            raise ValueError(f"{campo}: máximo de {tamanho} caracteres")
+    return mensalista, frozenset(dados)
+
+
+def _descrever(erro: Exception) -> str:
+    if isinstance(erro, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(p) for p in item['loc'])}: {item['msg']}" for item in erro.errors()
+        )
+    if isinstance(erro, SQLAlchemyError):
+        return str(getattr(erro, "orig", erro)).strip().splitlines()[0]
+    return str(erro)
+
+
+def _upsert(db: Session, informados: FrozenSet[str]):
+    """
+    Insert com upsert que, na placa já cadastrada, só atualiza os campos
+    informados (os demais ficariam com o padrão do schema).
+    """
+    comando = insert_dialeto(db, Mensalista)
+    alvo = (
+        {"constraint": "mensalistas_placa_empresa_unique"}
+        if db.get_bind().dialect.name == "postgresql"
+        else {"index_elements": ["placa", "empresa_id"]}
+    )
+    atualizar = [campo for campo in CAMPOS if campo in informados and campo != "placa"]
+    if not atualizar:
+        return comando.on_conflict_do_nothing(**alvo)
+    return comando.on_conflict_do_update(
+        **alvo, set_={campo: comando.excluded[campo] for campo in atualizar}
+    )
+
+
+def _gravar_lote(db: Session, linhas: List[tuple], resumo: dict):
+    # Um executemany por conjunto de campos informados (normalmente um só)
+    grupos = {}
+    for numero, valores, informados in linhas:
+        grupos.setdefault(informados, []).append((numero, valores))
+    for informados, grupo in grupos.items():
+        _gravar_grupo(db, _upsert(db, informados), grupo, resumo)
+
+
+def _gravar_grupo(db: Session, comando, linhas: List[tuple], resumo: dict):
+    try:
+        with db.begin_nested():
+            db.execute(comando, [valores for _, valores in linhas])
+        resumo["importados"] += len(linhas)
+        return
+    except SQLAlchemyError:
+        pass
+
+    # O banco recusou o lote: refaz linha a linha para achar as culpadas
+    for numero, valores in linhas:
+        try:
+            with db.begin_nested():
+                db.execute(comando, [valores])
+            resumo["importados"] += 1
+        except SQLAlchemyError as e:
+            _registrar_erro(resumo, numero, _descrever(e))
+
+
+def _registrar_erro(resumo: dict, numero: int, mensagem: str):
+    resumo["total_erros"] += 1
+    if len(resumo["erros"]) < MAX_ERROS:
+        resumo["erros"].append({"linha": numero, "erro": mensagem})
+
+
+def importar_mensalistas(
+    db: Session,
+    empresa_id: int,
+    linhas: Iterable[dict],
+    tamanho_lote: int = TAMANHO_LOTE,
+) -> dict:
+    """
+    Valida e grava (upsert por placa) as linhas em lotes, com um commit por
+    lote. Retorna {"linhas", "importados", "repetidos", "total_erros", "erros"};
+    a linha dos erros é contada a partir de 1, sem o cabeçalho.
+    """
+    resumo = {"linhas": 0, "importados": 0, "repetidos": 0, "total_erros": 0, "erros": []}
+    numeradas = enumerate(linhas, start=1)
+    while True:
+        bloco = list(islice(numeradas, tamanho_lote))
+        if not bloco:
+            break
+        resumo["linhas"] += len(bloco)
+
+        # Placa repetida no mesmo lote: vale a última (o upsert não pode
+        # tocar a mesma linha duas vezes no mesmo comando)
+        validas = {}
+        for numero, linha in bloco:
+            try:
+                mensalista, informados = _validar(linha)
+            except (ValidationError, ValueError) as e:
+                _registrar_erro(resumo, numero, _descrever(e))
+                continue
+            if mensalista["placa"] in validas:
+                resumo["repetidos"] += 1
+            validas[mensalista["placa"]] = (numero, {**mensalista, "empresa_id": empresa_id}, informados)
+
+        _gravar_lote(db, list(validas.values()), resumo)
+        db.commit()
+    return resumo
+
+
+def ler_arquivo(arquivo, nome: str) -> Iterator[dict]:
+    """Escolhe o leitor pela extensão do arquivo."""
+    if nome.lower().endswith(".parquet"):
+        return ler_parquet(arquivo)
+    return ler_csv(arquivo)
+
+
+if __name__ == "__main__":
+    from .banco_dados import SessionLocal
+
+    if len(sys.argv) != 3:
+        print("Uso: python -m src.rmtpark_api.database.importacao <empresa_id> <arquivo>")
+        sys.exit(1)
+    empresa, caminho = int(sys.argv[1]), sys.argv[2]
+    with open(caminho, "rb") as arquivo, SessionLocal() as sessao:
+        resultado = importar_mensalistas(sessao, empresa, ler_arquivo(arquivo, caminho))
+    print(f"{resultado['importados']} de {resultado['linhas']} linhas importadas, "
+          f"{resultado['total_erros']} com erro")
+    for erro in resultado["erros"]:
+        print(f"  linha {erro['linha']}: {erro['erro']}")
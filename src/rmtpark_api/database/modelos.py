@@ -1,11 +1,14 @@
 # src/rmtpark_api/database/modelos.py
 from sqlalchemy import (
-    Column, Integer, String, Boolean, ARRAY, Float, ForeignKey, DateTime, JSON, UniqueConstraint
+    Column, Integer, String, Boolean, ARRAY, ForeignKey, DateTime, JSON, UniqueConstraint,
+    DDL, Index, event, Date, BigInteger
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from src.rmtpark_api.database.banco_dados import Base
+from src.rmtpark_api.utils.dinheiro import Dinheiro, de_texto
+from src.rmtpark_api.utils.timezone_utils import DataHoraSP
 
 class Empresa(Base):
     __tablename__ = "empresas"
@@ -21,6 +24,7 @@ class Empresa(Base):
     # Campos do plano
     plano_titulo = Column(String(100), nullable=False)
     plano_preco = Column(String(20), nullable=False)
+    plano_valor = Column(Dinheiro, nullable=True)     # plano_preco já convertido ("R$ 49,90/mês" -> 49.90)
     plano_recursos = Column(ARRAY(String))
     plano_destaque = Column(Boolean, default=False)
 
@@ -28,6 +32,7 @@ class Empresa(Base):
     pagamento_id = Column(String, nullable=True)
     pagamento_status = Column(String, nullable=True)
     pagamento_link = Column(String, nullable=True)
+    asaas_cliente_id = Column(String(50), nullable=True)
     data_expiracao = Column(DateTime, nullable=True)
 
 
@@ -72,6 +77,7 @@ class Empresa(Base):
     def plano(self, value: dict):
         self.plano_titulo = value.get("titulo", "")
         self.plano_preco = value.get("preco", "")
+        self.plano_valor = de_texto(self.plano_preco)
         self.plano_recursos = value.get("recursos", [])
         self.plano_destaque = value.get("destaque", False)
 
@@ -85,12 +91,70 @@ class Vaga(Base):
     data_hora = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     data_hora_saida = Column(DateTime(timezone=True), nullable=True)
     duracao = Column(String(50), nullable=True)
-    valor_pago = Column(Float, nullable=True)
+    valor_pago = Column(Dinheiro, nullable=True)
     forma_pagamento = Column(String(20), nullable=True)
     empresa_id = Column(Integer, ForeignKey("empresas.id"), nullable=False)
     numero_interno = Column(Integer, nullable=False)
     empresa = relationship("Empresa", back_populates="vagas")
 
+    __table_args__ = (
+        Index("ix_vagas_empresa_saida", "empresa_id", "data_hora_saida"),
+        UniqueConstraint('empresa_id', 'numero_interno', name='vagas_empresa_numero_interno_unique'),
+    )
+
+
+class ContadorEmpresa(Base):
+    """
+    Contadores por empresa atualizados com UPDATE ... RETURNING
+    (próximo numero_interno e vagas ativas), sem varrer a tabela de vagas.
+    Ver database/contadores.py.
+    """
+    __tablename__ = "contadores_empresa"
+
+    empresa_id = Column(Integer, ForeignKey("empresas.id", ondelete="CASCADE"), primary_key=True)
+    ultimo_numero_interno = Column(Integer, nullable=False, default=0)
+    vagas_ativas = Column(Integer, nullable=False, default=0)
+
+
+class EventoLote(Base):
+    """
+    Eventos de entrada/saída recebidos em lote (terminais offline), por chave
+    de idempotência. Reenvios da mesma chave devolvem o resultado gravado.
+    """
+    __tablename__ = "eventos_lote"
+
+    empresa_id = Column(Integer, ForeignKey("empresas.id", ondelete="CASCADE"), primary_key=True)
+    chave = Column(String(100), primary_key=True)
+    tipo_evento = Column(String(10), nullable=False)
+    resultado = Column(JSON, nullable=True)
+    criado_em = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class Tarefa(Base):
+    """
+    Fila de tarefas em segundo plano (database/fila.py). Os workers pegam as
+    pendentes com FOR UPDATE SKIP LOCKED; falhas voltam para pendente com
+    backoff até max_tentativas.
+    """
+    __tablename__ = "tarefas"
+    __table_args__ = (
+        Index("ix_tarefas_status_executar_em", "status", "executar_em"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tipo = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String(20), nullable=False, default="pendente")   # pendente | executando | concluida | falhou
+    tentativas = Column(Integer, nullable=False, default=0)
+    max_tentativas = Column(Integer, nullable=False, default=5)
+    executar_em = Column(DateTime(timezone=True), nullable=False)
+    travada_ate = Column(DateTime(timezone=True), nullable=True)      # prazo do worker que está executando
+    ultimo_erro = Column(String, nullable=True)
+    resultado = Column(JSON, nullable=True)
+    empresa_id = Column(Integer, ForeignKey("empresas.id", ondelete="CASCADE"), nullable=True, index=True)
+    criado_em = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    atualizado_em = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
 
 class Relatorio(Base):
     __tablename__ = "relatorios"
@@ -98,10 +162,11 @@ class Relatorio(Base):
     id = Column(Integer, primary_key=True, index=True)
     placa = Column(String(20), nullable=False)
     tipo = Column(String(20), nullable=False)
-    data_hora_entrada = Column(DateTime, nullable=False)
-    data_hora_saida = Column(DateTime, nullable=False)
+    data_hora_entrada = Column(DataHoraSP, nullable=False)     # horário de SP, sem fuso
+    data_hora_saida = Column(DataHoraSP, nullable=False)
     duracao = Column(String(50), nullable=False)
-    valor_pago = Column(Float, nullable=False)
+    duracao_minutos = Column(Integer, nullable=True)     # mesma duração de "duracao", em minutos
+    valor_pago = Column(Dinheiro, nullable=False)
     forma_pagamento = Column(String(20), nullable=True)
     status_pagamento = Column(String(20), nullable=False)
     empresa_id = Column(Integer, ForeignKey("empresas.id"), nullable=False)
@@ -109,16 +174,58 @@ class Relatorio(Base):
     empresa = relationship("Empresa", back_populates="relatorios")
 
 
+# Índices dos filtros de listar_relatorios / dashboard
+Index("ix_relatorios_empresa_saida", Relatorio.empresa_id, Relatorio.data_hora_saida.desc())
+Index("ix_relatorios_empresa_entrada", Relatorio.empresa_id, Relatorio.data_hora_entrada)
+# Busca de placa por substring (ILIKE '%...%') via trigramas
+Index(
+    "ix_relatorios_placa_trgm", Relatorio.placa,
+    postgresql_using="gin", postgresql_ops={"placa": "gin_trgm_ops"},
+)
+event.listen(
+    Base.metadata, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+class RelatorioDiario(Base):
+    """
+    Consolidado de relatórios por empresa, dia/hora de entrada, tipo e forma
+    de pagamento. Mantido em database/consolidacao.py na mesma transação
+    que grava ou exclui o relatório.
+    """
+    __tablename__ = "relatorio_diario"
+    __table_args__ = (
+        UniqueConstraint(
+            'empresa_id', 'dia', 'hora', 'tipo', 'forma_pagamento',
+            name='relatorio_diario_bucket_unique'
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    empresa_id = Column(Integer, ForeignKey("empresas.id", ondelete="CASCADE"), nullable=False)
+    dia = Column(Date, nullable=False)
+    hora = Column(Integer, nullable=False)
+    tipo = Column(String(20), nullable=False)
+    forma_pagamento = Column(String(20), nullable=False, default="")   # "" quando não informado
+    quantidade = Column(Integer, nullable=False, default=0)
+    receita = Column(Dinheiro(14), nullable=False, default=0)
+    minutos_totais = Column(BigInteger, nullable=False, default=0)
+
+
 class Configuracao(Base):
     __tablename__ = "configuracoes"
 
     id = Column(Integer, primary_key=True, index=True)
     empresa_id = Column(Integer, ForeignKey("empresas.id"), unique=True)
-    valor_hora = Column(Float, default=10.0)
-    valor_diaria = Column(Float, default=0.0)
-    valor_mensalista = Column(Float, default=0.0)
+    valor_hora = Column(Dinheiro, default=10)
+    valor_diaria = Column(Dinheiro, default=0)
+    valor_mensalista = Column(Dinheiro, default=0)
     arredondamento = Column(Integer, default=15)
     forma_pagamento = Column(String(20), default="Pix")
+    # Regras opcionais do motor de tarifas (utils/tarifas.py)
+    faixas = Column(JSON, nullable=True)      # [{"ate_minutos": 60, "valor_hora": 8.0}, ...]
+    horarios = Column(JSON, nullable=True)    # [{"inicio": "22:00", "fim": "06:00", "valor_hora": 5.0}, ...]
 
     empresa = relationship("Empresa", back_populates="configuracao")
 
@@ -0,0 +1,153 @@
+# src/rmtpark_api/database/simulacao.py
+"""
+Simulação de tarifas ("e se") sobre o histórico de relatorios da empresa.
+
+O histórico do período é lido uma vez (cursor no servidor, só as colunas
+necessárias) para arrays NumPy e repassado pelo motor de tarifas em lote
+para cada tarifa candidata. A receita simulada é comparada com o valor
+efetivamente pago, por mês (da saída) e por hora (da entrada), no mesmo
+critério do dashboard.
+
+Resultados ficam em cache por (empresa, hash da tarifa, período) durante
+SIMULACAO_CACHE_TTL segundos.
+"""
+import hashlib
+import json
+import os
+from dataclasses import asdict
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import modelos
+from ..utils import dinheiro, tarifas
+from ..utils.cache_empresa import CacheTTL
+from ..utils.timezone_utils import para_sp_sem_fuso
+
+SIMULACAO_CACHE_TTL = int(os.getenv("SIMULACAO_CACHE_TTL", 600))      # segundos
+LOTE_LEITURA = 10000
+
+resultados_cache = CacheTTL(max_itens=1000, ttl=SIMULACAO_CACHE_TTL)
+
+
+def hash_tarifa(tarifa: tarifas.Tarifa) -> str:
+    bruto = json.dumps(asdict(tarifa), sort_keys=True, default=str)
+    return hashlib.sha256(bruto.encode()).hexdigest()[:16]
+
+
+def _carregar_historico(db: Session, empresa_id: int, inicio: Optional[datetime], fim: Optional[datetime]) -> dict:
+    np = tarifas.numpy_obrigatorio()
+    relatorio = modelos.Relatorio
+    consulta = select(
+        relatorio.placa, relatorio.tipo, relatorio.data_hora_entrada,
+        relatorio.data_hora_saida, relatorio.valor_pago,
+    ).where(relatorio.empresa_id == empresa_id)
+    if inicio:
+        consulta = consulta.where(relatorio.data_hora_entrada >= inicio)
+    if fim:
+        consulta = consulta.where(relatorio.data_hora_entrada <= fim)
+
+    placas, mensalista, entradas, saidas, pagos = [], [], [], [], []
+    for placa, tipo, entrada, saida, valor in db.execute(consulta.execution_options(yield_per=LOTE_LEITURA)):
+        placas.append(placa)
+        mensalista.append((tipo or "").lower() == "mensalista")
+        entradas.append(para_sp_sem_fuso(entrada))
+        saidas.append(para_sp_sem_fuso(saida))
+        pagos.append(dinheiro.centavos(valor))
+
+    return {
+        "placas": np.array(placas, dtype=object),
+        "mensalista": np.array(mensalista, dtype=bool),
+        "entradas": np.array(entradas, dtype="datetime64[us]"),
+        "saidas": np.array(saidas, dtype="datetime64[us]"),
+        "pagos": np.array(pagos, dtype=np.int64),
+    }
+
+
+def _simular(historico: dict, tarifa: tarifas.Tarifa) -> dict:
+    np = tarifas.numpy_obrigatorio()
+    mensalista = historico["mensalista"]
+    simulado = np.zeros(len(mensalista), dtype=np.int64)
+
+    diaristas = ~mensalista
+    if diaristas.any():
+        _, precos = tarifas.precos_diarista_lote(
+            tarifa, historico["entradas"][diaristas], historico["saidas"][diaristas]
+        )
+        simulado[diaristas] = precos
+    if mensalista.any():
+        simulado[mensalista] = tarifas.mensalidades_lote(
+            tarifa, historico["placas"][mensalista], historico["saidas"][mensalista]
+        )
+
+    atual = historico["pagos"]
+    meses = historico["saidas"].astype("datetime64[M]")
+    rotulos_mes, indice_mes = np.unique(meses, return_inverse=True)
+    horas = ((historico["entradas"] - historico["entradas"].astype("datetime64[D]"))
+             // np.timedelta64(1, "h")).astype(np.int64)
+
+    def agrupar(indices, tamanho):
+        return (
+            np.bincount(indices, weights=simulado, minlength=tamanho).astype(np.int64),
+            np.bincount(indices, weights=atual, minlength=tamanho).astype(np.int64),
+            np.bincount(indices, minlength=tamanho),
+        )
+
+    def linha(chave, valor, receita, receita_atual, quantidade):
+        return {
+            chave: valor,
+            "quantidade": int(quantidade),
+            "receita": float(dinheiro.reais(receita)),
+            "receita_atual": float(dinheiro.reais(receita_atual)),
+            "delta": float(dinheiro.reais(receita - receita_atual)),
+        }
+
+    por_mes = [
+        linha("mes", str(rotulo), *valores)
+        for rotulo, *valores in zip(rotulos_mes, *agrupar(indice_mes, len(rotulos_mes)))
+    ]
+    por_hora = [
+        linha("hora", f"{hora:02d}", *valores)
+        for hora, *valores in zip(range(24), *agrupar(horas, 24))
+        if valores[2]
+    ]
+    total, total_atual = int(simulado.sum()), int(atual.sum())
+    return {
+        "quantidade": int(len(simulado)),
+        "receita": float(dinheiro.reais(total)),
+        "receita_atual": float(dinheiro.reais(total_atual)),
+        "delta": float(dinheiro.reais(total - total_atual)),
+        "por_mes": por_mes,
+        "por_hora": por_hora,
+    }
+
+
+def simular_tarifas(
+    db: Session,
+    empresa_id: int,
+    candidatas: List[tarifas.Tarifa],
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+) -> List[dict]:
+    """
+    Receita de cada tarifa candidata sobre os relatórios do período (por data
+    de entrada), com a diferença para o que foi cobrado. O histórico só é lido
+    se alguma candidata não estiver em cache.
+    """
+    inicio, fim = para_sp_sem_fuso(inicio), para_sp_sem_fuso(fim)
+    periodo = (inicio.isoformat() if inicio else None, fim.isoformat() if fim else None)
+
+    resultados, historico = [], None
+    for tarifa in candidatas:
+        assinatura = hash_tarifa(tarifa)
+        chave = (empresa_id, assinatura, periodo)
+        resultado = resultados_cache.get(chave)
+        if resultado is None:
+            if historico is None:
+                historico = _carregar_historico(db, empresa_id, inicio, fim)
+            resultado = {"tarifa_hash": assinatura, **_simular(historico, tarifa)}
+            resultados_cache.set(chave, resultado)
+        resultados.append(resultado)
+    return resultados
@@ -1,23 +1,10 @@
 from pydantic import BaseModel, EmailStr, Field, field_validator
-from pwdlib import PasswordHash
 from typing import List
 from validate_docbr import CNPJ
+from .tarefa import TarefaOut
 
-# Configuração do hash de senha
-password_hash = PasswordHash.recommended()
-
-
-from passlib.context import CryptContext
-
-# Suporte a Argon2
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
+# Hash de senha (argon2id no pool de utils/auth_utils.py)
+from ..utils.auth_utils import hash_password, verify_password  # noqa: F401
 
 
 # -------------------------------
@@ -59,13 +46,9 @@ class EmpresaBase(BaseModel):
     }
 
 
-# Modelo para criação de empresa (aplica hash da senha)
+# Modelo para criação de empresa (a rota gera o hash da senha no pool)
 class EmpresaCreate(EmpresaBase):
-
-    @field_validator("senha")
-    @classmethod
-    def hash_senha(cls, value: str) -> str:
-        return hash_password(value)
+    pass
 
 
 # Modelo para retorno (sem expor senha)
@@ -81,3 +64,8 @@ class EmpresaOut(BaseModel):
     model_config = {
         "from_attributes": True
     }
+
+
+# Retorno do cadastro: cobrança e e-mail seguem pela fila de tarefas
+class EmpresaCriada(EmpresaOut):
+    tarefas: List[TarefaOut] = []
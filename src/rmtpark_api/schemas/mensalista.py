@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from src.rmtpark_api.utils.timezone_utils import agora_sp
 
 
@@ -32,3 +32,16 @@ class Mensalista(MensalistaBase):
         "from_attributes": True,
         "arbitrary_types_allowed": True
     }
+
+
+class ErroImportacao(BaseModel):
+    linha: int
+    erro: str
+
+
+class ImportacaoResultado(BaseModel):
+    linhas: int
+    importados: int
+    repetidos: int = 0          # placa repetida no mesmo lote (vale a última)
+    total_erros: int
+    erros: List[ErroImportacao] = []
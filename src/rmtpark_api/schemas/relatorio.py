@@ -1,5 +1,7 @@
 from datetime import datetime
+from typing import List, Optional
 from pydantic import BaseModel, Field
+from src.rmtpark_api.schemas.vaga import FaixaSchema, HorarioSchema
 from src.rmtpark_api.utils.timezone_utils import agora_sp
 
 
@@ -9,6 +11,7 @@ class RelatorioBase(BaseModel):
     data_hora_entrada: datetime = Field(default_factory=agora_sp)
     data_hora_saida: datetime = Field(default_factory=agora_sp)
     duracao: str | None = None
+    duracao_minutos: int | None = None
     valor_pago: float | None = None
     forma_pagamento: str | None = None
     status_pagamento: str | None = None
@@ -30,3 +33,44 @@ class RelatorioResponse(RelatorioBase):
         "from_attributes": True,
         "arbitrary_types_allowed": True
     }
+
+
+class TarifaSimulacao(BaseModel):
+    """
+    Tarifa candidata no formato do ConfigSchema; campos omitidos usam a configuração atual.
+    """
+    nome: Optional[str] = None
+    valor_hora: Optional[float] = Field(None, alias="valorHora", ge=0)
+    valor_diaria: Optional[float] = Field(None, alias="valorDiaria", ge=0)
+    valor_mensalista: Optional[float] = Field(None, alias="valorMensalista", ge=0)
+    arredondamento: Optional[int] = Field(None, gt=0)
+    faixas: Optional[List[FaixaSchema]] = None
+    horarios: Optional[List[HorarioSchema]] = None
+
+    model_config = {"validate_by_name": True}
+
+
+class SimulacaoRequest(BaseModel):
+    tarifas: List[TarifaSimulacao] = Field(..., min_length=1, max_length=10)
+    inicio: Optional[datetime] = None
+    fim: Optional[datetime] = None
+
+
+class SimulacaoGrupo(BaseModel):
+    mes: Optional[str] = None
+    hora: Optional[str] = None
+    quantidade: int
+    receita: float
+    receita_atual: float
+    delta: float
+
+
+class SimulacaoResultado(BaseModel):
+    nome: Optional[str] = None
+    tarifa_hash: str
+    quantidade: int
+    receita: float
+    receita_atual: float
+    delta: float
+    por_mes: List[SimulacaoGrupo]
+    por_hora: List[SimulacaoGrupo]
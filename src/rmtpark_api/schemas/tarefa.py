@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+
+class TarefaOut(BaseModel):
+    id: int
+    tipo: str
+    status: str                     # pendente | executando | concluida | falhou
+    tentativas: int
+    max_tentativas: int
+    executar_em: datetime
+    atualizado_em: Optional[datetime] = None
+
+    model_config = {
+        "from_attributes": True
+    }
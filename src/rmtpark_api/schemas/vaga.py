@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, time
+from typing import List, Literal, Optional
 from src.rmtpark_api.utils.timezone_utils import agora_sp
 
 
@@ -82,14 +82,60 @@ class RelatorioResponse(BaseModel):
     }
 
 
+class FaixaSchema(BaseModel):
+    ate_minutos: Optional[int] = Field(None, alias="ateMinutos", gt=0)   # None = restante
+    valor_hora: float = Field(..., alias="valorHora", ge=0)
+
+    model_config = {"validate_by_name": True}
+
+
+class HorarioSchema(BaseModel):
+    inicio: time
+    fim: time
+    valor_hora: float = Field(..., alias="valorHora", ge=0)
+
+    model_config = {"validate_by_name": True}
+
+
 class ConfigSchema(BaseModel):
     valor_hora: float = Field(..., alias="valorHora")
     valor_diaria: float = Field(..., alias="valorDiaria")
     valor_mensalista: float = Field(..., alias="valorMensalista")
     arredondamento: int
     forma_pagamento: str = Field(..., alias="formaPagamento")
+    faixas: Optional[List[FaixaSchema]] = None
+    horarios: Optional[List[HorarioSchema]] = None
 
     model_config = {
         "from_attributes": True,
         "validate_by_name": True
     }
+
+
+class EventoLoteSchema(BaseModel):
+    chave: str = Field(..., min_length=1, max_length=100)   # idempotência, gerada pelo terminal
+    evento: Literal["entrada", "saida"]
+    placa: Optional[str] = None
+    tipo: Optional[str] = None                               # obrigatório na entrada
+    data_hora: datetime = Field(default_factory=agora_sp)    # entrada ou saída, conforme o evento
+    vaga_id: Optional[int] = None                            # saída: vaga_id ou placa
+    forma_pagamento: Optional[str] = None
+
+    model_config = {
+        "from_attributes": True,
+        "arbitrary_types_allowed": True
+    }
+
+
+class LoteRequest(BaseModel):
+    eventos: List[EventoLoteSchema] = Field(..., max_length=5000)
+
+
+class ResultadoEventoLote(BaseModel):
+    chave: str
+    status: Literal["ok", "erro", "duplicado", "em_processamento"]
+    vaga_id: Optional[int] = None
+    numero_interno: Optional[int] = None
+    relatorio_id: Optional[int] = None
+    valor_pago: Optional[float] = None
+    erro: Optional[str] = None
@@ -1,61 +1,229 @@
-import requests, os
+"""
+Cliente assíncrono da API do Asaas (cobrança das assinaturas).
+
+Um único httpx.AsyncClient por processo mantém as conexões keep-alive com o
+Asaas; um semáforo limita as chamadas simultâneas e cada chamada tem timeout.
+Falhas em que a requisição certamente não foi processada (erro de conexão,
+429, 502/503/504) são repetidas com backoff exponencial e jitter; timeout de
+leitura não é repetido, porque o POST pode ter sido aceito.
+
+Depois de ASAAS_CIRCUITO_FALHAS falhas seguidas o circuito abre e as chamadas
+falham na hora (503) durante ASAAS_CIRCUITO_ESPERA segundos; passado esse
+tempo uma chamada de teste decide se ele fecha de novo.
+
+Para testes, ASAAS_API_URL pode apontar para um servidor local, ou um
+ClienteAsaas pode ser criado com um transport do httpx.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+import httpx
 from fastapi import HTTPException
+
 from ..database.modelos import Empresa
-from datetime import datetime, timedelta
+from . import dinheiro
 
+logger = logging.getLogger(__name__)
 
 # === CONFIGURAÇÃO ===
 ASAAS_API_KEY = os.getenv("ASAAS_API_KEY")  # pega do .env
-ASAAS_API_URL = "https://sandbox.asaas.com/api/v3/"
-
+if not ASAAS_API_KEY:
+    raise ValueError("Variável de ambiente ASAAS_API_KEY não encontrada")
 if not ASAAS_API_KEY.startswith("$"):
     ASAAS_API_KEY = "$" + ASAAS_API_KEY
 
-HEADERS = {
-    "access_token": ASAAS_API_KEY,
-    "Content-Type": "application/json"
-}
+ASAAS_API_URL = os.getenv("ASAAS_API_URL") or "https://sandbox.asaas.com/api/v3/"
+ASAAS_TIMEOUT = float(os.getenv("ASAAS_TIMEOUT", 10))                  # segundos por requisição
+ASAAS_MAX_CONEXOES = int(os.getenv("ASAAS_MAX_CONEXOES", 20))
+ASAAS_CONCORRENCIA = int(os.getenv("ASAAS_CONCORRENCIA", 10))          # chamadas simultâneas
+ASAAS_TENTATIVAS = int(os.getenv("ASAAS_TENTATIVAS", 3))
+ASAAS_BACKOFF = float(os.getenv("ASAAS_BACKOFF", 0.5))                 # segundos (base do backoff)
+ASAAS_CIRCUITO_FALHAS = int(os.getenv("ASAAS_CIRCUITO_FALHAS", 5))
+ASAAS_CIRCUITO_ESPERA = float(os.getenv("ASAAS_CIRCUITO_ESPERA", 30))  # segundos com o circuito aberto
+
+STATUS_REPETIVEIS = {429, 502, 503, 504}
+ERROS_REPETIVEIS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
 
-def criar_cliente_asaas(empresa: dict):
+
+class AsaasIndisponivel(Exception):
+    """Asaas fora do ar (circuito aberto ou tentativas esgotadas)."""
+
+
+class Circuito:
     """
-    Cria um cliente no Asaas Sandbox.
-    empresa: dict com chaves 'nome', 'email', 'telefone', 'cpfCnpj'
+    Circuit breaker simples: fechado -> aberto após `limite` falhas seguidas;
+    aberto -> meio-aberto após `espera` segundos (uma chamada de teste).
     """
-    url = ASAAS_API_URL + "customers"
-    payload = {
-        "name": empresa["nome"],
-        "email": empresa["email"],
-        "phone": empresa["telefone"],
-        "cpfCnpj": empresa["cnpj"],
-        "externalReference": str(empresa.get("id", ""))  # opcional, para vincular ao seu sistema
-    }
-
-    response = requests.post(url, json=payload, headers=HEADERS)
-    data = response.json()
-
-    if response.status_code != 200 and response.status_code != 201:
-        raise HTTPException(status_code=500, detail=f"Erro ao criar cliente Asaas: {data}")
-
-    return data["id"]  # retorna o ID do cliente no Asaas
-
-def criar_link_pagamento_asaas(cliente_id, empresa: Empresa, dias_vencimento=5):
-    valor = float(empresa.plano_preco.replace("R$ ", "").replace("/mês", "").replace(",", "."))
-    due_date = (datetime.now() + timedelta(days=dias_vencimento)).strftime("%Y-%m-%d")
-    payload = {
-        "customer": cliente_id,
-        "billingType": "CREDIT_CARD",
-        "value": valor,
-        "dueDate": due_date,
-        "description": f"Assinatura do plano {empresa.plano_titulo}",
-        "externalReference": str(empresa.id),
-        "notificationUrl": "https://seusite.com/notificacao-pagamento",
-        "billingTypeOptions": ["BOLETO", "CREDIT_CARD", "PIX"]
-    }
-    response = requests.post(f"{ASAAS_API_URL}/payments", headers=HEADERS, json=payload)
-    data = response.json()
-    if response.status_code not in [200, 201]:
-        raise HTTPException(status_code=500, detail=f"Erro Asaas: {data}")
-
-    # Retorna ID da cobrança e link do checkout (sandbox pode gerar link diferente)
-    checkout_link = f"https://sandbox.asaas.com/payment/{data['id']}"
-    return data.get("id"), data.get("status"), checkout_link
+
+    def __init__(self, limite: int = ASAAS_CIRCUITO_FALHAS, espera: float = ASAAS_CIRCUITO_ESPERA):
+        self.limite = limite
+        self.espera = espera
+        self.falhas = 0
+        self.aberto_ate: Optional[float] = None
+        self._testando = False
+
+    @property
+    def estado(self) -> str:
+        if self.aberto_ate is None:
+            return "fechado"
+        return "aberto" if time.monotonic() < self.aberto_ate else "meio-aberto"
+
+    def liberar(self):
+        estado = self.estado
+        if estado == "aberto" or (estado == "meio-aberto" and self._testando):
+            raise AsaasIndisponivel("Circuito do Asaas aberto")
+        if estado == "meio-aberto":
+            self._testando = True
+
+    def sucesso(self):
+        self.falhas = 0
+        self.aberto_ate = None
+        self._testando = False
+
+    def falha(self):
+        self.falhas += 1
+        self._testando = False
+        if self.aberto_ate is not None or self.falhas >= self.limite:
+            self.aberto_ate = time.monotonic() + self.espera
+            logger.warning(f"Circuito do Asaas aberto por {self.espera:.0f}s após {self.falhas} falha(s)")
+
+
+class ClienteAsaas:
+    def __init__(
+        self,
+        base_url: str = ASAAS_API_URL,
+        api_key: str = ASAAS_API_KEY,
+        timeout: float = ASAAS_TIMEOUT,
+        concorrencia: int = ASAAS_CONCORRENCIA,
+        tentativas: int = ASAAS_TENTATIVAS,
+        backoff: float = ASAAS_BACKOFF,
+        circuito: Optional[Circuito] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url.rstrip("/") + "/"
+        self.api_key = api_key
+        self.timeout = timeout
+        self.tentativas = max(tentativas, 1)
+        self.backoff = backoff
+        self.circuito = circuito or Circuito()
+        self._transport = transport
+        self._semaforo = asyncio.Semaphore(concorrencia)
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        # Criado no primeiro uso, já dentro do event loop da aplicação
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"access_token": self.api_key, "Content-Type": "application/json"},
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=ASAAS_MAX_CONEXOES,
+                                    max_keepalive_connections=ASAAS_MAX_CONEXOES),
+                transport=self._transport,
+            )
+        return self._http
+
+    async def fechar(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _espera(self, tentativa: int):
+        # Backoff exponencial com jitter completo
+        await asyncio.sleep(random.uniform(0, self.backoff * 2 ** tentativa))
+
+    async def post(self, caminho: str, payload: dict) -> dict:
+        """
+        POST com retry/circuit breaker. Resposta de erro do Asaas vira
+        HTTPException 500; Asaas indisponível vira 503.
+        """
+        try:
+            self.circuito.liberar()
+        except AsaasIndisponivel as e:
+            raise HTTPException(status_code=503, detail="Serviço de pagamento indisponível") from e
+
+        async with self._semaforo:
+            for tentativa in range(self.tentativas):
+                try:
+                    response = await self.http.post(caminho, json=payload)
+                except ERROS_REPETIVEIS as e:
+                    logger.warning(f"Asaas {caminho}: {e!r} (tentativa {tentativa + 1}/{self.tentativas})")
+                except httpx.HTTPError as e:
+                    self.circuito.falha()
+                    logger.error(f"Asaas {caminho}: {e!r}")
+                    raise HTTPException(status_code=503, detail="Serviço de pagamento indisponível") from e
+                else:
+                    if response.status_code not in STATUS_REPETIVEIS:
+                        break
+                    logger.warning(f"Asaas {caminho}: HTTP {response.status_code} "
+                                   f"(tentativa {tentativa + 1}/{self.tentativas})")
+                if tentativa + 1 < self.tentativas:
+                    await self._espera(tentativa)
+            else:
+                self.circuito.falha()
+                raise HTTPException(status_code=503, detail="Serviço de pagamento indisponível")
+
+        if response.status_code >= 500:
+            self.circuito.falha()
+        else:
+            self.circuito.sucesso()
+
+        try:
+            data = response.json()
+        except ValueError:
+            data = {"erro": response.text}
+        if response.status_code not in (200, 201):
+            logger.error(f"Erro Asaas {caminho}: {data}")
+            raise HTTPException(status_code=500, detail=f"Erro no Asaas: {data}")
+        return data
+
+    async def criar_cliente(self, empresa: Empresa) -> str:
+        """Cria o cliente no Asaas e retorna o ID."""
+        data = await self.post("customers", {
+            "name": empresa.nome,
+            "email": empresa.email,
+            "cpfCnpj": empresa.cnpj,
+            "phone": empresa.telefone,
+            "externalReference": str(empresa.id),
+        })
+        return data.get("id")
+
+    async def criar_cobranca(self, cliente_id: str, empresa: Empresa, dias_vencimento: int = 5) -> Tuple[str, str, str]:
+        """Cria a cobrança do plano e retorna ID, status e link do checkout."""
+        # plano_valor é gravado no cadastro; empresas antigas caem no texto do plano
+        valor = empresa.plano_valor if empresa.plano_valor is not None else dinheiro.de_texto(empresa.plano_preco)
+        if valor is None:
+            logger.error(f"Erro ao converter valor do plano: {empresa.plano_preco}")
+            raise HTTPException(status_code=400, detail=f"Valor do plano inválido: {empresa.plano_preco}")
+
+        data = await self.post("payments", {
+            "customer": cliente_id,
+            "billingType": "CREDIT_CARD",
+            "value": float(valor),
+            "dueDate": (datetime.now() + timedelta(days=dias_vencimento)).strftime("%Y-%m-%d"),
+            "description": f"Assinatura do plano {empresa.plano_titulo}",
+            "externalReference": str(empresa.id),
+            "notificationUrl": "https://seusite.com/notificacao-pagamento",
+            "billingTypeOptions": ["BOLETO", "CREDIT_CARD", "PIX"],
+        })
+        # Link final do checkout
+        checkout_link = (data.get("invoiceUrl") or data.get("bankSlipUrl")
+                         or f"https://sandbox.asaas.com/payment/{data['id']}")
+        return data.get("id"), data.get("status"), checkout_link
+
+
+cliente = ClienteAsaas()
+
+
+async def criar_cliente_asaas(empresa: Empresa) -> str:
+    return await cliente.criar_cliente(empresa)
+
+
+async def criar_link_pagamento_asaas(cliente_id, empresa: Empresa, dias_vencimento=5):
+    return await cliente.criar_cobranca(cliente_id, empresa, dias_vencimento)
@@ -1,9 +1,98 @@
-from passlib.context import CryptContext
+"""
+Hash de senhas (argon2id) num pool dedicado e limitado.
 
-pwd_context = CryptContext(schemes=["argon2id"], deprecated="auto")
+Cada hash/verificação custa dezenas de milissegundos de CPU; rodar isso no
+event loop (validação do corpo, rotas async) trava a API inteira, e no
+threadpool do FastAPI não há limite de quantos rodam ao mesmo tempo. Aqui
+todo hash passa por um executor de SENHA_POOL_TAMANHO workers (threads por
+padrão: o argon2-cffi solta o GIL durante o cálculo; SENHA_POOL=processo
+usa processos). Rotas síncronas chamam hash_password/verify_password, que
+esperam o pool; rotas async usam as versões *_async.
 
+Os custos vêm de ARGON2_TIME_COST, ARGON2_MEMORY_COST (KiB) e
+ARGON2_PARALLELISM. Hashes gravados com outros parâmetros continuam válidos
+e precisa_rehash() indica quando regravar (o login faz isso sozinho).
+"""
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 65536))     # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 4))
+SENHA_POOL = os.getenv("SENHA_POOL", "thread")                        # thread | processo
+SENHA_POOL_TAMANHO = int(os.getenv("SENHA_POOL_TAMANHO", os.cpu_count() or 1))
+
+hasher = PasswordHasher(
+    time_cost=ARGON2_TIME_COST,
+    memory_cost=ARGON2_MEMORY_COST,
+    parallelism=ARGON2_PARALLELISM,
+)
+
+_executor: Optional[Executor] = None
+
+
+def executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if SENHA_POOL == "processo":
+            _executor = ProcessPoolExecutor(max_workers=SENHA_POOL_TAMANHO)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=SENHA_POOL_TAMANHO, thread_name_prefix="argon2")
+    return _executor
+
+
+def encerrar_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# -------------------------------
+# Funções executadas dentro do pool
+# -------------------------------
+def _gerar(password: str) -> str:
+    return hasher.hash(password)
+
+
+def _verificar(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return hasher.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+# -------------------------------
+# API
+# -------------------------------
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return executor().submit(_gerar, password).result()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    if not hashed_password:
+        return False
+    return executor().submit(_verificar, plain_password, hashed_password).result()
+
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(executor(), _gerar, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    if not hashed_password:
+        return False
+    return await asyncio.get_running_loop().run_in_executor(executor(), _verificar, plain_password, hashed_password)
+
+
+def precisa_rehash(hashed_password: str) -> bool:
+    """True se o hash foi gerado com parâmetros diferentes dos atuais."""
+    try:
+        return hasher.check_needs_rehash(hashed_password)
+    except (InvalidHashError, ValueError):
+        return True
@@ -0,0 +1,187 @@
+"""
+Cache em memória da empresa autenticada.
+
+Guarda o payload dos JWT já decodificados e um snapshot imutável da empresa
+(id, plano, expiração, configuração) por e-mail, para que get_current_empresa
+não consulte o banco a cada requisição. Toda rota que altera esses dados deve
+chamar invalidar_empresa(email).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from jose import jwt
+from sqlalchemy import select
+from ..database.modelos import Configuracao, Empresa
+
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", 60))          # segundos
+AUTH_CACHE_MAX = int(os.getenv("AUTH_CACHE_MAX", 10000))      # entradas por cache
+
+
+class CacheTTL:
+    """
+    Cache LRU com expiração por entrada, seguro para várias threads.
+    """
+
+    def __init__(self, max_itens: int = AUTH_CACHE_MAX, ttl: float = AUTH_CACHE_TTL):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return None
+            valor, expira_em = item
+            if expira_em <= time.monotonic():
+                del self._dados[chave]
+                return None
+            self._dados.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._dados[chave] = (valor, time.monotonic() + ttl)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_itens:
+                self._dados.popitem(last=False)
+
+    def remover(self, chave):
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def remover_se(self, condicao):
+        with self._lock:
+            for chave in [c for c, (v, _) in self._dados.items() if condicao(v)]:
+                del self._dados[chave]
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    valor_hora: Decimal
+    valor_diaria: Decimal
+    valor_mensalista: Decimal
+    arredondamento: int
+    forma_pagamento: Optional[str]
+    faixas: Optional[list] = None
+    horarios: Optional[list] = None
+
+
+@dataclass(frozen=True)
+class EmpresaSnapshot:
+    """
+    Visão somente leitura da empresa logada, usada pelas rotas no lugar do ORM.
+    """
+    id: int
+    email: str
+    nome: str
+    plano_titulo: str
+    email_confirmado: bool
+    data_expiracao: Optional[datetime]
+    configuracao: Optional[ConfigSnapshot] = None
+    is_admin: bool = False
+
+
+def criar_snapshot(empresa, config=None) -> EmpresaSnapshot:
+    config_snapshot = None
+    if config is not None:
+        config_snapshot = ConfigSnapshot(
+            valor_hora=config.valor_hora,
+            valor_diaria=config.valor_diaria,
+            valor_mensalista=config.valor_mensalista,
+            arredondamento=config.arredondamento,
+            forma_pagamento=config.forma_pagamento,
+            faixas=getattr(config, "faixas", None),
+            horarios=getattr(config, "horarios", None),
+        )
+    return EmpresaSnapshot(
+        id=empresa.id,
+        email=empresa.email,
+        nome=empresa.nome,
+        plano_titulo=empresa.plano_titulo,
+        email_confirmado=bool(empresa.email_confirmado),
+        data_expiracao=empresa.data_expiracao,
+        configuracao=config_snapshot,
+    )
+
+
+tokens_cache = CacheTTL()
+empresas_cache = CacheTTL()
+
+
+def decodificar_token(token: str, secret_key: str, algoritmo: str) -> dict:
+    """
+    jwt.decode com cache; propaga JWTError como o original.
+    """
+    payload = tokens_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, secret_key, algorithms=[algoritmo])
+        # Nunca manter o token em cache além do seu próprio "exp"
+        exp = payload.get("exp")
+        tokens_cache.set(token, payload, exp - time.time() if exp else None)
+    return payload
+
+
+def obter_empresa(email: str) -> Optional[EmpresaSnapshot]:
+    return empresas_cache.get(email)
+
+
+def guardar_empresa(snapshot: EmpresaSnapshot):
+    empresas_cache.set(snapshot.email, snapshot)
+
+
+def _consulta_empresa(email: str):
+    return (
+        select(Empresa, Configuracao)
+        .outerjoin(Configuracao, Configuracao.empresa_id == Empresa.id)
+        .where(Empresa.email == email)
+    )
+
+
+def carregar_empresa(db, email: str) -> Optional[EmpresaSnapshot]:
+    """
+    Snapshot da empresa pelo e-mail; vai ao banco (uma consulta) só no miss.
+    """
+    snapshot = obter_empresa(email)
+    if snapshot is None:
+        linha = db.execute(_consulta_empresa(email)).first()
+        if not linha:
+            return None
+        snapshot = criar_snapshot(*linha)
+        guardar_empresa(snapshot)
+    return snapshot
+
+
+async def carregar_empresa_async(db, email: str) -> Optional[EmpresaSnapshot]:
+    snapshot = obter_empresa(email)
+    if snapshot is None:
+        linha = (await db.execute(_consulta_empresa(email))).first()
+        if not linha:
+            return None
+        snapshot = criar_snapshot(*linha)
+        guardar_empresa(snapshot)
+    return snapshot
+
+
+def invalidar_empresa(email: str):
+    """
+    Descarta o snapshot e os tokens em cache da empresa.
+    Chamar sempre que empresa, plano, configuração ou senha mudarem.
+    """
+    if not email:
+        return
+    empresas_cache.remover(email)
+    tokens_cache.remover_se(lambda payload: payload.get("sub") == email)
@@ -0,0 +1,68 @@
+"""
+Efeitos do cadastro de empresa executados pela fila (database/fila.py):
+cliente + cobrança no Asaas e e-mail de confirmação.
+
+Os handlers são idempotentes: o ID do cliente Asaas é gravado assim que
+criado e a cobrança não é refeita se a empresa já tem pagamento_link, então
+uma repetição depois de falha parcial não duplica nada no Asaas.
+"""
+from typing import List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from ..database import fila
+from ..database.modelos import Empresa, Tarefa
+from .asaas import criar_cliente_asaas, criar_link_pagamento_asaas
+from .email_utils import enviar_email_confirmacao
+from .token_utils import create_confirmation_token
+
+COBRANCA_ASAAS = "cobranca_asaas"
+EMAIL_CONFIRMACAO = "email_confirmacao"
+
+
+def agendar_cadastro(db, empresa: Empresa) -> List[Tarefa]:
+    """Enfileira os efeitos do cadastro (a empresa já precisa ter id; não faz commit)."""
+    return [
+        fila.enfileirar(db, COBRANCA_ASAAS, {"empresa_id": empresa.id}, empresa_id=empresa.id),
+        fila.enfileirar(db, EMAIL_CONFIRMACAO, {"email": empresa.email}, empresa_id=empresa.id),
+    ]
+
+
+def _carregar(db: Session, empresa_id: int) -> Optional[Empresa]:
+    return db.get(Empresa, empresa_id)
+
+
+def _salvar(db: Session, empresa_id: int, valores: dict):
+    db.execute(update(Empresa).where(Empresa.id == empresa_id).values(**valores))
+    db.commit()
+
+
+@fila.tarefa(COBRANCA_ASAAS)
+async def gerar_cobranca(payload: dict) -> dict:
+    empresa_id = payload["empresa_id"]
+    empresa = await run_in_threadpool(fila.com_sessao, _carregar, empresa_id)
+    if empresa is None:
+        return {"ignorada": "empresa não encontrada"}
+    if empresa.pagamento_link:
+        return {"pagamento_id": empresa.pagamento_id, "pagamento_link": empresa.pagamento_link}
+
+    cliente_id = empresa.asaas_cliente_id
+    if not cliente_id:
+        cliente_id = await criar_cliente_asaas(empresa)
+        await run_in_threadpool(fila.com_sessao, _salvar, empresa_id, {"asaas_cliente_id": cliente_id})
+
+    pagamento_id, pagamento_status, pagamento_link = await criar_link_pagamento_asaas(cliente_id, empresa)
+    await run_in_threadpool(fila.com_sessao, _salvar, empresa_id, {
+        "pagamento_id": pagamento_id,
+        "pagamento_status": pagamento_status,
+        "pagamento_link": pagamento_link,
+    })
+    return {"pagamento_id": pagamento_id, "pagamento_link": pagamento_link}
+
+
+@fila.tarefa(EMAIL_CONFIRMACAO)
+async def enviar_confirmacao(payload: dict) -> None:
+    token = create_confirmation_token(payload["email"])
+    await enviar_email_confirmacao(payload["email"], token)
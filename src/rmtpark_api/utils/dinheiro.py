@@ -0,0 +1,80 @@
+"""
+Valores monetários em reais.
+
+No banco os valores são NUMERIC(12, 2) (tipo Dinheiro abaixo): somas e
+agrupamentos no SQL são exatos e voltam como Decimal. Em memória o motor de
+tarifas trabalha com centavos inteiros (centavos / reais). Floats vindos da
+API são arredondados para o centavo (meio para cima) antes de gravar.
+"""
+import re
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Optional
+
+from sqlalchemy import Numeric
+from sqlalchemy.types import TypeDecorator
+
+CENTAVO = Decimal("0.01")
+ZERO = Decimal("0.00")
+
+
+def quantizar(valor) -> Decimal:
+    """Reais (float, int, str ou Decimal) como Decimal com duas casas."""
+    if valor is None:
+        return ZERO
+    if not isinstance(valor, Decimal):
+        valor = Decimal(str(valor))
+    return valor.quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def centavos(valor) -> int:
+    """Converte reais (float, str ou Decimal) para centavos, arredondando meio para cima."""
+    return int(quantizar(valor) / CENTAVO)
+
+
+def reais(valor_centavos: int) -> Decimal:
+    return (Decimal(int(valor_centavos)) * CENTAVO).quantize(CENTAVO)
+
+
+def de_texto(texto: Optional[str]) -> Optional[Decimal]:
+    """
+    Lê um preço no formato brasileiro ("R$ 49,90/mês", "R$ 1.049,90", "49.9").
+    Retorna None se não houver número.
+    """
+    if not texto:
+        return None
+    numero = re.search(r"\d[\d.,]*", texto)
+    if not numero:
+        return None
+    bruto = numero.group().rstrip(".,")
+    if "," in bruto:
+        bruto = bruto.replace(".", "").replace(",", ".")
+    elif bruto.count(".") > 1:
+        bruto = bruto.replace(".", "")
+    try:
+        return quantizar(bruto)
+    except InvalidOperation:
+        return None
+
+
+def formatar(valor) -> str:
+    """Decimal -> "R$ 1.049,90"."""
+    texto = f"{quantizar(valor):,.2f}"
+    return "R$ " + texto.replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+class Dinheiro(TypeDecorator):
+    """
+    Coluna NUMERIC com duas casas. Aceita float/int/str na escrita e devolve
+    Decimal na leitura (inclusive no sqlite, que guarda como REAL).
+    """
+    impl = Numeric
+    cache_ok = True
+
+    def __init__(self, precisao: int = 12):
+        super().__init__(precision=precisao, scale=2, asdecimal=True)
+
+    def process_bind_param(self, valor, dialect):
+        return None if valor is None else quantizar(valor)
+
+    def process_result_value(self, valor, dialect):
+        return None if valor is None else quantizar(valor)
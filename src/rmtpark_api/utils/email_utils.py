@@ -1,7 +1,31 @@
+"""
+Envio de e-mails por SMTP com conexões persistentes.
+
+As mensagens entram numa fila limitada (SMTP_FILA_MAX; quem enfileira
+espera se ela estiver cheia). Cada um dos SMTP_CONEXOES workers mantém uma
+conexão aberta (STARTTLS + login uma vez só) e envia as mensagens em lotes
+de até SMTP_LOTE pela mesma conexão. Se o servidor derrubar a conexão, o
+worker reconecta e reenvia a mensagem uma vez; conexões ociosas por mais de
+SMTP_OCIOSO segundos são fechadas.
+
+send_email continua esperando a entrega e propagando o erro (a fila de
+tarefas usa isso para repetir). Para testes, MAIL_SERVER/MAIL_PORT podem
+apontar para um servidor local (ex.: aiosmtpd) com SMTP_STARTTLS=False.
+"""
+import asyncio
+import html
+import logging
 import os
+import time
+from dataclasses import dataclass, field
 from email.message import EmailMessage
+from string import Template
+from typing import Iterable, List, Optional, Tuple
+
 import aiosmtplib
 
+logger = logging.getLogger(__name__)
+
 # Variáveis de ambiente
 MAIL_FROM = os.getenv("MAIL_FROM")
 FRONT_URL = os.getenv("FRONT_URL", "https://rmtpark.com")
@@ -11,55 +35,214 @@ SMTP_PORT = int(os.getenv("MAIL_PORT", 587))
 SMTP_USERNAME = os.getenv("MAIL_USERNAME")
 SMTP_PASSWORD = os.getenv("MAIL_PASSWORD")
 SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "True") == "True"
+SMTP_CONEXOES = int(os.getenv("SMTP_CONEXOES", 2))              # conexões (workers) simultâneas
+SMTP_FILA_MAX = int(os.getenv("SMTP_FILA_MAX", 1000))           # mensagens aguardando envio
+SMTP_LOTE = int(os.getenv("SMTP_LOTE", 50))                     # mensagens por lote numa conexão
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", 30))             # segundos
+SMTP_OCIOSO = float(os.getenv("SMTP_OCIOSO", 60))               # segundos até fechar conexão parada
 
-async def send_email(destinatario: str, assunto: str, html_content: str):
+# -------------------------------
+# Templates (compilados uma vez)
+# -------------------------------
+_TEMPLATE_BOTAO = Template("""
+    <html>
+    <body>
+        <h2>Olá! 👋</h2>
+        <p>$texto</p>
+        <p><a href="$link" style="background-color:$cor;color:white;padding:10px 20px;text-decoration:none;">$botao</a></p>
+    </body>
+    </html>
+    """)
+
+TEMPLATE_CONFIRMACAO = Template(_TEMPLATE_BOTAO.safe_substitute(
+    texto="Obrigado por se cadastrar no <strong>RmtPark</strong>.", cor="#2E8B57", botao="Confirmar e-mail",
+))
+TEMPLATE_RECUPERACAO = Template(_TEMPLATE_BOTAO.safe_substitute(
+    texto="Solicitação de redefinição de senha no <strong>RmtPark</strong>.", cor="#FF6347", botao="Redefinir senha",
+))
+_URL_CONFIRMACAO = Template(f"{FRONT_URL}/confirmar-email?token=$token")
+_URL_RECUPERACAO = Template(f"{FRONT_URL}/redefinir-senha?token=$token")
+
+
+def montar_mensagem(destinatario: str, assunto: str, html_content: str) -> EmailMessage:
     msg = EmailMessage()
     msg["From"] = MAIL_FROM
     msg["To"] = destinatario
     msg["Subject"] = assunto
     msg.set_content(html_content, subtype="html")
+    return msg
 
-    print(f"[INFO] Tentando enviar e-mail para: {destinatario}")
-    print(f"[INFO] SMTP: {SMTP_HOST}:{SMTP_PORT}, STARTTLS={SMTP_STARTTLS}")
-
-    try:
-        await aiosmtplib.send(
-            msg,
-            hostname=SMTP_HOST,
-            port=SMTP_PORT,
-            start_tls=SMTP_STARTTLS,
-            username=SMTP_USERNAME,
-            password=SMTP_PASSWORD
+
+# -------------------------------
+# Fila + conexões persistentes
+# -------------------------------
+@dataclass(eq=False)
+class _Envio:
+    mensagem: EmailMessage
+    resultado: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+class _Conexao:
+    """Uma conexão SMTP reaproveitada entre mensagens, reaberta quando cai."""
+
+    def __init__(self, remetente: "RemetenteSMTP"):
+        self.remetente = remetente
+        self.smtp: Optional[aiosmtplib.SMTP] = None
+        self.ultimo_uso = 0.0
+
+    async def abrir(self) -> aiosmtplib.SMTP:
+        if self.smtp is not None and self.smtp.is_connected:
+            if time.monotonic() - self.ultimo_uso < self.remetente.ocioso:
+                return self.smtp
+            await self.fechar()
+        r = self.remetente
+        self.smtp = aiosmtplib.SMTP(
+            hostname=r.host, port=r.porta, username=r.usuario, password=r.senha,
+            start_tls=r.starttls, timeout=r.timeout,
         )
-        print(f"[SUCCESS] E-mail enviado para {destinatario}")
-    except Exception as e:
-        print(f"[ERROR] Falha ao enviar e-mail para {destinatario}: {e}")
-        raise e
+        await self.smtp.connect()
+        logger.info(f"Conexão SMTP aberta com {r.host}:{r.porta} (STARTTLS={r.starttls})")
+        return self.smtp
+
+    async def enviar(self, mensagem: EmailMessage):
+        smtp = await self.abrir()
+        try:
+            await smtp.send_message(mensagem)
+        except (aiosmtplib.SMTPServerDisconnected, ConnectionError):
+            # Servidor fechou a conexão (timeout do lado dele): reconecta e tenta de novo
+            logger.info("Conexão SMTP caiu; reconectando")
+            self.smtp = None
+            smtp = await self.abrir()
+            await smtp.send_message(mensagem)
+        self.ultimo_uso = time.monotonic()
+
+    async def fechar(self):
+        smtp, self.smtp = self.smtp, None
+        if smtp is not None and smtp.is_connected:
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+
+class RemetenteSMTP:
+    def __init__(
+        self,
+        host: Optional[str] = SMTP_HOST,
+        porta: int = SMTP_PORT,
+        usuario: Optional[str] = SMTP_USERNAME,
+        senha: Optional[str] = SMTP_PASSWORD,
+        starttls: bool = SMTP_STARTTLS,
+        conexoes: int = SMTP_CONEXOES,
+        fila_max: int = SMTP_FILA_MAX,
+        lote: int = SMTP_LOTE,
+        timeout: float = SMTP_TIMEOUT,
+        ocioso: float = SMTP_OCIOSO,
+    ):
+        self.host, self.porta = host, porta
+        self.usuario, self.senha = usuario, senha
+        self.starttls = starttls
+        self.conexoes = max(conexoes, 1)
+        self.fila_max = fila_max
+        self.lote = max(lote, 1)
+        self.timeout = timeout
+        self.ocioso = ocioso
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fila: Optional[asyncio.Queue] = None
+        self._workers: List[Tuple[asyncio.Task, _Conexao]] = []
+
+    def _iniciar(self):
+        # Fila e workers pertencem ao event loop em que foram criados
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._workers:
+            return
+        self._loop = loop
+        self._fila = asyncio.Queue(self.fila_max)
+        self._workers = []
+        for numero in range(self.conexoes):
+            conexao = _Conexao(self)
+            tarefa = loop.create_task(self._trabalhar(conexao), name=f"smtp-{numero}")
+            self._workers.append((tarefa, conexao))
+
+    async def _proximo_lote(self) -> List[_Envio]:
+        lote = [await self._fila.get()]
+        while len(lote) < self.lote and not self._fila.empty():
+            lote.append(self._fila.get_nowait())
+        return lote
+
+    async def _trabalhar(self, conexao: _Conexao):
+        while True:
+            try:
+                lote = await asyncio.wait_for(self._proximo_lote(), timeout=self.ocioso)
+            except asyncio.TimeoutError:
+                await conexao.fechar()
+                continue
+            for envio in lote:
+                destinatario = envio.mensagem["To"]
+                try:
+                    await conexao.enviar(envio.mensagem)
+                except Exception as e:
+                    logger.error(f"Falha ao enviar e-mail para {destinatario}: {e}")
+                    await conexao.fechar()
+                    if not envio.resultado.done():
+                        envio.resultado.set_exception(e)
+                else:
+                    logger.info(f"E-mail enviado para {destinatario}")
+                    if not envio.resultado.done():
+                        envio.resultado.set_result(None)
+                finally:
+                    self._fila.task_done()
+
+    async def enviar(self, mensagem: EmailMessage):
+        """Enfileira e espera a entrega; erros de SMTP são propagados."""
+        self._iniciar()
+        envio = _Envio(mensagem)
+        await self._fila.put(envio)
+        await envio.resultado
+
+    async def enviar_varios(self, mensagens: Iterable[EmailMessage]) -> List[Optional[Exception]]:
+        """Envia várias mensagens reaproveitando as conexões; retorna o erro de cada uma (ou None)."""
+        self._iniciar()
+        envios = []
+        for mensagem in mensagens:
+            envio = _Envio(mensagem)
+            await self._fila.put(envio)
+            envios.append(envio)
+        resultados = await asyncio.gather(*(e.resultado for e in envios), return_exceptions=True)
+        return [r if isinstance(r, BaseException) else None for r in resultados]
+
+    async def fechar(self):
+        for tarefa, _ in self._workers:
+            tarefa.cancel()
+        for tarefa, conexao in self._workers:
+            try:
+                await tarefa
+            except asyncio.CancelledError:
+                pass
+            await conexao.fechar()
+        self._workers = []
+
+
+remetente = RemetenteSMTP()
+
+
+async def send_email(destinatario: str, assunto: str, html_content: str):
+    await remetente.enviar(montar_mensagem(destinatario, assunto, html_content))
+
+
+def corpo_confirmacao(token: str) -> str:
+    return TEMPLATE_CONFIRMACAO.substitute(link=html.escape(_URL_CONFIRMACAO.substitute(token=token)))
+
+
+def corpo_recuperacao(token: str) -> str:
+    return TEMPLATE_RECUPERACAO.substitute(link=html.escape(_URL_RECUPERACAO.substitute(token=token)))
+
 
 # E-mails de confirmação
 async def enviar_email_confirmacao(destinatario: str, token: str):
-    link = f"{FRONT_URL}/confirmar-email?token={token}"
-    corpo = f"""
-    <html>
-    <body>
-        <h2>Olá! 👋</h2>
-        <p>Obrigado por se cadastrar no <strong>RmtPark</strong>.</p>
-        <p><a href="{link}" style="background-color:#2E8B57;color:white;padding:10px 20px;text-decoration:none;">Confirmar e-mail</a></p>
-    </body>
-    </html>
-    """
-    await send_email(destinatario, "Confirme seu e-mail", corpo)
+    await send_email(destinatario, "Confirme seu e-mail", corpo_confirmacao(token))
+
 
 # E-mails de recuperação de senha
 async def enviar_email_recuperacao(destinatario: str, token: str):
-    link = f"{FRONT_URL}/redefinir-senha?token={token}"
-    corpo = f"""
-    <html>
-    <body>
-        <h2>Olá! 👋</h2>
-        <p>Solicitação de redefinição de senha no <strong>RmtPark</strong>.</p>
-        <p><a href="{link}" style="background-color:#FF6347;color:white;padding:10px 20px;text-decoration:none;">Redefinir senha</a></p>
-    </body>
-    </html>
-    """
-    await send_email(destinatario, "Recuperação de senha", corpo)
+    await send_email(destinatario, "Recuperação de senha", corpo_recuperacao(token))
@@ -0,0 +1,202 @@
+"""
+Eventos de entrada/saída de vagas para as telas de operador (/api/vagas/stream).
+
+As rotas chamam publicar(db, ...) antes do commit e o evento só sai se a
+transação for confirmada:
+
+- backend "local" (padrão): o evento fica em db.info e é entregue aos
+  assinantes deste processo no after_commit da sessão;
+- backend "postgres" (vários workers): o evento vira um pg_notify dentro da
+  própria transação, que o Postgres só entrega no commit; cada worker mantém
+  uma conexão com LISTEN e repassa as notificações aos seus assinantes.
+
+Os assinantes são filas asyncio por empresa. Se um cliente não consome e a
+fila enche, ela é esvaziada e recebe um evento "resync" (o cliente recarrega
+a lista de vagas).
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Set
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+EVENTOS_VAGAS_BACKEND = os.getenv("EVENTOS_VAGAS_BACKEND", "local")     # local | postgres
+EVENTOS_FILA_MAX = int(os.getenv("EVENTOS_FILA_MAX", 1000))            # eventos pendentes por conexão
+CANAL_POSTGRES = "vagas_eventos"
+TAMANHO_MAX_NOTIFY = 7000        # o payload do NOTIFY é limitado a 8000 bytes
+
+
+@dataclass(eq=False)
+class Assinatura:
+    empresa_id: int
+    loop: asyncio.AbstractEventLoop
+    fila: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(EVENTOS_FILA_MAX))
+
+
+class Broker:
+    """
+    Distribui eventos aos assinantes deste processo. entregar() pode ser
+    chamado de qualquer thread; assinar() só de dentro do event loop.
+    """
+
+    def __init__(self):
+        self._assinantes: Dict[int, Set[Assinatura]] = {}
+        self._lock = threading.Lock()
+
+    def assinar(self, empresa_id: int) -> Assinatura:
+        assinatura = Assinatura(empresa_id, asyncio.get_running_loop())
+        with self._lock:
+            self._assinantes.setdefault(empresa_id, set()).add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura: Assinatura):
+        with self._lock:
+            da_empresa = self._assinantes.get(assinatura.empresa_id)
+            if da_empresa is not None:
+                da_empresa.discard(assinatura)
+                if not da_empresa:
+                    del self._assinantes[assinatura.empresa_id]
+
+    def total_assinantes(self) -> int:
+        with self._lock:
+            return sum(len(assinaturas) for assinaturas in self._assinantes.values())
+
+    def entregar(self, empresa_id: int, eventos: List[dict]):
+        with self._lock:
+            assinaturas = list(self._assinantes.get(empresa_id, ()))
+        for assinatura in assinaturas:
+            try:
+                assinatura.loop.call_soon_threadsafe(_enfileirar, assinatura, eventos)
+            except RuntimeError:
+                # Loop já fechado (shutdown)
+                self.cancelar(assinatura)
+
+    def reenviar_tudo(self):
+        """Pede resync a todos (ex.: a conexão de LISTEN caiu e pode ter perdido eventos)."""
+        with self._lock:
+            assinaturas = [a for conjunto in self._assinantes.values() for a in conjunto]
+        for assinatura in assinaturas:
+            try:
+                assinatura.loop.call_soon_threadsafe(_enfileirar, assinatura, [{"tipo": "resync"}])
+            except RuntimeError:
+                # Loop já fechado (shutdown)
+                self.cancelar(assinatura)
+
+
+def _enfileirar(assinatura: Assinatura, eventos: List[dict]):
+    for evento in eventos:
+        try:
+            assinatura.fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            while not assinatura.fila.empty():
+                assinatura.fila.get_nowait()
+            assinatura.fila.put_nowait({"tipo": "resync"})
+            return
+
+
+broker = Broker()
+
+
+# -------------------------------
+# Publicação (chamada pelas rotas, antes do commit)
+# -------------------------------
+def publicar(db: Session, empresa_id: int, eventos: Iterable[dict]):
+    """
+    Agenda os eventos da empresa para serem entregues no commit da sessão.
+    """
+    eventos = jsonable_encoder(list(eventos))
+    if not eventos:
+        return
+    if EVENTOS_VAGAS_BACKEND == "postgres":
+        _notificar(db, empresa_id, eventos)
+    else:
+        db.info.setdefault("eventos_vagas", []).append((empresa_id, eventos))
+
+
+def _notificar(db: Session, empresa_id: int, eventos: List[dict]):
+    payloads, atual = [], []
+    for evento in eventos:
+        atual.append(evento)
+        if len(json.dumps({"empresa_id": empresa_id, "eventos": atual})) > TAMANHO_MAX_NOTIFY and len(atual) > 1:
+            atual.pop()
+            payloads.append(atual)
+            atual = [evento]
+    payloads.append(atual)
+    db.execute(
+        text("SELECT pg_notify(:canal, :payload)"),
+        [{"canal": CANAL_POSTGRES, "payload": json.dumps({"empresa_id": empresa_id, "eventos": p})} for p in payloads],
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _entregar_pendentes(sessao: Session):
+    for empresa_id, eventos in sessao.info.pop("eventos_vagas", []):
+        broker.entregar(empresa_id, eventos)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendentes(sessao: Session):
+    sessao.info.pop("eventos_vagas", None)
+
+
+def evento_entrada(vaga) -> dict:
+    return {
+        "tipo": "entrada",
+        "vaga": {
+            "id": vaga.id,
+            "numero_interno": vaga.numero_interno,
+            "placa": vaga.placa,
+            "tipo": vaga.tipo,
+            "data_hora": vaga.data_hora,
+            "empresa_id": vaga.empresa_id,
+        },
+    }
+
+
+def evento_saida(vaga_id: int, relatorio_id: int, valor_pago) -> dict:
+    return {"tipo": "saida", "vaga_id": vaga_id, "relatorio_id": relatorio_id, "valor_pago": valor_pago}
+
+
+# -------------------------------
+# LISTEN (backend postgres)
+# -------------------------------
+async def escutar_postgres(intervalo_reconexao: float = 5.0):
+    """
+    Mantém uma conexão asyncpg em LISTEN e repassa as notificações ao broker.
+    Roda como tarefa de startup; reconecta sozinha se a conexão cair.
+    """
+    from ..database.banco_dados import async_engine
+
+    def ao_notificar(_conexao, _pid, _canal, payload):
+        try:
+            mensagem = json.loads(payload)
+            broker.entregar(int(mensagem["empresa_id"]), mensagem["eventos"])
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Notificação de vagas inválida: {e}")
+
+    while True:
+        try:
+            async with async_engine.connect() as conexao:
+                bruta = await conexao.get_raw_connection()
+                asyncpg = bruta.driver_connection
+                await asyncpg.add_listener(CANAL_POSTGRES, ao_notificar)
+                try:
+                    while not asyncpg.is_closed():
+                        await asyncio.sleep(intervalo_reconexao)
+                finally:
+                    if not asyncpg.is_closed():
+                        await asyncpg.remove_listener(CANAL_POSTGRES, ao_notificar)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"LISTEN {CANAL_POSTGRES} interrompido: {e}")
+        broker.reenviar_tudo()
+        await asyncio.sleep(intervalo_reconexao)
@@ -0,0 +1,163 @@
+"""
+Geradores de arquivos para download em streaming (CSV, XLSX e gzip).
+
+Recebem um iterável de linhas (tuplas) e devolvem pedaços de bytes para um
+StreamingResponse, sem montar o arquivo inteiro em memória. O XLSX é escrito
+direto no formato Office Open XML (zip com a planilha em XML), então não
+depende de openpyxl.
+"""
+import csv
+import io
+import zipfile
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterable, Iterator, Sequence
+from xml.sax.saxutils import escape
+
+TAMANHO_PEDACO = 64 * 1024      # bytes acumulados antes de cada yield
+
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime):
+        return valor.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return str(valor)
+
+
+def gerar_csv(cabecalho: Sequence[str], linhas: Iterable[Sequence], separador: str = ";") -> Iterator[bytes]:
+    """
+    CSV em UTF-8 com BOM (o Excel reconhece acentos) e ';' como separador padrão.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=separador, lineterminator="\r\n")
+    buffer.write("\ufeff")
+    escritor.writerow(cabecalho)
+    for linha in linhas:
+        escritor.writerow([_texto(valor) for valor in linha])
+        if buffer.tell() >= TAMANHO_PEDACO:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _SaidaZip(io.RawIOBase):
+    """
+    Destino não pesquisável do ZipFile: acumula os bytes até o gerador buscá-los.
+    """
+
+    def __init__(self):
+        self._pedacos = []
+        self._tamanho = 0
+        self._posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._pedacos.append(bytes(dados))
+        self._tamanho += len(dados)
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def pendente(self) -> int:
+        return self._tamanho
+
+    def retirar(self) -> bytes:
+        dados = b"".join(self._pedacos)
+        self._pedacos, self._tamanho = [], 0
+        return dados
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{nome}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _celula(valor) -> str:
+    if isinstance(valor, bool):
+        valor = str(valor)
+    if isinstance(valor, (int, float, Decimal)):
+        return f"<c t=\"n\"><v>{valor}</v></c>"
+    return f"<c t=\"inlineStr\"><is><t>{escape(_texto(valor))}</t></is></c>"
+
+
+def _linha_xml(valores: Sequence) -> str:
+    return "<row>" + "".join(_celula(valor) for valor in valores) + "</row>"
+
+
+def gerar_xlsx(cabecalho: Sequence[str], linhas: Iterable[Sequence], nome_planilha: str = "Dados") -> Iterator[bytes]:
+    """
+    Planilha XLSX única, escrita em pedaços: a aba é gravada no zip em
+    streaming e os bytes saem assim que passam de TAMANHO_PEDACO.
+    """
+    saida = _SaidaZip()
+    with zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+        arquivo_zip.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        arquivo_zip.writestr("_rels/.rels", _RELS)
+        arquivo_zip.writestr("xl/workbook.xml", _WORKBOOK.format(nome=escape(nome_planilha)))
+        arquivo_zip.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+
+        with arquivo_zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as planilha:
+            planilha.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            planilha.write(_linha_xml(cabecalho).encode("utf-8"))
+            for linha in linhas:
+                planilha.write(_linha_xml(linha).encode("utf-8"))
+                if saida.pendente() >= TAMANHO_PEDACO:
+                    yield saida.retirar()
+            planilha.write(b"</sheetData></worksheet>")
+    yield saida.retirar()
+
+
+def comprimir_gzip(pedacos: Iterable[bytes], nivel: int = 6) -> Iterator[bytes]:
+    """
+    Comprime o stream em gzip conforme os pedaços chegam.
+    """
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for pedaco in pedacos:
+        comprimido = compressor.compress(pedaco)
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
@@ -0,0 +1,164 @@
+"""
+Limite de tentativas (token bucket) por e-mail e por IP para login,
+recuperar-senha e redefinir-senha.
+
+Cada chave (ex.: "login:email:fulano@x.com") tem um balde com `capacidade`
+fichas que se recompõe ao longo de `janela` segundos; cada tentativa gasta
+uma ficha e, sem fichas, a rota responde 429 com Retry-After antes de
+consultar o banco ou rodar o argon2.
+
+Regras no formato "tentativas/segundos" (LIMITE_LOGIN_EMAIL=5/300 etc.).
+Backend "local" (padrão) guarda os baldes em memória, por processo; com
+vários workers, LIMITE_BACKEND=redis divide os baldes entre eles (precisa do
+pacote redis e de LIMITE_REDIS_URL). Se o Redis falhar, cai no balde local.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+logger = logging.getLogger(__name__)
+
+LIMITE_BACKEND = os.getenv("LIMITE_BACKEND", "local")                 # local | redis
+LIMITE_REDIS_URL = os.getenv("LIMITE_REDIS_URL", "redis://localhost:6379/0")
+LIMITE_MAX_CHAVES = int(os.getenv("LIMITE_MAX_CHAVES", 100000))       # baldes em memória
+LIMITE_CONFIAR_PROXY = os.getenv("LIMITE_CONFIAR_PROXY", "False") == "True"   # usar X-Forwarded-For
+
+
+@dataclass(frozen=True)
+class Regra:
+    capacidade: int
+    janela: float           # segundos para recompor o balde inteiro
+
+    @property
+    def taxa(self) -> float:
+        return self.capacidade / self.janela
+
+    @classmethod
+    def de_texto(cls, texto: str) -> "Regra":
+        quantidade, segundos = texto.split("/")
+        return cls(int(quantidade), float(segundos))
+
+
+LOGIN_EMAIL = Regra.de_texto(os.getenv("LIMITE_LOGIN_EMAIL", "5/300"))
+LOGIN_IP = Regra.de_texto(os.getenv("LIMITE_LOGIN_IP", "20/60"))
+RECUPERAR_EMAIL = Regra.de_texto(os.getenv("LIMITE_RECUPERAR_EMAIL", "3/3600"))
+RECUPERAR_IP = Regra.de_texto(os.getenv("LIMITE_RECUPERAR_IP", "10/3600"))
+REDEFINIR_EMAIL = Regra.de_texto(os.getenv("LIMITE_REDEFINIR_EMAIL", "5/900"))
+REDEFINIR_IP = Regra.de_texto(os.getenv("LIMITE_REDEFINIR_IP", "10/900"))
+
+
+class BaldesLocais:
+    """Baldes em memória (LRU limitado a `max_chaves`), seguro para várias threads."""
+
+    def __init__(self, max_chaves: int = LIMITE_MAX_CHAVES):
+        self.max_chaves = max_chaves
+        self._baldes: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()   # chave -> (fichas, instante)
+        self._lock = threading.Lock()
+
+    def consumir(self, chave: str, regra: Regra) -> float:
+        """Gasta uma ficha. Retorna 0 se permitido, ou os segundos até haver ficha."""
+        agora = time.monotonic()
+        with self._lock:
+            fichas, instante = self._baldes.pop(chave, (regra.capacidade, agora))
+            fichas = min(regra.capacidade, fichas + (agora - instante) * regra.taxa)
+            if fichas >= 1:
+                self._baldes[chave] = (fichas - 1, agora)
+                espera = 0.0
+            else:
+                self._baldes[chave] = (fichas, agora)
+                espera = (1 - fichas) / regra.taxa
+            while len(self._baldes) > self.max_chaves:
+                self._baldes.popitem(last=False)
+        return espera
+
+    def limpar(self, chave: str):
+        with self._lock:
+            self._baldes.pop(chave, None)
+
+
+class BaldesRedis:
+    """Mesmos baldes num hash do Redis, atualizados atomicamente por script Lua."""
+
+    SCRIPT = """
+    local capacidade = tonumber(ARGV[1])
+    local taxa = tonumber(ARGV[2])
+    local agora = tonumber(ARGV[3])
+    local atual = redis.call('HMGET', KEYS[1], 'f', 't')
+    local fichas = tonumber(atual[1]) or capacidade
+    local instante = tonumber(atual[2]) or agora
+    fichas = math.min(capacidade, fichas + math.max(agora - instante, 0) * taxa)
+    local espera = 0
+    if fichas >= 1 then
+        fichas = fichas - 1
+    else
+        espera = (1 - fichas) / taxa
+    end
+    redis.call('HSET', KEYS[1], 'f', tostring(fichas), 't', tostring(agora))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacidade / taxa) + 1)
+    return tostring(espera)
+    """
+
+    def __init__(self, url: str = LIMITE_REDIS_URL):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("LIMITE_BACKEND=redis requer o pacote redis (pip install redis)") from e
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self._script = self._redis.register_script(self.SCRIPT)
+        self._reserva = BaldesLocais()
+
+    def consumir(self, chave: str, regra: Regra) -> float:
+        try:
+            return float(self._script(keys=[f"limite:{chave}"], args=[regra.capacidade, regra.taxa, time.time()]))
+        except Exception as e:
+            logger.warning(f"Redis indisponível para limite de tentativas ({e}); usando balde local")
+            return self._reserva.consumir(chave, regra)
+
+    def limpar(self, chave: str):
+        try:
+            self._redis.delete(f"limite:{chave}")
+        except Exception:
+            pass
+        self._reserva.limpar(chave)
+
+
+baldes = BaldesRedis() if LIMITE_BACKEND == "redis" else BaldesLocais()
+
+
+def ip_cliente(request: Request) -> str:
+    if LIMITE_CONFIAR_PROXY:
+        encaminhado = request.headers.get("x-forwarded-for")
+        if encaminhado:
+            return encaminhado.split(",")[0].strip()
+    return request.client.host if request.client else "desconhecido"
+
+
+def verificar(chave: str, regra: Regra):
+    """Gasta uma tentativa da chave; sem fichas levanta 429 com Retry-After."""
+    espera = baldes.consumir(chave, regra)
+    if espera > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Muitas tentativas. Tente novamente mais tarde.",
+            headers={"Retry-After": str(int(espera) + 1)},
+        )
+
+
+def verificar_ip(request: Request, acao: str, regra: Regra):
+    verificar(f"{acao}:ip:{ip_cliente(request)}", regra)
+
+
+def verificar_email(email: Optional[str], acao: str, regra: Regra):
+    if email:
+        verificar(f"{acao}:email:{email.strip().lower()}", regra)
+
+
+def liberar_email(email: str, acao: str):
+    """Zera o balde do e-mail (ex.: depois de um login correto)."""
+    baldes.limpar(f"{acao}:email:{email.strip().lower()}")
@@ -0,0 +1,236 @@
+"""
+Índice em memória das vagas ativas por empresa.
+
+Guarda os tickets abertos por id, placa e numero_interno para que o
+listar_vagas (consultado a cada poucos segundos por tela de operador) não
+volte ao banco. criar_vaga, registrar_saida e o lote aplicam as mudanças
+depois do commit; o índice é aquecido no startup.
+
+A versão de cada empresa é o par (ultimo_numero_interno, vagas_ativas) de
+contadores_empresa: toda entrada avança o primeiro e toda saída reduz o
+segundo, então o par muda a cada alteração e serve de ETag. Cada leitura
+confere esse par no banco (uma busca por PK) e recarrega a empresa se outro
+worker mexeu nela. OCUPACAO_INDICE_COMPARTILHADO=False dispensa a conferência,
+o que só é seguro com um único worker; com WEB_CONCURRENCY > 1 ela fica ligada.
+"""
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from ..database.modelos import ContadorEmpresa, Vaga
+
+WORKERS = int(os.getenv("WEB_CONCURRENCY") or 1)
+OCUPACAO_INDICE_COMPARTILHADO = os.getenv("OCUPACAO_INDICE_COMPARTILHADO", "True") == "True" or WORKERS > 1
+
+
+@dataclass(frozen=True)
+class VagaAtiva:
+    id: int
+    numero_interno: int
+    placa: str
+    tipo: str
+    data_hora: datetime
+    empresa_id: int
+    data_hora_saida: Optional[datetime] = None
+    duracao: Optional[str] = None
+    valor_pago: Optional[Decimal] = None
+    forma_pagamento: Optional[str] = None
+
+
+def vaga_ativa(vaga) -> VagaAtiva:
+    return VagaAtiva(
+        id=vaga.id,
+        numero_interno=vaga.numero_interno,
+        placa=vaga.placa,
+        tipo=vaga.tipo,
+        data_hora=vaga.data_hora,
+        empresa_id=vaga.empresa_id,
+    )
+
+
+class _Ocupacao:
+    def __init__(self, vagas: Iterable[VagaAtiva], ultimo_numero: int, ativas: int):
+        self.por_id: Dict[int, VagaAtiva] = {}
+        self.por_placa: Dict[str, Dict[int, VagaAtiva]] = {}
+        self.por_numero: Dict[int, VagaAtiva] = {}
+        self.ultimo_numero = ultimo_numero
+        self.ativas = ativas
+        self._lista: Optional[List[VagaAtiva]] = None
+        for vaga in vagas:
+            self._incluir(vaga)
+
+    def _incluir(self, vaga: VagaAtiva):
+        self.por_id[vaga.id] = vaga
+        self.por_placa.setdefault(vaga.placa, {})[vaga.id] = vaga
+        self.por_numero[vaga.numero_interno] = vaga
+        self._lista = None
+
+    def _excluir(self, vaga_id: int) -> bool:
+        vaga = self.por_id.pop(vaga_id, None)
+        if vaga is None:
+            return False
+        da_placa = self.por_placa.get(vaga.placa, {})
+        da_placa.pop(vaga_id, None)
+        if not da_placa:
+            self.por_placa.pop(vaga.placa, None)
+        if self.por_numero.get(vaga.numero_interno) is vaga:
+            del self.por_numero[vaga.numero_interno]
+        self._lista = None
+        return True
+
+    @property
+    def marca(self) -> Tuple[int, int]:
+        return self.ultimo_numero, self.ativas
+
+    def lista(self) -> List[VagaAtiva]:
+        if self._lista is None:
+            self._lista = sorted(self.por_id.values(), key=lambda v: v.id)
+        return self._lista
+
+
+class IndiceOcupacao:
+    """
+    Vagas ativas por empresa, seguro para várias threads.
+    """
+
+    def __init__(self, compartilhado: bool = OCUPACAO_INDICE_COMPARTILHADO):
+        self.compartilhado = compartilhado
+        self._empresas: Dict[int, _Ocupacao] = {}
+        # Escritas por empresa: uma carga que cruzou com uma escrita não é guardada,
+        # senão o snapshot anterior ao commit sobrescreveria a mudança
+        self._escritas: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    # ---------- carga ----------
+    def _consultar(self, db, empresa_ids: Optional[List[int]] = None) -> Dict[int, _Ocupacao]:
+        vagas = select(Vaga).where(Vaga.data_hora_saida.is_(None))
+        contadores = select(
+            ContadorEmpresa.empresa_id, ContadorEmpresa.ultimo_numero_interno, ContadorEmpresa.vagas_ativas
+        )
+        if empresa_ids is not None:
+            vagas = vagas.where(Vaga.empresa_id.in_(empresa_ids))
+            contadores = contadores.where(ContadorEmpresa.empresa_id.in_(empresa_ids))
+
+        marcas = {empresa_id: (numero, ativas) for empresa_id, numero, ativas in db.execute(contadores)}
+        por_empresa: Dict[int, List[VagaAtiva]] = {
+            empresa_id: [] for empresa_id in set(empresa_ids or []) | set(marcas)
+        }
+        for vaga in db.execute(vagas).scalars():
+            por_empresa.setdefault(vaga.empresa_id, []).append(vaga_ativa(vaga))
+        return {
+            empresa_id: _Ocupacao(lista, *marcas.get(empresa_id, (0, 0)))
+            for empresa_id, lista in por_empresa.items()
+        }
+
+    def aquecer(self, db) -> int:
+        """Carrega todas as empresas em duas consultas. Retorna quantas foram carregadas."""
+        with self._lock:
+            escritas = dict(self._escritas)
+        carregadas = self._consultar(db)
+        with self._lock:
+            for empresa_id, ocupacao in carregadas.items():
+                if self._escritas.get(empresa_id, 0) == escritas.get(empresa_id, 0):
+                    self._empresas[empresa_id] = ocupacao
+        return len(carregadas)
+
+    def _marca_banco(self, db, empresa_id: int) -> Tuple[int, int]:
+        linha = db.execute(
+            select(ContadorEmpresa.ultimo_numero_interno, ContadorEmpresa.vagas_ativas)
+            .where(ContadorEmpresa.empresa_id == empresa_id)
+        ).first()
+        return tuple(linha) if linha else (0, 0)
+
+    def _obter(self, db, empresa_id: int) -> _Ocupacao:
+        with self._lock:
+            ocupacao = self._empresas.get(empresa_id)
+        if ocupacao is not None and self.compartilhado and ocupacao.marca != self._marca_banco(db, empresa_id):
+            ocupacao = None
+        if ocupacao is None:
+            with self._lock:
+                escritas = self._escritas.get(empresa_id, 0)
+            ocupacao = self._consultar(db, [empresa_id])[empresa_id]
+            with self._lock:
+                if self._escritas.get(empresa_id, 0) == escritas:
+                    self._empresas[empresa_id] = ocupacao
+        return ocupacao
+
+    # ---------- leitura ----------
+    def listar(self, db, empresa_id: int) -> Tuple[str, List[VagaAtiva]]:
+        """
+        ETag e vagas ativas da empresa. Só consulta o banco na primeira vez
+        (ou, no modo compartilhado, para conferir a versão).
+        """
+        ocupacao = self._obter(db, empresa_id)
+        with self._lock:
+            return etag(empresa_id, ocupacao.marca), ocupacao.lista()
+
+    def etag(self, db, empresa_id: int) -> str:
+        ocupacao = self._obter(db, empresa_id)
+        with self._lock:
+            return etag(empresa_id, ocupacao.marca)
+
+    def por_placa(self, db, empresa_id: int, placa: str) -> List[VagaAtiva]:
+        ocupacao = self._obter(db, empresa_id)
+        with self._lock:
+            return sorted(ocupacao.por_placa.get(placa.upper(), {}).values(), key=lambda v: v.id)
+
+    def por_numero(self, db, empresa_id: int, numero_interno: int) -> Optional[VagaAtiva]:
+        ocupacao = self._obter(db, empresa_id)
+        with self._lock:
+            return ocupacao.por_numero.get(numero_interno)
+
+    # ---------- escrita (chamar depois do commit) ----------
+    def entrada(self, vaga):
+        """Registra um ticket aberto; espelha o admitir_vaga do contador."""
+        with self._lock:
+            self._escritas[vaga.empresa_id] = self._escritas.get(vaga.empresa_id, 0) + 1
+            ocupacao = self._empresas.get(vaga.empresa_id)
+            if ocupacao is None:
+                return
+            ocupacao._incluir(vaga if isinstance(vaga, VagaAtiva) else vaga_ativa(vaga))
+            ocupacao.ultimo_numero = max(ocupacao.ultimo_numero, vaga.numero_interno)
+            ocupacao.ativas += 1
+
+    def saida(self, empresa_id: int, vaga_id: int):
+        """Remove um ticket fechado; espelha o liberar_vaga do contador."""
+        with self._lock:
+            self._escritas[empresa_id] = self._escritas.get(empresa_id, 0) + 1
+            ocupacao = self._empresas.get(empresa_id)
+            if ocupacao is None:
+                return
+            if ocupacao._excluir(vaga_id):
+                ocupacao.ativas = max(ocupacao.ativas - 1, 0)
+            else:
+                # Saída de vaga que o índice não conhecia: recarrega na próxima leitura
+                self._empresas.pop(empresa_id, None)
+
+    def descartar(self, empresa_id: Optional[int] = None):
+        """Esquece uma empresa (ou todas); a próxima leitura recarrega do banco."""
+        with self._lock:
+            if empresa_id is None:
+                for chave in self._empresas:
+                    self._escritas[chave] = self._escritas.get(chave, 0) + 1
+                self._empresas.clear()
+            else:
+                self._escritas[empresa_id] = self._escritas.get(empresa_id, 0) + 1
+                self._empresas.pop(empresa_id, None)
+
+
+def etag(empresa_id: int, marca: Tuple[int, int]) -> str:
+    return f'"vagas-{empresa_id}-{marca[0]}-{marca[1]}"'
+
+
+def etag_confere(if_none_match: Optional[str], valor: str) -> bool:
+    """Compara com o If-None-Match (aceita lista, '*' e o prefixo fraco W/)."""
+    if not if_none_match:
+        return False
+    candidatos = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidatos or any(c.removeprefix("W/") == valor for c in candidatos)
+
+
+indice = IndiceOcupacao()
@@ -0,0 +1,43 @@
+"""
+Registro central dos planos e seus limites de vagas ativas.
+"""
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class PlanoInfo:
+    titulo: str
+    limite_vagas: Optional[int]   # None = ilimitado
+
+
+# Chave = trecho normalizado (minúsculo, sem acento) procurado no plano_titulo
+PLANOS = {
+    "basic": PlanoInfo("Basico", 50),
+    "profissional": PlanoInfo("Profissional", 150),
+    "empresarial": PlanoInfo("Empresarial", None),
+    "premium": PlanoInfo("Premium", None),
+}
+
+
+def _normalizar(titulo: str) -> str:
+    sem_acento = unicodedata.normalize("NFKD", titulo or "").encode("ascii", "ignore").decode()
+    return sem_acento.lower().strip()
+
+
+@lru_cache(maxsize=256)
+def obter_plano(plano_titulo: str) -> Optional[PlanoInfo]:
+    """Plano correspondente ao título gravado na empresa (ex.: 'Plano Básico')."""
+    titulo = _normalizar(plano_titulo)
+    for chave, plano in PLANOS.items():
+        if chave in titulo:
+            return plano
+    return None
+
+
+def limite_vagas(plano_titulo: str) -> Optional[int]:
+    """Limite de vagas ativas do plano; None quando ilimitado ou desconhecido."""
+    plano = obter_plano(plano_titulo)
+    return plano.limite_vagas if plano else None
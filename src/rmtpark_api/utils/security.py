@@ -1,25 +1,35 @@
+from datetime import datetime, timedelta, timezone
 from types import SimpleNamespace
-from fastapi import Depends, HTTPException
+from typing import Optional
+from fastapi import Depends, HTTPException, Query
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..database.modelos import Empresa
 from ..database import banco_dados
+from .cache_empresa import carregar_empresa, carregar_empresa_async, decodificar_token
 import os
 
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecret")
 ALGORITHM = "HS256"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+oauth2_scheme_opcional = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD")
 ADMIN_NAME = os.getenv("ADMIN_NAME")
 SECRET_KEY = os.getenv("SECRET_KEY")
 
+# Ticket do /api/vagas/stream: vai na URL (EventSource não envia headers), então
+# vale poucos segundos e só abre o stream
+STREAM_TICKET_SEGUNDOS = int(os.getenv("STREAM_TICKET_SEGUNDOS", 60))
+TIPO_TICKET_STREAM = "stream"
+
 def get_current_empresa(db: Session = Depends(banco_dados.get_db), token: str = Depends(oauth2_scheme)):
     """
     Aceita tanto o token JWT quanto um token simples 'admin-local-token' para admin.
+    Retorna um EmpresaSnapshot em cache (ver utils/cache_empresa.py).
     """
     # Token local fixo
     if token == "admin-local-token":
@@ -27,9 +37,32 @@ def get_current_empresa(db: Session = Depends(banco_dados.get_db), token: str =
 
     # JWT normal
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decodificar_token(token, SECRET_KEY, ALGORITHM)
+        email: str = payload.get("sub")
+        if not email or payload.get("type") == TIPO_TICKET_STREAM:
+            raise HTTPException(status_code=401, detail="Token inválido")
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Token inválido ou expirado")
+
+    if email == ADMIN_EMAIL:
+        return SimpleNamespace(email=ADMIN_EMAIL, nome=ADMIN_NAME, is_admin=True)
+
+    empresa = carregar_empresa(db, email)
+    if not empresa:
+        raise HTTPException(status_code=401, detail="Empresa não encontrada")
+    return empresa
+
+async def get_current_empresa_async(db: AsyncSession = Depends(banco_dados.get_async_db), token: str = Depends(oauth2_scheme)):
+    """
+    Mesma regra do get_current_empresa, consultando pelo AsyncSession.
+    """
+    if token == "admin-local-token":
+        return SimpleNamespace(email=ADMIN_EMAIL, nome=ADMIN_NAME, is_admin=True)
+
+    try:
+        payload = decodificar_token(token, SECRET_KEY, ALGORITHM)
         email: str = payload.get("sub")
-        if not email:
+        if not email or payload.get("type") == TIPO_TICKET_STREAM:
             raise HTTPException(status_code=401, detail="Token inválido")
     except JWTError:
         raise HTTPException(status_code=401, detail="Token inválido ou expirado")
@@ -37,11 +70,41 @@ def get_current_empresa(db: Session = Depends(banco_dados.get_db), token: str =
     if email == ADMIN_EMAIL:
         return SimpleNamespace(email=ADMIN_EMAIL, nome=ADMIN_NAME, is_admin=True)
 
-    empresa = db.query(Empresa).filter(Empresa.email == email).first()
+    empresa = await carregar_empresa_async(db, email)
     if not empresa:
         raise HTTPException(status_code=401, detail="Empresa não encontrada")
+    return empresa
+
+def criar_ticket_stream(email: str) -> str:
+    """Ticket curto (STREAM_TICKET_SEGUNDOS) que só autentica o /api/vagas/stream."""
+    expira = datetime.now(timezone.utc) + timedelta(seconds=STREAM_TICKET_SEGUNDOS)
+    return jwt.encode({"sub": email, "exp": expira, "type": TIPO_TICKET_STREAM}, SECRET_KEY, algorithm=ALGORITHM)
 
-    setattr(empresa, "is_admin", False)
+def get_current_empresa_stream(
+    db: Session = Depends(banco_dados.get_db),
+    token: Optional[str] = Depends(oauth2_scheme_opcional),
+    ticket: Optional[str] = Query(None),
+):
+    """
+    Para streams (EventSource não envia Authorization): aceita o token no header
+    ou um ticket de stream em ?ticket=. O token de acesso nunca vai na URL.
+    """
+    if token:
+        return get_current_empresa(db=db, token=token)
+    if not ticket:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    try:
+        payload = decodificar_token(ticket, SECRET_KEY, ALGORITHM)
+        email: str = payload.get("sub")
+        if not email or payload.get("type") != TIPO_TICKET_STREAM:
+            raise HTTPException(status_code=401, detail="Ticket inválido")
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Ticket inválido ou expirado")
+
+    empresa = carregar_empresa(db, email)
+    if not empresa:
+        raise HTTPException(status_code=401, detail="Empresa não encontrada")
     return empresa
 
 # ---------------- Função require_admin ----------------
@@ -0,0 +1,282 @@
+"""
+Motor de tarifas: preço de um ticket a partir da configuração da empresa.
+
+Todos os valores são tratados em centavos inteiros, então o cálculo unitário
+(Decimal) e o cálculo em lote (NumPy) dão exatamente o mesmo resultado.
+
+Regras, na ordem em que são aplicadas:
+
+1. a duração é arredondada para cima em múltiplos de `arredondamento`
+   minutos (com a mesma tolerância de sempre: até 1 minuto além do bloco
+   não abre outro bloco);
+2. o valor por minuto vem da janela de horário da entrada (RegraHorario),
+   se houver uma que cubra a hora de entrada; senão das faixas progressivas
+   (Faixa), se configuradas; senão de `valor_hora`;
+3. com `valor_diaria` > 0, cada período de 24h cobra no máximo a diária.
+
+Mensalista não passa por essas regras: paga `valor_mensalista` na primeira
+saída de cada mês (cobrar_mensalidade / mensalidades_lote).
+"""
+import re
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from typing import Optional, Tuple
+
+from .dinheiro import centavos, reais
+from .timezone_utils import para_sp_sem_fuso
+
+MINUTOS_DIA = 24 * 60
+
+
+@dataclass(frozen=True)
+class Faixa:
+    """Valor por hora até `ate_minutos` de permanência (None = restante)."""
+    ate_minutos: Optional[int]
+    valor_hora: int                  # centavos
+
+
+@dataclass(frozen=True)
+class RegraHorario:
+    """
+    Valor por hora para entradas entre `inicio` e `fim` (pode virar a meia-noite,
+    ex.: 22:00-06:00). Dentro da janela as faixas não se aplicam.
+    """
+    inicio: time
+    fim: time
+    valor_hora: int                  # centavos
+
+    def cobre(self, minuto_dia: int) -> bool:
+        inicio = self.inicio.hour * 60 + self.inicio.minute
+        fim = self.fim.hour * 60 + self.fim.minute
+        if inicio <= fim:
+            return inicio <= minuto_dia < fim
+        return minuto_dia >= inicio or minuto_dia < fim
+
+
+@dataclass(frozen=True)
+class Tarifa:
+    valor_hora: int                  # centavos
+    valor_diaria: int = 0            # centavos; 0 = sem teto diário
+    valor_mensalista: int = 0        # centavos
+    arredondamento: int = 15         # minutos
+    faixas: Tuple[Faixa, ...] = ()
+    horarios: Tuple[RegraHorario, ...] = ()
+
+    @classmethod
+    def de_config(cls, config) -> "Tarifa":
+        """
+        A partir de Configuracao, ConfigSnapshot ou ConfigSchema (valores em reais;
+        faixas/horarios como dicts ou schemas, opcionais).
+        """
+        faixas = [
+            Faixa(ate_minutos=_campo(f, "ate_minutos"), valor_hora=centavos(_campo(f, "valor_hora")))
+            for f in (getattr(config, "faixas", None) or [])
+        ]
+        horarios = [
+            RegraHorario(
+                inicio=_hora(_campo(h, "inicio")),
+                fim=_hora(_campo(h, "fim")),
+                valor_hora=centavos(_campo(h, "valor_hora")),
+            )
+            for h in (getattr(config, "horarios", None) or [])
+        ]
+        return cls(
+            valor_hora=centavos(getattr(config, "valor_hora", 0) or 0),
+            valor_diaria=centavos(getattr(config, "valor_diaria", 0) or 0),
+            valor_mensalista=centavos(getattr(config, "valor_mensalista", 0) or 0),
+            arredondamento=int(getattr(config, "arredondamento", 0) or 1),
+            faixas=tuple(sorted(faixas, key=lambda f: f.ate_minutos if f.ate_minutos is not None else float("inf"))),
+            horarios=tuple(horarios),
+        )
+
+
+def _campo(item, nome):
+    return item.get(nome) if isinstance(item, dict) else getattr(item, nome, None)
+
+
+def _hora(valor) -> time:
+    return valor if isinstance(valor, time) else time.fromisoformat(str(valor))
+
+
+# -------------------------------
+# Cálculo unitário
+# -------------------------------
+def minutos_cobrados(entrada: datetime, saida: datetime, arredondamento: int) -> int:
+    """
+    Duração em minutos arredondada para cima em blocos de `arredondamento`,
+    em aritmética inteira (microssegundos).
+    """
+    arredondamento = arredondamento or 1
+    micros = (para_sp_sem_fuso(saida) - para_sp_sem_fuso(entrada)) // timedelta(microseconds=1)
+    bloco = 60_000_000 * arredondamento
+    return max((micros + 60_000_000 * (arredondamento - 1)) // bloco * arredondamento, 0)
+
+
+def _cobrar_minutos(minutos: int, valor_hora: int) -> int:
+    # centavos-minuto / 60, meio para cima
+    return (minutos * valor_hora + 30) // 60
+
+
+def _preco_periodo(tarifa: Tarifa, minutos: int, minuto_entrada: int) -> int:
+    for regra in tarifa.horarios:
+        if regra.cobre(minuto_entrada):
+            return _cobrar_minutos(minutos, regra.valor_hora)
+    if not tarifa.faixas:
+        return _cobrar_minutos(minutos, tarifa.valor_hora)
+
+    centavos_minuto, anterior = 0, 0
+    for faixa in tarifa.faixas:
+        limite = minutos if faixa.ate_minutos is None else min(minutos, faixa.ate_minutos)
+        if limite > anterior:
+            centavos_minuto += (limite - anterior) * faixa.valor_hora
+            anterior = limite
+    if minutos > anterior:
+        # Além da última faixa com limite: segue o valor_hora padrão
+        centavos_minuto += (minutos - anterior) * tarifa.valor_hora
+    return (centavos_minuto + 30) // 60
+
+
+def preco_diarista(tarifa: Tarifa, minutos: int, minuto_entrada: int = 0) -> int:
+    """Preço em centavos de `minutos` já arredondados (aplica o teto diário)."""
+    if tarifa.valor_diaria <= 0:
+        return _preco_periodo(tarifa, minutos, minuto_entrada)
+    dias, resto = divmod(minutos, MINUTOS_DIA)
+    dia_cheio = min(_preco_periodo(tarifa, MINUTOS_DIA, minuto_entrada), tarifa.valor_diaria)
+    return dias * dia_cheio + min(_preco_periodo(tarifa, resto, minuto_entrada), tarifa.valor_diaria)
+
+
+def cobrar_mensalidade(ultimo_pagamento: Optional[datetime], agora: datetime) -> bool:
+    """Mensalidade é cobrada na primeira saída do mês (ano e mês, como em mensalidades_lote)."""
+    if not ultimo_pagamento:
+        return True
+    ultimo, atual = para_sp_sem_fuso(ultimo_pagamento), para_sp_sem_fuso(agora)
+    return (ultimo.year, ultimo.month) != (atual.year, atual.month)
+
+
+@dataclass(frozen=True)
+class Cobranca:
+    minutos: int
+    valor: Decimal
+
+    @property
+    def duracao(self) -> str:
+        """Texto no formato histórico de duracao (str de timedelta)."""
+        return str(timedelta(minutes=self.minutos))
+
+
+_DURACAO = re.compile(r"^(?:(-?\d+) days?, )?(\d+):(\d{2}):(\d{2})(?:\.\d+)?$")
+
+
+def minutos_de_duracao(texto: Optional[str]) -> Optional[int]:
+    """Minutos de um texto no formato de str(timedelta) ("1 day, 2:15:00"); None se não reconhecer."""
+    achado = _DURACAO.match((texto or "").strip())
+    if not achado:
+        return None
+    dias, horas, minutos, _ = achado.groups()
+    return int(dias or 0) * MINUTOS_DIA + int(horas) * 60 + int(minutos)
+
+
+def calcular(tarifa: Tarifa, tipo: str, entrada: datetime, saida: datetime,
+             mensalidade_devida: bool = True) -> Cobranca:
+    """
+    Minutos cobrados e valor (Decimal, em reais) de um ticket.
+    Para mensalista, `mensalidade_devida` diz se a mensalidade do mês ainda não foi paga.
+    """
+    minutos = minutos_cobrados(entrada, saida, tarifa.arredondamento)
+    if tipo.lower() == "mensalista":
+        valor = tarifa.valor_mensalista if mensalidade_devida else 0
+    else:
+        inicio = para_sp_sem_fuso(entrada)
+        valor = preco_diarista(tarifa, minutos, inicio.hour * 60 + inicio.minute)
+    return Cobranca(minutos=minutos, valor=reais(valor))
+
+
+# -------------------------------
+# Cálculo em lote (NumPy)
+# -------------------------------
+def numpy_obrigatorio():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("O cálculo de tarifas em lote requer o pacote numpy")
+    return numpy
+
+
+def minutos_cobrados_lote(entradas, saidas, arredondamento: int):
+    """
+    Versão vetorizada de minutos_cobrados. `entradas`/`saidas` são arrays
+    datetime64 (horário de SP, sem fuso). Retorna int64.
+    """
+    np = numpy_obrigatorio()
+    arredondamento = arredondamento or 1
+    micros = (np.asarray(saidas, dtype="datetime64[us]") - np.asarray(entradas, dtype="datetime64[us]")).astype(np.int64)
+    bloco = 60_000_000 * arredondamento
+    return np.maximum((micros + 60_000_000 * (arredondamento - 1)) // bloco * arredondamento, 0)
+
+
+def _preco_periodo_lote(tarifa: Tarifa, minutos, minuto_entrada):
+    np = numpy_obrigatorio()
+    if tarifa.faixas:
+        centavos_minuto = np.zeros_like(minutos)
+        anterior = np.zeros_like(minutos)
+        for faixa in tarifa.faixas:
+            limite = minutos if faixa.ate_minutos is None else np.minimum(minutos, faixa.ate_minutos)
+            centavos_minuto += np.maximum(limite - anterior, 0) * faixa.valor_hora
+            anterior = np.maximum(anterior, limite)
+        centavos_minuto += np.maximum(minutos - anterior, 0) * tarifa.valor_hora
+    else:
+        centavos_minuto = minutos * tarifa.valor_hora
+
+    # Janelas de horário: a primeira que cobre a entrada vence
+    pendente = np.ones(minutos.shape, dtype=bool)
+    for regra in tarifa.horarios:
+        inicio = regra.inicio.hour * 60 + regra.inicio.minute
+        fim = regra.fim.hour * 60 + regra.fim.minute
+        if inicio <= fim:
+            cobre = (minuto_entrada >= inicio) & (minuto_entrada < fim)
+        else:
+            cobre = (minuto_entrada >= inicio) | (minuto_entrada < fim)
+        aplicar = cobre & pendente
+        centavos_minuto = np.where(aplicar, minutos * regra.valor_hora, centavos_minuto)
+        pendente &= ~cobre
+    return (centavos_minuto + 30) // 60
+
+
+def precos_diarista_lote(tarifa: Tarifa, entradas, saidas):
+    """
+    Preços em centavos (int64) de vários tickets de uma vez, com as mesmas
+    regras de preco_diarista. Retorna (minutos, centavos).
+    """
+    np = numpy_obrigatorio()
+    entradas = np.asarray(entradas, dtype="datetime64[us]")
+    minutos = minutos_cobrados_lote(entradas, saidas, tarifa.arredondamento)
+    minuto_entrada = ((entradas - entradas.astype("datetime64[D]")) // np.timedelta64(1, "m")).astype(np.int64)
+
+    if tarifa.valor_diaria <= 0:
+        return minutos, _preco_periodo_lote(tarifa, minutos, minuto_entrada)
+    dias, resto = np.divmod(minutos, MINUTOS_DIA)
+    dia_cheio = np.minimum(
+        _preco_periodo_lote(tarifa, np.full_like(minutos, MINUTOS_DIA), minuto_entrada), tarifa.valor_diaria
+    )
+    ultimo = np.minimum(_preco_periodo_lote(tarifa, resto, minuto_entrada), tarifa.valor_diaria)
+    return minutos, dias * dia_cheio + ultimo
+
+
+def mensalidades_lote(tarifa: Tarifa, placas, saidas):
+    """
+    Centavos cobrados de mensalistas: valor_mensalista na primeira saída de
+    cada placa em cada mês, zero nas demais.
+    """
+    np = numpy_obrigatorio()
+    saidas = np.asarray(saidas, dtype="datetime64[us]")
+    meses = saidas.astype("datetime64[M]").astype(np.int64)
+    _, codigos = np.unique(np.asarray(placas, dtype=object).astype(str), return_inverse=True)
+    ordem = np.lexsort((saidas, meses, codigos))
+    chave = np.stack([codigos[ordem], meses[ordem]], axis=1)
+    primeira = np.ones(len(ordem), dtype=bool)
+    if len(ordem) > 1:
+        primeira[1:] = np.any(chave[1:] != chave[:-1], axis=1)
+    cobrado = np.zeros(len(ordem), dtype=np.int64)
+    cobrado[ordem[primeira]] = tarifa.valor_mensalista
+    return cobrado
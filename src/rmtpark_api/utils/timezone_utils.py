@@ -1,8 +1,30 @@
 from datetime import datetime
+from typing import Optional
 import pytz
+from sqlalchemy import DateTime
+from sqlalchemy.types import TypeDecorator
 
 TZ_SP = pytz.timezone("America/Sao_Paulo")
 
 def agora_sp() -> datetime:
     """Retorna o horário atual com fuso de São Paulo (UTC−3)"""
-    return datetime.now(TZ_SP)
\ No newline at end of file
+    return datetime.now(TZ_SP)
+
+def para_sp_sem_fuso(valor: Optional[datetime]) -> Optional[datetime]:
+    """Converte para o horário de São Paulo sem tzinfo (formato das colunas DateTime sem fuso)"""
+    if valor is None or valor.tzinfo is None:
+        return valor
+    return valor.astimezone(TZ_SP).replace(tzinfo=None)
+
+
+class DataHoraSP(TypeDecorator):
+    """
+    Coluna DateTime sem fuso que sempre guarda o horário de São Paulo.
+    Valores com fuso são convertidos aqui, antes de ir ao banco; sem isso o
+    Postgres converteria pelo TimeZone da sessão (UTC na imagem padrão).
+    """
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, valor, dialect):
+        return para_sp_sem_fuso(valor)